@@ -192,6 +192,26 @@ class HomeElements:
 
         SPECIAL_CHARACTERS = "!@#$%^&*()_+-=[]{}|;:,.<>?"
 
+        # Contact form validation matrix: expected error state per field (True shown, False
+        # not shown, omitted = observed only). Every case keeps at least one field invalid so
+        # the form is never actually submitted.
+        VALIDATION_CASES = [
+            {'id': 'empty_form', 'name': '', 'email': '', 'message': '',
+             'expect': {'name': True, 'email': True, 'message': True}},
+            {'id': 'invalid_email_no_at', 'name': VALID_NAME, 'email': INVALID_EMAIL_1, 'message': VALID_MESSAGE,
+             'expect': {'name': False, 'email': True, 'message': False}},
+            {'id': 'invalid_email_no_domain', 'name': VALID_NAME, 'email': INVALID_EMAIL_2,
+             'message': VALID_MESSAGE, 'expect': {'name': False, 'email': True, 'message': False}},
+            {'id': 'invalid_email_no_user', 'name': VALID_NAME, 'email': INVALID_EMAIL_3,
+             'message': VALID_MESSAGE, 'expect': {'name': False, 'email': True, 'message': False}},
+            {'id': 'long_name', 'name': LONG_NAME, 'email': VALID_EMAIL, 'message': '',
+             'expect': {'email': False, 'message': True}},
+            {'id': 'special_characters', 'name': SPECIAL_CHARACTERS, 'email': VALID_EMAIL, 'message': '',
+             'expect': {'email': False, 'message': True}},
+            {'id': 'long_message_empty_name', 'name': '', 'email': VALID_EMAIL, 'message': LONG_MESSAGE,
+             'expect': {'name': True, 'email': False, 'message': False}},
+        ]
+
         # Expected Text Content
         EXPECTED_TAGLINE = "Making everybody a green energy champion"
         LANGUAGE_TOGGLE_TEXT = "English"
@@ -208,4 +228,20 @@ class HomeElements:
         # Social Media Handles
         LINKEDIN_HANDLE = "noovoleum"
         INSTAGRAM_HANDLE = "noovoleumid"
-        EMAIL_CONTACT = "contact@noovoleum.com"
\ No newline at end of file
+        EMAIL_CONTACT = "contact@noovoleum.com"
+
+    # Sections resolved by HomePage.page_contract() right after navigation
+    CONTRACT_SECTIONS = ('Header', 'Banner', 'UCOllectSection', 'AppDownload', 'Contact', 'Footer', 'Common',
+                         'Validation')
+
+    @classmethod
+    def registry(cls, sections: tuple = None) -> dict:
+        """Return {'Section.NAME': locator} for every locator tuple nested in the given sections"""
+        registry = {}
+        for section_name, section in vars(cls).items():
+            if not isinstance(section, type) or (sections and section_name not in sections):
+                continue
+            for name, value in vars(section).items():
+                if isinstance(value, tuple) and len(value) == 2 and isinstance(value[1], str):
+                    registry[f"{section_name}.{name}"] = value
+        return registry
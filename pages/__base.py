@@ -3,13 +3,72 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
+import copy
 import logging
+import time
 import allure
 from typing import List, Optional, Any
 from utils.config import Config
+from utils.page_contract import PageContract, MissingLocatorError
+from utils.page_health import PageHealth, PageUnavailableError, page_health_breaker
+from utils.startup_report import startup_timer
+from utils.timing_store import timing_store
+
+# Recorders (snapshots, traces, telemetry, visual diffs) are imported by the methods that use them
 
 logger = logging.getLogger(__name__)
 
+# Sets a text field's value through the native setter (so framework-controlled inputs see it)
+# and fires input/change like typing would. Returns null for fields that need real
+# keystrokes and false when the field did not take the value.
+FAST_INPUT_SCRIPT = """
+var el = arguments[0], text = arguments[1], append = arguments[2];
+var proto = el.tagName === 'TEXTAREA' ? HTMLTextAreaElement.prototype
+    : el.tagName === 'INPUT' ? HTMLInputElement.prototype : null;
+var textTypes = ['text', 'email', 'search', 'tel', 'url', 'password', 'number'];
+if (!proto || el.disabled || el.readOnly || (el.tagName === 'INPUT' && textTypes.indexOf(el.type) < 0)) return null;
+var value = append ? el.value + text : text;
+if (el.maxLength >= 0) value = value.slice(0, el.maxLength);
+el.focus();
+Object.getOwnPropertyDescriptor(proto, 'value').set.call(el, value);
+el.dispatchEvent(new Event('input', {bubbles: true}));
+el.dispatchEvent(new Event('change', {bubbles: true}));
+return el.value === value;
+"""
+
+# Arguments: clip element or null, mask elements. Mask rects relative to the clip (or viewport)
+# in CSS pixels, plus the clip width to scale them to screenshot pixels.
+SCREENSHOT_GEOMETRY_SCRIPT = """
+var clip = arguments[0], masks = arguments[1];
+var origin = clip ? clip.getBoundingClientRect() : {left: 0, top: 0, width: window.innerWidth};
+return {
+    width: origin.width,
+    viewport: window.innerWidth + 'x' + window.innerHeight,
+    masks: masks.map(function (el) {
+        var r = el.getBoundingClientRect();
+        return [r.left - origin.left, r.top - origin.top, r.width, r.height];
+    })
+};
+"""
+
+# Navigation timing of the current document and how many of its resources came from the HTTP cache
+LOAD_METRICS_SCRIPT = """
+var nav = performance.getEntriesByType('navigation')[0] || {};
+var resources = performance.getEntriesByType('resource'), transfer = nav.transferSize || 0, cached = 0;
+resources.forEach(function (r) {
+    transfer += r.transferSize || 0;
+    if (r.transferSize === 0 && r.decodedBodySize > 0) cached++;
+});
+return {
+    ttfb_ms: Math.round(nav.responseStart || 0),
+    dom_content_loaded_ms: Math.round(nav.domContentLoadedEventEnd || 0),
+    load_ms: Math.round(nav.loadEventEnd || 0),
+    resources: resources.length,
+    cached_resources: cached,
+    transfer_kb: Math.round(transfer / 1024)
+};
+"""
+
 
 class BasePage:
     """Base page class containing common methods for all page objects"""
@@ -18,27 +77,91 @@ class BasePage:
         self.driver = driver
         self.wait = WebDriverWait(driver, Config.EXPLICIT_WAIT)
         self.actions = ActionChains(driver)
+        self.dom: Optional['DomSnapshot'] = None
+        self.contract: Optional[PageContract] = None
+        # Locators of dynamic regions ignored by every visual comparison on this page
+        self.visual_masks: List[tuple] = []
+
+    @property
+    def browser_name(self) -> str:
+        """Browser name reported by the driver capabilities (no round trip)"""
+        return self.driver.capabilities.get('browserName', 'unknown')
+
+    @staticmethod
+    def _wait_key(condition: str, locator: tuple) -> str:
+        return f"{condition}:{locator[0]}={locator[1]}"
+
+    def _wait_time(self, key: str, timeout: float = None, ceiling: float = None) -> float:
+        """Explicit timeout as given, otherwise the timeout learned from history capped by the global constant"""
+        if timeout:
+            return timeout
+        return timing_store().effective_timeout(self.browser_name, key, ceiling or Config.EXPLICIT_WAIT)
+
+    def _until(self, condition, key: str, wait_time: float) -> Any:
+        """Wait for a condition, recording how long it took and reporting history on timeout"""
+        start = time.perf_counter()
+        try:
+            result = WebDriverWait(self.driver, wait_time).until(condition)
+        except TimeoutException:
+            history = timing_store().describe(self.browser_name, key)
+            # A miss discards the learned timeout, so the next waits use the full ceiling again
+            timing_store().miss(self.browser_name, key, wait_time)
+            raise TimeoutException(
+                f"{key} not satisfied within {wait_time}s on {self.browser_name} (history: {history})"
+            ) from None
+        timing_store().record(self.browser_name, key, time.perf_counter() - start)
+        return result
 
     @allure.step("Navigate to URL: {url}")
     def navigate_to(self, url: str) -> None:
         """Navigate to the specified URL"""
+        self.contract = None
+        breaker = page_health_breaker()
+        if Config.PAGE_HEALTH_BREAKER and breaker.is_open and not breaker.probe_due():
+            raise PageUnavailableError(breaker.describe())
         try:
-            self.driver.get(url)
+            with startup_timer().phase("first navigation"):
+                self.driver.get(url)
             logger.info(f"Navigated to: {url}")
         except Exception as e:
             logger.error(f"Failed to navigate to {url}: {str(e)}")
+            if Config.PAGE_HEALTH_BREAKER:
+                breaker.record_failure(f"Navigation to {url} failed: {str(e).splitlines()[0]}")
             raise
+        self.check_page_health()
+        if not hasattr(self.driver, 'execute_cdp_cmd'):
+            # Without DevTools, init scripts are re-evaluated after every navigation
+            for script, _ in getattr(self.driver, 'init_scripts', ()):
+                self.driver.execute_script(script)
+
+    def add_init_script(self, script: str) -> None:
+        """Evaluate a script in the current document and in every document loaded afterwards"""
+        identifier = None
+        if hasattr(self.driver, 'execute_cdp_cmd'):
+            identifier = self.driver.execute_cdp_cmd(
+                'Page.addScriptToEvaluateOnNewDocument', {'source': script})['identifier']
+        self.driver.init_scripts = getattr(self.driver, 'init_scripts', []) + [(script, identifier)]
+        self.driver.execute_script(script)
+
+    def remove_init_scripts(self) -> None:
+        """Stop evaluating init scripts in new documents (the current one keeps its state)"""
+        for _, identifier in getattr(self.driver, 'init_scripts', ()):
+            if identifier is not None:
+                self.driver.execute_cdp_cmd('Page.removeScriptToEvaluateOnNewDocument', {'identifier': identifier})
+        self.driver.init_scripts = []
 
     @allure.step("Find element by locator")
     def _find(self, locator: tuple, timeout: int = None) -> Any:
         """Find element with explicit wait"""
-        wait_time = timeout or Config.EXPLICIT_WAIT
+        key = self._wait_key('present', locator)
+        wait_time = self._wait_time(key, timeout)
         try:
-            element = WebDriverWait(self.driver, wait_time).until(
-                EC.presence_of_element_located(locator)
-            )
+            self._fail_fast(locator)
+            element = self._until(EC.presence_of_element_located(locator), key, wait_time)
             logger.debug(f"Element found: {locator}")
             return element
+        except (MissingLocatorError, PageUnavailableError):
+            raise
         except TimeoutException:
             logger.error(f"Element not found within {wait_time} seconds: {locator}")
             raise
@@ -46,13 +169,17 @@ class BasePage:
     @allure.step("Find elements by locator")
     def find_elements(self, locator: tuple, timeout: int = None) -> List[Any]:
         """Find multiple elements with explicit wait"""
-        wait_time = timeout or Config.EXPLICIT_WAIT
+        if self.dom is not None:
+            return self.dom.find_elements(locator)
+        key = self._wait_key('present_all', locator)
+        wait_time = self._wait_time(key, timeout)
         try:
-            elements = WebDriverWait(self.driver, wait_time).until(
-                EC.presence_of_all_elements_located(locator)
-            )
+            self._fail_fast(locator)
+            elements = self._until(EC.presence_of_all_elements_located(locator), key, wait_time)
             logger.debug(f"Found {len(elements)} elements: {locator}")
             return elements
+        except PageUnavailableError:
+            raise
         except TimeoutException:
             logger.error(f"Elements not found within {wait_time} seconds: {locator}")
             return []
@@ -60,22 +187,34 @@ class BasePage:
     @allure.step("Click element")
     def _click(self, locator, timeout: int = None) -> None:
         """Click element after ensuring it's clickable"""
-        wait_time = timeout or Config.EXPLICIT_WAIT
+        key = self._wait_key('clickable', locator)
+        wait_time = self._wait_time(key, timeout)
         try:
-            element = WebDriverWait(self.driver, wait_time).until(
-                EC.element_to_be_clickable(locator)
-            )
+            self._fail_fast(locator)
+            element = self._until(EC.element_to_be_clickable(locator), key, wait_time)
+            # A click may navigate away, so the contract no longer describes the page
+            self.contract = None
             element.click()
             logger.info(f"Clicked element: {locator}")
+        except (MissingLocatorError, PageUnavailableError):
+            raise
         except TimeoutException:
             logger.error(f"Element not clickable within {wait_time} seconds: {locator}")
             raise
 
     @allure.step("Enter text: {text}")
-    def enter_text(self, locator: tuple, text: str, clear_first: bool = True) -> None:
-        """Enter text into input field"""
+    def enter_text(self, locator: tuple, text: str, clear_first: bool = True, fast: bool = None) -> None:
+        """Enter text into input field
+
+        The fast path sets the value natively and dispatches input/change events in one call;
+        it falls back to typing for fields that need keystrokes or reject the value.
+        """
+        fast = Config.FAST_INPUT if fast is None else fast
         try:
             element = self._find(locator)
+            if fast and self.driver.execute_script(FAST_INPUT_SCRIPT, element, text, not clear_first):
+                logger.info(f"Set text '{text}' into element: {locator}")
+                return
             if clear_first:
                 element.clear()
             element.send_keys(text)
@@ -87,6 +226,8 @@ class BasePage:
     @allure.step("Get element text")
     def get_text(self, locator: tuple) -> str:
         """Get text from element"""
+        if self.dom is not None:
+            return self.dom.get_text(locator)
         try:
             element = self._find(locator)
             text = element.text
@@ -99,6 +240,8 @@ class BasePage:
     @allure.step("Get element attribute: {attribute}")
     def get_attribute(self, locator: tuple, attribute: str) -> str:
         """Get attribute value from element"""
+        if self.dom is not None:
+            return self.dom.get_attribute(locator, attribute)
         try:
             element = self._find(locator)
             value = element.get_attribute(attribute)
@@ -111,13 +254,17 @@ class BasePage:
     @allure.step("Check if element is displayed")
     def is_displayed(self, locator: tuple, timeout: int = None) -> bool:
         """Check if element is displayed"""
-        wait_time = timeout or Config.EXPLICIT_WAIT
+        if self.dom is not None:
+            return self.dom.is_displayed(locator)
+        key = self._wait_key('visible', locator)
+        wait_time = self._wait_time(key, timeout)
         try:
-            WebDriverWait(self.driver, wait_time).until(
-                EC.visibility_of_element_located(locator)
-            )
+            self._fail_fast(locator)
+            self._until(EC.visibility_of_element_located(locator), key, wait_time)
             logger.debug(f"Element is displayed: {locator}")
             return True
+        except PageUnavailableError:
+            raise
         except TimeoutException:
             logger.debug(f"Element is not displayed: {locator}")
             return False
@@ -125,11 +272,10 @@ class BasePage:
     @allure.step("Wait for element to disappear")
     def wait_for_element_to_disappear(self, locator: tuple, timeout: int = None) -> bool:
         """Wait for element to disappear"""
-        wait_time = timeout or Config.EXPLICIT_WAIT
+        key = self._wait_key('invisible', locator)
+        wait_time = self._wait_time(key, timeout)
         try:
-            WebDriverWait(self.driver, wait_time).until(
-                EC.invisibility_of_element_located(locator)
-            )
+            self._until(EC.invisibility_of_element_located(locator), key, wait_time)
             logger.debug(f"Element disappeared: {locator}")
             return True
         except TimeoutException:
@@ -148,14 +294,43 @@ class BasePage:
             raise
 
     @allure.step("Take screenshot")
-    def take_screenshot(self, name: str = "screenshot") -> None:
-        """Take screenshot and attach to Allure report"""
+    def take_screenshot(self, name: str = "screenshot", locator: tuple = None, mask: List[tuple] = ()) -> None:
+        """Take screenshot (of one element when a locator is given), attach it and check it against its baseline"""
+        from utils.telemetry import record_screenshot
+        from utils.trace import active_recorder
+
         try:
-            screenshot = self.driver.get_screenshot_as_png()
+            element = self._find(locator) if locator else None
+            if element is not None:
+                self.driver.execute_script("arguments[0].scrollIntoView({block: 'start'});", element)
+            screenshot = element.screenshot_as_png if element is not None else self.driver.get_screenshot_as_png()
             allure.attach(screenshot, name=name, attachment_type=allure.attachment_type.PNG)
+            if active_recorder() is not None:
+                active_recorder().screenshot(name, screenshot)
+            record_screenshot(self.browser_name, screenshot)
             logger.info(f"Screenshot taken: {name}")
         except Exception as e:
             logger.error(f"Failed to take screenshot: {str(e)}")
+            return
+        if Config.VISUAL_REGRESSION or Config.VISUAL_UPDATE_BASELINES:
+            self._check_visual(name, screenshot, element, list(self.visual_masks) + list(mask))
+
+    def _check_visual(self, name: str, screenshot: bytes, element: Any, masks: List[tuple]) -> None:
+        """Compare a screenshot with its baseline, attaching metrics and a diff heatmap"""
+        from utils import visual_diff
+
+        mask_elements = [el for locator in masks for el in self.driver.find_elements(*locator)]
+        geometry = self.driver.execute_script(SCREENSHOT_GEOMETRY_SCRIPT, element, mask_elements)
+        image_width = int.from_bytes(screenshot[16:20], "big")  # PNG IHDR width
+        scale = image_width / geometry['width'] if geometry['width'] else 1.0
+        rects = [tuple(int(round(v * scale)) for v in rect) for rect in geometry['masks']]
+        result = visual_diff.check(screenshot, name, self.browser_name, geometry['viewport'], rects,
+                                   update=Config.VISUAL_UPDATE_BASELINES)
+        allure.attach(result.describe(), name=f"Visual check: {name}", attachment_type=allure.attachment_type.TEXT)
+        if result.heatmap_png:
+            allure.attach(result.heatmap_png, name=f"Visual diff: {name}", attachment_type=allure.attachment_type.PNG)
+        if not result.passed:
+            raise visual_diff.VisualMismatchError(f"Visual regression in {result.describe()}")
 
     @allure.step("Get page title")
     def get_page_title(self) -> str:
@@ -174,10 +349,11 @@ class BasePage:
     @allure.step("Wait for page to load")
     def wait_for_page_load(self, timeout: int = None) -> None:
         """Wait for page to fully load"""
-        wait_time = timeout or Config.PAGE_LOAD_TIMEOUT
+        wait_time = self._wait_time('document_ready', timeout, ceiling=Config.PAGE_LOAD_TIMEOUT)
         try:
-            WebDriverWait(self.driver, wait_time).until(
-                lambda driver: driver.execute_script("return document.readyState") == "complete"
+            self._until(
+                lambda driver: driver.execute_script("return document.readyState") == "complete",
+                'document_ready', wait_time
             )
             logger.debug("Page loaded completely")
         except TimeoutException:
@@ -186,13 +362,15 @@ class BasePage:
     @allure.step("Wait for element to be clickable")
     def wait_for_clickable(self, locator: tuple, timeout: int = None) -> Any:
         """Wait for element to be clickable and return it"""
-        wait_time = timeout or Config.EXPLICIT_WAIT
+        key = self._wait_key('clickable', locator)
+        wait_time = self._wait_time(key, timeout)
         try:
-            element = WebDriverWait(self.driver, wait_time).until(
-                EC.element_to_be_clickable(locator)
-            )
+            self._fail_fast(locator)
+            element = self._until(EC.element_to_be_clickable(locator), key, wait_time)
             logger.debug(f"Element is clickable: {locator}")
             return element
+        except (MissingLocatorError, PageUnavailableError):
+            raise
         except TimeoutException:
             logger.error(f"Element not clickable within {wait_time} seconds: {locator}")
             raise
@@ -211,6 +389,7 @@ class BasePage:
     @allure.step("Switch to new window/tab")
     def switch_to_new_window(self) -> None:
         """Switch to the most recently opened window/tab"""
+        self.contract = None
         try:
             self.driver.switch_to.window(self.driver.window_handles[-1])
             logger.info("Switched to new window/tab")
@@ -221,6 +400,7 @@ class BasePage:
     @allure.step("Switch to main window")
     def switch_to_main_window(self) -> None:
         """Switch to the main (first) window"""
+        self.contract = None
         try:
             self.driver.switch_to.window(self.driver.window_handles[0])
             logger.info("Switched to main window")
@@ -238,3 +418,95 @@ class BasePage:
         except Exception as e:
             logger.error(f"Failed to execute JavaScript '{script}': {str(e)}")
             raise
+
+    @allure.step("Capture DOM snapshot")
+    def snapshot(self) -> 'DomSnapshot':
+        """Serialize the current DOM in a single script call for offline assertions"""
+        from utils.dom_snapshot import DomSnapshot, SNAPSHOT_SCRIPT
+
+        try:
+            snapshot = DomSnapshot(self.driver.execute_script(SNAPSHOT_SCRIPT))
+            logger.debug(f"Captured DOM snapshot of {snapshot.url} ({len(snapshot)} elements)")
+            return snapshot
+        except Exception as e:
+            logger.error(f"Failed to capture DOM snapshot: {str(e)}")
+            raise
+
+    def static_view(self, snapshot: Optional['DomSnapshot'] = None) -> 'BasePage':
+        """Return a copy of this page whose read-only checks are answered from a DOM snapshot
+
+        get_text, get_attribute, is_displayed and find_elements no longer touch the browser,
+        so a whole section can be verified with one round trip. Actions still run live.
+        """
+        view = copy.copy(self)
+        view.dom = snapshot or self.snapshot()
+        return view
+
+    @allure.step("Check page contract")
+    def check_page_contract(self, locators: dict) -> PageContract:
+        """Resolve all locators in one script call and remember which are missing
+
+        While the contract is current, waits on a missing locator fail immediately with
+        the contract report instead of running into the full explicit wait.
+        """
+        try:
+            self.contract = PageContract.resolve(self.driver, locators)
+        except Exception as e:
+            logger.error(f"Failed to check page contract: {str(e)}")
+            raise
+        if self.contract.ok:
+            logger.info(f"Page contract: {self.contract.summary()}")
+        else:
+            logger.warning(self.contract.report())
+            allure.attach(self.contract.report(), name="Page contract",
+                          attachment_type=allure.attachment_type.TEXT)
+        return self.contract
+
+    @allure.step("Get load metrics")
+    def get_load_metrics(self, cache_mode: str = "unknown") -> dict:
+        """Navigation timing and cache hits of the current document, also recorded as suite telemetry"""
+        from utils.telemetry import record_page_load
+
+        metrics = self.driver.execute_script(LOAD_METRICS_SCRIPT)
+        record_page_load(self.browser_name, metrics, cache_mode)
+        logger.info(f"Load metrics: {metrics}")
+        return metrics
+
+    @allure.step("Clear browser cache")
+    def clear_browser_cache(self) -> bool:
+        """Empty the HTTP cache (Chromium only); returns False when the browser cannot"""
+        if not hasattr(self.driver, 'execute_cdp_cmd'):
+            return False
+        self.driver.execute_cdp_cmd('Network.clearBrowserCache', {})
+        return True
+
+    @allure.step("Check page health")
+    def check_page_health(self) -> PageHealth:
+        """Detect HTTP failures and error pages after navigation and feed the circuit breaker
+
+        Once the breaker is open, navigation and element waits raise PageUnavailableError
+        immediately instead of each running into its timeout.
+        """
+        if not Config.PAGE_HEALTH_BREAKER:
+            return PageHealth(True)
+        breaker = page_health_breaker()
+        health = breaker.check(self.driver)
+        if not health.ok:
+            allure.attach(health.reason, name="Page health", attachment_type=allure.attachment_type.TEXT)
+            # Only a failure that opened the breaker means later steps will fail fast
+            raise PageUnavailableError(breaker.describe() if breaker.is_open else f"Page unhealthy: {health.reason}")
+        return health
+
+    def _fail_fast(self, locator: tuple) -> None:
+        """Raise PageUnavailableError during an outage and MissingLocatorError for locators
+        the current contract found missing"""
+        if Config.PAGE_HEALTH_BREAKER:
+            page_health_breaker().guard()
+        if not Config.CONTRACT_FAIL_FAST or self.contract is None or not self.contract.is_missing(locator):
+            return
+        # Content rendered after the contract ran is still accepted; this costs one round trip, not a timeout
+        if self.contract.recheck(self.driver, locator):
+            return
+        message = self.contract.describe_missing(locator)
+        logger.error(message)
+        raise MissingLocatorError(message)
@@ -1,3 +1,4 @@
+import json
 import time
 import allure
 from pages.__base import BasePage
@@ -7,28 +8,57 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Arguments: form, name/email/message error containers
+CONTACT_RESET_SCRIPT = """
+arguments[0].reset();
+for (var i = 1; i < arguments.length; i++) arguments[i].textContent = '';
+"""
+
+# Arguments: name/email/message error containers
+CONTACT_ERRORS_SCRIPT = """
+var fields = ['name', 'email', 'message'], errors = {};
+for (var i = 0; i < fields.length; i++) {
+    var el = arguments[i], text = (el.innerText || '').trim();
+    errors[fields[i]] = {text: text, visible: text !== '' && el.getClientRects().length > 0};
+}
+return errors;
+"""
+
 
 class HomePage(BasePage):
-    def __init__(self, driver):
+    def __init__(self, driver, base_url: str = None):
         super().__init__(driver)
         self.elements = HomeElements()
+        # Staging or local-mirror homepage instead of the live site
+        self.base_url = base_url or self.elements.URLs.BASE_URL
+        # The fixed navbar overlaps scrolled sections and the form result text varies per run
+        self.visual_masks = [self.elements.Header.NAVBAR, self.elements.Contact.RESULT_CONTAINER]
 
     # Navigation Methods
     @allure.step("Navigate to Noovoleum homepage")
     def navigate_to_homepage(self):
         """Navigate to Noovoleum Indonesian homepage"""
-        self.navigate_to(self.elements.URLs.BASE_URL)
+        self.navigate_to(self.base_url)
         self.wait_for_page_load()
+        self.page_contract()
         return self
 
+    @allure.step("Check homepage locator contract")
+    def page_contract(self):
+        """Resolve every HomeElements locator in one script and report present/missing/ambiguous"""
+        return self.check_page_contract(self.elements.registry(self.elements.CONTRACT_SECTIONS))
+
     @allure.step("Wait for preloader to disappear")
     def wait_for_preloader_to_disappear(self, timeout: int = 10) -> bool:
         """Wait for page preloader to disappear"""
         try:
-            return self.wait_for_element_to_disappear(self.elements.Preloader.CONTAINER, timeout)
+            disappeared = self.wait_for_element_to_disappear(self.elements.Preloader.CONTAINER, timeout)
         except TimeoutException:
+            disappeared = False
+        if not disappeared:
+            # A slow animation is not an outage; only navigation failures and error pages feed the breaker
             logger.warning("Preloader did not disappear within timeout")
-            return False
+        return disappeared
 
     # Header Section Methods
     @allure.step("Check if logo is displayed")
@@ -261,6 +291,62 @@ class HomePage(BasePage):
         self.click_send_message_button()
         return self
 
+    @allure.step("Reset contact form in page")
+    def reset_contact_form(self):
+        """Reset the form fields and blank the error containers without reloading the page"""
+        self.execute_script(CONTACT_RESET_SCRIPT, self._find(self.elements.Contact.CONTACT_FORM),
+                            *self._contact_error_elements())
+        return self
+
+    @allure.step("Read contact form errors")
+    def get_contact_form_errors(self) -> dict:
+        """Read all three field error containers in one call: {field: {'text', 'visible'}}"""
+        return self.execute_script(CONTACT_ERRORS_SCRIPT, *self._contact_error_elements())
+
+    def _contact_error_elements(self) -> list:
+        return [self._find(self.elements.Contact.NAME_ERROR), self._find(self.elements.Contact.EMAIL_ERROR),
+                self._find(self.elements.Contact.MESSAGE_ERROR)]
+
+    @allure.step("Run contact form validation matrix")
+    def run_contact_validation_matrix(self, cases: list = None) -> list:
+        """Walk every validation case on the current page load
+
+        Each case resets the form in-page, fills it, clicks send and reads the errors in one
+        batch. Returns one result per case with the observed errors and any mismatches.
+        """
+        cases = cases or self.elements.TestData.VALIDATION_CASES
+        results = []
+        for case in cases:
+            with allure.step(f"Validation case: {case['id']}"):
+                self.reset_contact_form()
+                self.fill_contact_form(case['name'], case['email'], case['message'])
+                self.click_send_message_button()
+                errors = self._wait_for_contact_errors(case['expect'])
+                mismatches = [
+                    f"{field} error {'missing' if shown else 'unexpected'}"
+                    for field, shown in case['expect'].items() if errors[field]['visible'] != shown
+                ]
+                results.append({'case': case['id'], 'errors': errors, 'mismatches': mismatches})
+                logger.info(f"Validation case {case['id']}: {mismatches or 'ok'}")
+        allure.attach(json.dumps(results, indent=2), name="Contact validation matrix",
+                      attachment_type=allure.attachment_type.JSON)
+        return results
+
+    def _wait_for_contact_errors(self, expect: dict, timeout: float = 5) -> dict:
+        """Poll the error batch until it matches the expectation, returning the last reading"""
+        key = 'contact_validation'
+        readings = []
+
+        def settled(driver):
+            readings.append(self.get_contact_form_errors())
+            return all(readings[-1][field]['visible'] == shown for field, shown in expect.items())
+
+        try:
+            self._until(settled, key, self._wait_time(key, timeout))
+        except TimeoutException:
+            pass
+        return readings[-1]
+
     # Footer Section Methods
     @allure.step("Scroll to footer section")
     def scroll_to_footer_section(self):
@@ -1,29 +1,37 @@
+import time
+_conftest_loading = time.time()
+
 import pytest
+import json
 import logging
 import os
+import shutil
 from datetime import datetime
-from utils.browser_config import BrowserManager
 from utils.config import Config
+from utils.startup_report import startup_timer
 import allure
 
-# Create reports directory and subdirectories if they don't exist
-os.makedirs(os.path.dirname(Config.LOG_FILE), exist_ok=True)
-os.makedirs(Config.SCREENSHOT_PATH, exist_ok=True)
-os.makedirs(Config.ALLURE_RESULTS_PATH, exist_ok=True)
-
-# Configure logging
-logging.basicConfig(
-    level=getattr(logging, Config.LOG_LEVEL),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(Config.LOG_FILE),
-        logging.StreamHandler() if Config.CONSOLE_LOGGING else logging.NullHandler()
-    ]
-)
+# Browser backends, plugins and recorders are imported where they are first used, so that
+# collection, --help and runs that never start a browser do not pay for them
+startup_timer().since_process_start("interpreter and pytest", until=_conftest_loading)
+startup_timer().record("conftest imports", time.time() - _conftest_loading)
 
 logger = logging.getLogger(__name__)
 
 
+def _configure_logging():
+    """Log to the run's log file (and the console unless CONSOLE_LOGGING is off)"""
+    os.makedirs(os.path.dirname(Config.LOG_FILE), exist_ok=True)
+    logging.basicConfig(
+        level=getattr(logging, Config.LOG_LEVEL),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(Config.LOG_FILE),
+            logging.StreamHandler() if Config.CONSOLE_LOGGING else logging.NullHandler()
+        ]
+    )
+
+
 def pytest_addoption(parser):
     """Add custom command line options"""
     parser.addoption(
@@ -37,12 +45,118 @@ def pytest_addoption(parser):
         action="store_true",
         help="Run tests in headless mode"
     )
+    parser.addoption(
+        "--on-outage",
+        action="store",
+        default="fail",
+        choices=("skip", "fail"),
+        help="What to do with tests that start while the page-health circuit breaker is open"
+    )
+    parser.addoption(
+        "--duration-scheduling",
+        action="store_true",
+        help="Distribute xdist workers' tests longest-first using recorded durations"
+    )
+    parser.addoption(
+        "--browser-affinity",
+        action="store_true",
+        help="Dedicate xdist workers to one browser each, sized by expected test time"
+    )
+    parser.addoption(
+        "--shard",
+        action="store",
+        default=None,
+        help="Run only shard i of N (e.g. 2/4), balanced by recorded test durations"
+    )
+    parser.addoption(
+        "--contexts",
+        action="store",
+        type=int,
+        default=4,
+        help="Isolated browser contexts hosted by one Chromium process in the context_pool fixture"
+    )
+    parser.addoption(
+        "--attach-daemon",
+        action="store_true",
+        help="Attach the driver fixture to warm sessions of `python -m utils.browser_daemon start`"
+    )
+    parser.addoption(
+        "--fan-out-browsers",
+        action="store",
+        default=None,
+        help="Comma-separated browsers driven concurrently by the multi_driver fixture (default: --browsers)"
+    )
+    parser.addoption(
+        "--retry-budget",
+        action="store",
+        type=float,
+        default=Config.RETRY_BUDGET_SECONDS,
+        help="Seconds of reruns shared by all tests (replaces a flat --reruns count); 0 disables"
+    )
+    parser.addoption(
+        "--changed-since",
+        action="store",
+        default=None,
+        help="Run only tests affected by changes since this git revision (plus the safety set)"
+    )
+    parser.addoption(
+        "--live-contact",
+        action="store_true",
+        help="Submit the contact form to the real backend instead of the local stub"
+    )
+    parser.addoption(
+        "--visual",
+        action="store_true",
+        help="Compare take_screenshot() captures with their visual baselines"
+    )
+    parser.addoption(
+        "--update-baselines",
+        action="store_true",
+        help="Replace visual baselines with this run's screenshots"
+    )
+    parser.addoption(
+        "--cache-mode",
+        action="store",
+        choices=Config.CACHE_MODES,
+        default=Config.CACHE_MODE,
+        help="Start drivers with an empty HTTP cache (cold) or a copy of the warm profile template (warm)"
+    )
+    parser.addoption(
+        "--screencast",
+        action="store",
+        choices=("off", "marked", "all"),
+        default=Config.SCREENCAST,
+        help="Record Chromium screencasts (attached on failure) for no tests, screencast-marked tests, or all"
+    )
+    parser.addoption(
+        "--metrics-port",
+        action="store",
+        type=int,
+        default=Config.METRICS_PORT,
+        help="Serve merged OpenMetrics telemetry on this local port while the run is in progress (0: off)"
+    )
+    parser.addoption(
+        "--record-trace",
+        action="store",
+        choices=Config.TRACE_MODES,
+        default=Config.TRACE_MODE,
+        help="Record an execution trace per test: off, on, or retain-on-failure"
+    )
+    parser.addoption(
+        "--startup-report",
+        action="store_true",
+        help="Report time to first test per process, split into imports, config, driver and browser phases"
+    )
 
 
 def pytest_configure(config):
     """Configure pytest with custom settings"""
+    _configure_logging()
+
     # Validate configuration
-    if not Config.validate_config():
+    with startup_timer().phase("config validation"):
+        valid = Config.validate_config()
+    if not valid:
         pytest.exit("Configuration validation failed")
 
     # Set up allure environment
@@ -52,29 +166,88 @@ def pytest_configure(config):
     with open(allure_env_path, "w") as f:
         f.write(f"Browsers={config.getoption('--browsers')}\n")
         f.write(f"Headless={config.getoption('--headless')}\n")
+        f.write(f"Cache.Mode={config.getoption('--cache-mode')}\n")
         f.write(f"Test.Execution.Date={datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
 
     # Register essential markers
     config.addinivalue_line("markers", "smoke: mark test as smoke test")
     config.addinivalue_line("markers", "critical: mark test as critical")
+    config.addinivalue_line("markers", "screencast: record a screencast video of the test (attached on failure)")
+
+    # Only the controller starts a fresh resource series and records durations;
+    # xdist workers report back to it. --collect-only runs nothing, so it keeps the last run's reports
+    if not hasattr(config, "workerinput") and not config.option.collectonly:
+        shutil.rmtree(Config.RESOURCE_MONITOR_PATH, ignore_errors=True)
+        shutil.rmtree(Config.STARTUP_REPORT_PATH, ignore_errors=True)
+        scheduling = config.getoption("--duration-scheduling") or config.getoption("--browser-affinity")
+        if Config.RECORD_DURATIONS or scheduling or config.getoption("--shard"):
+            from utils.scheduling import DurationSchedulingPlugin
+            config.pluginmanager.register(DurationSchedulingPlugin(config), "duration_scheduling")
+    # Plugins are imported only when their option or setting turns them on
+    if config.getoption("--shard"):
+        from utils.sharding import ShardingPlugin
+        config.pluginmanager.register(ShardingPlugin(config, config.getoption("--shard")), "sharding")
+    if Config.TRACE_DEPENDENCIES or config.getoption("--changed-since"):
+        from utils.change_impact import ChangeImpactPlugin
+        config.pluginmanager.register(ChangeImpactPlugin(config, config.getoption("--changed-since")), "change_impact")
+    if config.getoption("--visual"):
+        Config.VISUAL_REGRESSION = True
+    if config.getoption("--update-baselines"):
+        Config.VISUAL_UPDATE_BASELINES = True
+    Config.TRACE_MODE = config.getoption("--record-trace")
+    Config.SCREENCAST = config.getoption("--screencast")
+    Config.CACHE_MODE = config.getoption("--cache-mode")
+    if Config.METRICS_EXPORT:
+        from utils.telemetry import MetricsPlugin
+        config.pluginmanager.register(MetricsPlugin(config, config.getoption("--metrics-port")), "telemetry")
+    if Config.FLAKE_TRACKING:
+        from utils.flakiness import FlakinessPlugin
+        config.pluginmanager.register(FlakinessPlugin(config, config.getoption("--retry-budget")), "flakiness")
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_collection(session):
+    """Time test collection (test modules import the page objects and Selenium)"""
+    with startup_timer().phase("collection"):
+        yield
+
+
+def pytest_runtest_call(item):
+    startup_timer().first_test_started()
+
+
+def pytest_sessionfinish(session, exitstatus):
+    """Persist wait timings learned by this process"""
+    from utils.timing_store import timing_store
+
+    try:
+        timing_store().save()
+    except Exception as e:
+        logger.error(f"Failed to save wait timings: {str(e)}")
+    # The xdist controller runs no tests; its workers write their own reports
+    distributed = getattr(session.config.option, "dist", "no") != "no"
+    if session.config.getoption("--startup-report") and (hasattr(session.config, "workerinput") or not distributed):
+        startup_timer().save()
 
 
 @pytest.fixture(scope="session", params=None)
 def driver(request):
     """WebDriver fixture with browser parameterization"""
+    from utils.resource_monitor import RecyclableDriver
+
     browser = request.param.lower() if request.param else "chrome"
     headless = request.config.getoption("--headless")
+    attach_daemon = request.config.getoption("--attach-daemon")
+    metrics = request.config.pluginmanager.has_plugin("telemetry")
 
     logger.info(f"Setting up {browser} driver (headless: {headless})")
 
     try:
-        browser_manager = BrowserManager(browser, headless)
-        driver_instance = browser_manager.create_webdriver()
-
-        # Configure driver timeouts
-        driver_instance.implicitly_wait(Config.IMPLICIT_WAIT)
-        driver_instance.set_page_load_timeout(Config.PAGE_LOAD_TIMEOUT)
-        driver_instance.set_script_timeout(Config.SCRIPT_TIMEOUT)
+        if Config.RESOURCE_MONITOR:
+            # The monitor may swap the browser between tests behind this proxy
+            driver_instance = RecyclableDriver(lambda: _create_driver(browser, headless, attach_daemon, metrics))
+        else:
+            driver_instance = _create_driver(browser, headless, attach_daemon, metrics)
 
         logger.info(f"Successfully created {browser} driver")
         yield driver_instance
@@ -97,6 +270,32 @@ def driver(request):
                 logger.error(f"Error during driver cleanup: {str(e)}")
 
 
+def _create_driver(browser, headless, attach_daemon=False, metrics=False):
+    """Create (or attach to a daemon session) a driver with the suite's timeouts
+
+    With `metrics` (the telemetry plugin is registered) startup and every command are timed.
+    """
+    from utils.browser_config import BrowserManager
+
+    start = time.perf_counter()
+    if attach_daemon:
+        from utils.browser_daemon import attach
+        driver_instance = attach(browser)
+    else:
+        driver_instance = BrowserManager(browser, headless, Config.CACHE_MODE).create_webdriver()
+    if metrics:
+        from utils.telemetry import instrument_driver, suite_metrics
+        suite_metrics().observe("suite_driver_startup_seconds", time.perf_counter() - start, browser=browser)
+        instrument_driver(driver_instance, browser)
+
+    # Configure driver timeouts. An implicit wait would stretch every explicit wait
+    # poll, so it is disabled while waits use learned per-locator timeouts.
+    driver_instance.implicitly_wait(0 if Config.ADAPTIVE_TIMEOUTS else Config.IMPLICIT_WAIT)
+    driver_instance.set_page_load_timeout(Config.PAGE_LOAD_TIMEOUT)
+    driver_instance.set_script_timeout(Config.SCRIPT_TIMEOUT)
+    return driver_instance
+
+
 def pytest_generate_tests(metafunc):
     """Generate tests for each browser specified"""
     # Get the list of browsers specified in the command line options
@@ -108,11 +307,236 @@ def pytest_generate_tests(metafunc):
         metafunc.parametrize('driver', browsers, scope='session', indirect=True)
 
 
+@pytest.fixture(scope="session")
+def context_pool(request):
+    """Isolated browser contexts in one Chromium process for running checks concurrently in threads"""
+    from utils.context_pool import ContextPool, DEBUGGER_CAPABILITY
+
+    browsers = [b.strip() for b in request.config.getoption("--browsers").split(",")]
+    browser = next((b for b in browsers if b in DEBUGGER_CAPABILITY), None)
+    if browser is None:
+        pytest.skip("Browser contexts need chrome or edge in --browsers")
+    pool = ContextPool(request.config.getoption("--contexts"), browser, request.config.getoption("--headless"))
+    try:
+        yield pool.start()
+    finally:
+        pool.stop()
+
+
+@pytest.fixture(scope="session")
+def contact_stub_server(request):
+    """Local contact backend for this process, or None with --live-contact"""
+    if request.config.getoption("--live-contact"):
+        yield None
+        return
+    from utils.contact_stub import ContactStub
+
+    stub = ContactStub(port=Config.CONTACT_STUB_PORT).start()
+    yield stub
+    stub.stop()
+
+
+@pytest.fixture
+def contact_stub(driver, contact_stub_server):
+    """Route the test's contact form submissions to the local stub (None with --live-contact)"""
+    if contact_stub_server is None:
+        yield None
+        return
+    from pages.__base import BasePage
+
+    contact_stub_server.reset()
+    page = BasePage(driver)
+    page.add_init_script(contact_stub_server.router_script())
+    yield contact_stub_server
+    page.remove_init_scripts()
+    allure.attach(json.dumps(contact_stub_server.submissions, indent=2), name="Contact submissions",
+                  attachment_type=allure.attachment_type.JSON)
+
+
+@pytest.fixture(scope="session")
+def multi_driver(request):
+    """One driver per fan-out browser, for running the same read-only checks concurrently"""
+    from utils.fan_out import MultiDriver
+
+    browsers = request.config.getoption("--fan-out-browsers") or request.config.getoption("--browsers")
+    headless = request.config.getoption("--headless")
+    attach_daemon = request.config.getoption("--attach-daemon")
+    metrics = request.config.pluginmanager.has_plugin("telemetry")
+    try:
+        drivers = MultiDriver.start([b.strip().lower() for b in browsers.split(",")],
+                                    lambda browser: _create_driver(browser, headless, attach_daemon, metrics))
+    except RuntimeError as e:
+        pytest.fail(str(e), pytrace=False)
+    yield drivers
+    drivers.quit()
+
+
+@pytest.fixture
+def cache_mode(request, driver):
+    """Put the session's browser cache in the state the test asks for (indirect param) or the run's mode
+
+    cold empties the HTTP cache first; warm loads the homepage once so the test sees a repeat visit.
+    """
+    from pages.__base import BasePage
+
+    mode = getattr(request, "param", Config.CACHE_MODE)
+    page = BasePage(driver)
+    if mode == "cold" and not page.clear_browser_cache():
+        pytest.skip("Clearing the HTTP cache needs a Chromium browser")
+    if mode == "warm":
+        page.navigate_to(Config.BASE_URL)
+        page.wait_for_page_load()
+    allure.dynamic.label("cache_mode", mode)
+    return mode
+
+
+def _test_driver(request):
+    """The test's driver, or None for tests that do not use one (multi_driver fan-out)"""
+    return request.getfixturevalue("driver") if "driver" in request.fixturenames else None
+
+
+@pytest.fixture
+def checkpoints(request):
+    """Step checkpoints that let a pytest-rerunfailures retry resume at the failed step"""
+    from utils.checkpoints import Checkpoints
+
+    tracker = Checkpoints(_test_driver(request), request.node.nodeid, getattr(request.node, "execution_count", 1))
+    yield tracker
+    report = getattr(request.node, "rep_call", None)
+    tracker.finish(passed=bool(report and report.passed))
+
+
 @pytest.fixture(autouse=True)
-def browser_per_test(request, driver):
+def browser_per_test(request):
     """Auto-fixture to make driver available to test classes"""
+    driver = _test_driver(request)
+    if driver is None:
+        allure.dynamic.label("worker", os.environ.get("PYTEST_XDIST_WORKER", "main"))
+        return
     if request.cls is not None:
         request.cls.driver = driver
+    # Labels let merged multi-job Allure reports group results by browser and worker
+    allure.dynamic.label("browser", driver.capabilities.get("browserName", "unknown"))
+    allure.dynamic.label("worker", os.environ.get("PYTEST_XDIST_WORKER", "main"))
+
+
+@pytest.fixture(autouse=True)
+def page_health_gate(request):
+    """Skip or fail tests immediately while the site is down, probing recovery with backoff"""
+    from utils.page_health import page_health_breaker
+
+    breaker = page_health_breaker()
+    if not Config.PAGE_HEALTH_BREAKER or not breaker.is_open:
+        return
+    driver = _test_driver(request)
+    if driver is None and "multi_driver" in request.fixturenames:
+        driver = next(iter(request.getfixturevalue("multi_driver").drivers.values()))
+    if driver is None:
+        return
+    if breaker.probe_due() and breaker.probe(driver, Config.BASE_URL):
+        return
+    message = breaker.describe()
+    if request.config.getoption("--on-outage") == "skip":
+        pytest.skip(message)
+    pytest.fail(message, pytrace=False)
+
+
+@pytest.fixture(scope="session")
+def resource_monitor():
+    """Per-worker browser resource time series"""
+    from utils.resource_monitor import ResourceMonitor
+
+    return ResourceMonitor(os.environ.get("PYTEST_XDIST_WORKER", "main"), Config.RESOURCE_MONITOR_PATH)
+
+
+@pytest.fixture(autouse=True)
+def browser_resources(request, resource_monitor):
+    """Sample the browser around each test and recycle it when it crosses the thresholds"""
+    driver = _test_driver(request)
+    if not Config.RESOURCE_MONITOR or driver is None:
+        yield
+        return
+    from utils.resource_monitor import RecyclableDriver
+
+    resource_monitor.before_test(driver, request.node.nodeid)
+    yield
+    reason = resource_monitor.after_test(driver, request.node.nodeid)
+    if reason and isinstance(driver, RecyclableDriver):
+        resource_monitor.record_recycle(request.node.nodeid, reason)
+        driver.recycle(f"{reason} after {request.node.nodeid}")
+
+
+@pytest.fixture(autouse=True)
+def screencast(request):
+    """Record a Chromium screencast in the background; encode and attach it only if the test fails"""
+    driver = _test_driver(request)
+    wanted = Config.SCREENCAST == "all" or (
+        Config.SCREENCAST == "marked" and request.node.get_closest_marker("screencast") is not None)
+    if not wanted or driver is None or not hasattr(driver, "execute_cdp_cmd"):
+        yield None
+        return
+    from utils.screencast import ScreencastRecorder, encode_gif
+
+    recorder = ScreencastRecorder(driver).start()
+    yield recorder
+    frames = recorder.stop()
+    report = getattr(request.node, "rep_call", None)
+    if frames and not (report and report.passed):
+        try:
+            allure.attach(encode_gif(frames), name="Screencast", attachment_type=allure.attachment_type.GIF)
+        except Exception as e:
+            logger.error(f"Failed to encode screencast: {str(e)}")
+
+
+@pytest.fixture(autouse=True)
+def execution_trace(request):
+    """Record the test's commands, steps, DOM changes, console and network into a trace file"""
+    driver = _test_driver(request)
+    if Config.TRACE_MODE == "off" or driver is None:
+        yield None
+        return
+    from utils.trace import TraceRecorder
+
+    recorder = TraceRecorder(driver, request.node.nodeid, driver.capabilities.get("browserName", "unknown")).start()
+    yield recorder
+    report = getattr(request.node, "rep_call", None)
+    passed = bool(report and report.passed)
+    error = getattr(getattr(getattr(report, "longrepr", None), "reprcrash", None), "message", None)
+    path = recorder.stop(passed, None if passed else error)
+    if path and not passed:
+        allure.attach.file(path, name="Execution trace", extension="trace.gz")
+
+
+def pytest_terminal_summary(terminalreporter):
+    """Report startup phase timings and the tests that grew browser resources the most"""
+    if terminalreporter.config.getoption("--startup-report"):
+        _startup_summary(terminalreporter)
+    if not Config.RESOURCE_MONITOR or not os.path.isdir(Config.RESOURCE_MONITOR_PATH):
+        return
+    from utils.resource_monitor import top_leakers
+
+    leakers = top_leakers(Config.RESOURCE_MONITOR_PATH)
+    if not any(leakers.values()):
+        return
+    terminalreporter.section("browser resource growth")
+    for metric, unit in (("rss_mb", "MB RSS"), ("windows", "windows"), ("js_heap_mb", "MB JS heap")):
+        for nodeid, growth in leakers[metric]:
+            terminalreporter.write_line(f"+{growth:g} {unit}: {nodeid}")
+    for nodeid, reason in leakers["recycles"]:
+        terminalreporter.write_line(f"recycled after {nodeid}: {reason}")
+
+
+def _startup_summary(terminalreporter):
+    """Time to first test of every process of the run, phase by phase"""
+    from utils.startup_report import format_report, load_reports
+
+    reports = load_reports()
+    if not reports:
+        return
+    terminalreporter.section("startup")
+    for report in reports:
+        for line in format_report(report):
+            terminalreporter.write_line(line)
 
 
 @pytest.hookimpl(tryfirst=True, hookwrapper=True)
@@ -121,10 +545,15 @@ def pytest_runtest_makereport(item, call):
     outcome = yield
     rep = outcome.get_result()
     setattr(item, "rep_" + rep.when, rep)
+    flakiness = item.config.pluginmanager.get_plugin("flakiness")
+    if flakiness is not None:
+        flakiness.record(item, call, rep)
 
 
 def _take_failure_screenshot(driver, test_name):
     """Take screenshot on test failure"""
+    from utils.telemetry import record_screenshot
+
     try:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         screenshot_name = f"FAILED_{test_name}_{timestamp}.png"
@@ -136,11 +565,13 @@ def _take_failure_screenshot(driver, test_name):
 
         # Attach to Allure report
         with open(screenshot_path, "rb") as f:
-            allure.attach(
-                f.read(),
-                name=f"Failure Screenshot - {test_name}",
-                attachment_type=allure.attachment_type.PNG
-            )
+            screenshot = f.read()
+        allure.attach(
+            screenshot,
+            name=f"Failure Screenshot - {test_name}",
+            attachment_type=allure.attachment_type.PNG
+        )
+        record_screenshot(driver.capabilities.get("browserName", "unknown"), screenshot, kind="failure")
 
         logger.info(f"Failure screenshot saved: {screenshot_path}")
 
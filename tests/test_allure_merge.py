@@ -0,0 +1,98 @@
+import json
+import os
+
+import pytest
+
+from utils.allure_merge import AllureMerger, parse_input
+
+
+def write_results(directory, name, screenshot=b"same-png", environment=None, trend=None):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "shot-attachment.png"), "wb") as f:
+        f.write(screenshot)
+    result = {"uuid": name, "name": name, "labels": [{"name": "worker", "value": "gw0"}],
+              "steps": [{"name": "step", "attachments": [{"name": "shot", "source": "shot-attachment.png"}]}]}
+    with open(os.path.join(directory, f"{name}-result.json"), "w") as f:
+        json.dump(result, f)
+    if environment:
+        with open(os.path.join(directory, "environment.properties"), "w") as f:
+            f.writelines(f"{key}={value}\n" for key, value in environment.items())
+    if trend is not None:
+        with open(os.path.join(directory, "flakiness-trend.json"), "w") as f:
+            json.dump(trend, f)
+
+
+def merged_results(output):
+    results = []
+    for name in sorted(os.listdir(output)):
+        if name.endswith("-result.json"):
+            with open(os.path.join(output, name)) as f:
+                results.append(json.load(f))
+    return results
+
+
+@pytest.fixture
+def merger(tmp_path):
+    return AllureMerger(str(tmp_path / "merged"))
+
+
+class TestAllureMerger:
+
+    def test_identical_attachments_are_stored_once(self, tmp_path, merger):
+        write_results(tmp_path / "chrome", "a")
+        write_results(tmp_path / "firefox", "b")
+        merger.merge("chrome", str(tmp_path / "chrome"))
+        merger.merge("firefox", str(tmp_path / "firefox"))
+        attachments = [n for n in os.listdir(merger.output) if "-attachment" in n]
+        assert len(attachments) == 1
+        assert merger.stats["duplicates"] == 1
+        sources = {r["steps"][0]["attachments"][0]["source"] for r in merged_results(merger.output)}
+        assert sources == set(attachments)
+
+    def test_results_are_labelled_with_browser_and_host(self, tmp_path, merger):
+        write_results(tmp_path / "chrome", "a")
+        merger.merge("chrome", str(tmp_path / "chrome"))
+        labels = {(l["name"], l["value"]) for l in merged_results(merger.output)[0]["labels"]}
+        assert {("browser", "chrome"), ("parentSuite", "chrome"), ("host", "chrome-gw0")} <= labels
+
+    def test_same_uuid_from_two_jobs_is_kept_twice(self, tmp_path, merger):
+        write_results(tmp_path / "shard1", "a")
+        write_results(tmp_path / "shard2", "a")
+        merger.merge("chrome", str(tmp_path / "shard1"))
+        merger.merge("chrome", str(tmp_path / "shard2"))
+        assert len(merged_results(merger.output)) == 2
+
+    def test_environment_of_shards_sharing_a_label(self, tmp_path, merger):
+        write_results(tmp_path / "c1", "a", environment={"Browsers": "chrome", "Shard": "1"})
+        write_results(tmp_path / "c2", "b", environment={"Browsers": "chrome", "Shard": "2"})
+        merger.merge("chrome", str(tmp_path / "c1"))
+        merger.merge("chrome", str(tmp_path / "c2"))
+        merger.finish()
+        with open(os.path.join(merger.output, "environment.properties")) as f:
+            lines = f.read().splitlines()
+        assert "Browsers=chrome" in lines
+        assert "Shard=chrome: 1; chrome #2: 2" in lines
+
+    def test_flakiness_trends_are_concatenated_per_label(self, tmp_path, merger):
+        shared = {"session": "s1", "ts": 1, "tests": 3}
+        write_results(tmp_path / "c1", "a", trend=[shared, {"session": "s2", "ts": 3, "tests": 2}])
+        write_results(tmp_path / "c2", "b", trend=[shared])
+        write_results(tmp_path / "f1", "c", trend=[{"session": "s3", "ts": 2, "tests": 1}])
+        for label, directory in (("chrome", "c1"), ("chrome", "c2"), ("firefox", "f1")):
+            merger.merge(label, str(tmp_path / directory))
+        merger.finish()
+        with open(os.path.join(merger.output, "flakiness-trend.json")) as f:
+            trend = json.load(f)
+        assert [(run["label"], run["session"]) for run in trend] == [
+            ("chrome", "s1"), ("firefox", "s3"), ("chrome", "s2")]
+
+    def test_missing_attachment_is_counted(self, tmp_path, merger):
+        write_results(tmp_path / "chrome", "a")
+        os.remove(tmp_path / "chrome" / "shot-attachment.png")
+        merger.merge("chrome", str(tmp_path / "chrome"))
+        assert merger.stats["missing_attachments"] == 1
+
+
+def test_parse_input():
+    assert parse_input("chrome=results/c") == ("chrome", "results/c")
+    assert parse_input("results/firefox/") == ("firefox", "results/firefox/")
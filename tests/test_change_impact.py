@@ -0,0 +1,130 @@
+import textwrap
+
+from utils.change_impact import (Changes, DependencyTracer, analyze, changed_tests, item_key, locator_symbols,
+                                 page_symbols, select)
+
+PAGE = textwrap.dedent('''\
+    from elements.el_home import HomeElements
+
+    TIMEOUT = 10
+
+
+    class HomePage:
+
+        def open(self):
+            self.navigate()
+
+        @step("Submit")
+        def submit(self):
+            return self.wait(TIMEOUT)
+
+        def read(self):
+            return self.text()
+    ''')
+
+ELEMENTS = textwrap.dedent('''\
+    class Header:
+        LOGO = ("css selector", ".logo")
+        MENU = ("id", "menu")
+
+
+    def helper():
+        pass
+    ''')
+
+TESTS = textwrap.dedent('''\
+    import pytest
+
+
+    class TestHome:
+
+        def test_logo(self):
+            pass
+
+        def test_menu(self):
+            pass
+
+
+    def test_module_level():
+        pass
+    ''')
+
+
+class TestDiffToSymbols:
+
+    def test_changed_method_body(self):
+        assert page_symbols(PAGE, {9}) == {"HomePage.open"}
+
+    def test_decorator_belongs_to_its_method(self):
+        assert page_symbols(PAGE, {11}) == {"HomePage.submit"}
+
+    def test_module_constant_selects_its_users(self):
+        assert page_symbols(PAGE, {3}) == {"HomePage.submit"}
+
+    def test_import_change_cannot_be_attributed(self):
+        assert page_symbols(PAGE, {1}) is None
+
+    def test_blank_lines_select_nothing(self):
+        assert page_symbols(PAGE, {4, 5}) == set()
+
+    def test_locator_lines(self):
+        assert locator_symbols(ELEMENTS, {3}) == {"Header.MENU"}
+        assert locator_symbols(ELEMENTS, {6}) is None
+
+    def test_changed_tests(self):
+        assert changed_tests("tests/test_x.py", TESTS, {6, 14}) == {
+            "tests/test_x.py::TestHome::test_logo", "tests/test_x.py::test_module_level"}
+        assert changed_tests("tests/test_x.py", TESTS, {1}) is None
+
+
+class TestAnalyzeAndSelect:
+
+    def test_files_outside_pages_select_everything(self, tmp_path):
+        changes = analyze({"utils/config.py": {1}, "README.md": {3}}, str(tmp_path))
+        assert changes.full == ["utils/config.py changed"]
+
+    def test_page_change_maps_to_symbols(self, tmp_path):
+        (tmp_path / "pages").mkdir()
+        (tmp_path / "pages" / "pg_home.py").write_text(PAGE)
+        changes = analyze({"pages/pg_home.py": {16}}, str(tmp_path))
+        assert changes.full == [] and changes.symbols == {"HomePage.read"}
+
+    def test_selection_reasons(self):
+        changes = Changes()
+        changes.symbols = {"HomePage.read"}
+        changes.tests = {"t.py::T::test_changed"}
+        dependency_map = {
+            "t.py::T::test_reads": {"symbols": ["HomePage.open", "HomePage.read"]},
+            "t.py::T::test_opens": {"symbols": ["HomePage.open"]},
+            "t.py::T::test_changed": {"symbols": []},
+            "t.py::T::test_safe": {"symbols": []},
+        }
+        keys = list(dependency_map) + ["t.py::T::test_new"]
+        assert select(keys, dependency_map, changes, safety=["t.py::T::test_safe"]) == {
+            "t.py::T::test_reads": "touches HomePage.read",
+            "t.py::T::test_changed": "test changed",
+            "t.py::T::test_safe": "safety set",
+            "t.py::T::test_new": "no recorded dependencies",
+        }
+
+
+class TestDependencyTracer:
+
+    def test_records_methods_and_locators_from_args_kwargs_and_lists(self):
+        class Page:
+            def click(self, locator, timeout=None):
+                pass
+
+            def all_visible(self, locators):
+                pass
+
+        tracer = DependencyTracer({("id", "menu"): ["Header.MENU"], (".", "logo"): ["Header.LOGO"]})
+        tracer.instrument(Page)
+        page = Page()
+        page.click(("id", "other"))
+        tracer.start("t.py::T::test_a[chrome]")
+        page.click(locator=("id", "menu"))
+        page.all_visible([(".", "logo")])
+        tracer.stop()
+        assert tracer.touched == {item_key("t.py::T::test_a[firefox]"): {
+            "Page.click", "Page.all_visible", "Header.MENU", "Header.LOGO"}}
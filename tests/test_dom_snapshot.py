@@ -0,0 +1,124 @@
+import pytest
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+
+from utils.dom_snapshot import DomSnapshot
+
+
+def el(tag, attrs=None, *children, visible=True, props=None):
+    return {"t": tag, "a": attrs or {}, "q": props or {}, "v": visible, "children": list(children)}
+
+
+def payload(root):
+    """Flatten a nested element tree into the preorder records SNAPSHOT_SCRIPT returns"""
+    nodes = []
+
+    def add(element, parent):
+        index = len(nodes)
+        node = {"t": element["t"], "a": element["a"], "q": element["q"], "p": parent, "c": [],
+                "v": element["v"], "r": [0, 0, 10, 10]}
+        nodes.append(node)
+        for child in element["children"]:
+            node["c"].append(child if isinstance(child, str) else add(child, index))
+        return index
+
+    add(root, -1)
+    return {"url": "https://example.test/id/", "title": "Example", "nodes": nodes}
+
+
+@pytest.fixture(scope="module")
+def snapshot():
+    return DomSnapshot(payload(
+        el("html", {},
+           el("head", {}, el("title", {}, "Example", visible=False), visible=False),
+           el("body", {},
+              el("div", {"id": "main", "class": "container wide"},
+                 el("h1", {"class": "tagline"}, "Turn  used oil\ninto value"),
+                 el("ul", {"class": "steps"},
+                    el("li", {"class": "step"}, "Collect"),
+                    el("li", {"class": "step active", "data-step": "2"}, "Deposit"),
+                    el("li", {"class": "step"}, "Earn", visible=False)),
+                 el("a", {"href": "/id/contact", "class": "cta"}, "Contact us"),
+                 el("form", {"id": "contact"},
+                    el("input", {"name": "email", "type": "email"}),
+                    el("input", {"name": "consent", "type": "checkbox"}, props={"checked": True}),
+                    el("button", {"type": "submit", "disabled": ""}, "Send"))),
+              el("footer", {},
+                 el("p", {}, "© 2024 noovoleum"),
+                 el("a", {"href": "https://instagram.com/noovoleum", "target": "_blank"}, "Instagram"))))))
+
+
+def texts(snapshot, by, value):
+    return [element.text for element in snapshot.find_elements((by, value))]
+
+
+class TestCssSelectors:
+
+    @pytest.mark.parametrize("selector, expected", [
+        ("li.step", ["Collect", "Deposit", ""]),
+        ("#main > ul > li.active", ["Deposit"]),
+        ("ul li:first-child", ["Collect"]),
+        ("li:nth-child(2n+1)", ["Collect", ""]),
+        ("li:not(.active)", ["Collect", ""]),
+        ("li.active + li", [""]),
+        ("h1 ~ a", ["Contact us"]),
+        ("footer a[href^='https://instagram']", ["Instagram"]),
+        ("a[target=_blank], .cta", ["Contact us", "Instagram"]),
+        ("div.container.wide h1", ["Turn used oil into value"]),
+        ("[data-step='2']", ["Deposit"]),
+        ("button:disabled", ["Send"]),
+    ])
+    def test_selector_matches(self, snapshot, selector, expected):
+        assert texts(snapshot, By.CSS_SELECTOR, selector) == expected
+
+    def test_checked_and_attribute_values(self, snapshot):
+        assert [e.get_attribute("name") for e in snapshot.find_elements((By.CSS_SELECTOR, "input:checked"))] == [
+            "consent"]
+        assert snapshot.get_attribute((By.CSS_SELECTOR, "form input"), "type") == "email"
+
+    def test_unsupported_pseudo_class_is_rejected(self, snapshot):
+        with pytest.raises(ValueError):
+            snapshot.find_elements((By.CSS_SELECTOR, "li:hover"))
+
+
+class TestXPath:
+
+    @pytest.mark.parametrize("expression, expected", [
+        ("//li[@class='step']", ["Collect", ""]),
+        ("//li[contains(@class, 'active')]", ["Deposit"]),
+        ("//ul/li[last()]", [""]),
+        ("//li[2]/following-sibling::li", [""]),
+        ("//li[3]/preceding-sibling::li", ["Collect", "Deposit"]),
+        ("//li[normalize-space()='Deposit']/ancestor::div[@id='main']/h1", ["Turn used oil into value"]),
+        ("//a[starts-with(@href, 'https://')]", ["Instagram"]),
+        ("//footer//a/parent::footer/p", ["© 2024 noovoleum"]),
+        ("//li[position() > 1 and not(@data-step)]", [""]),
+        ("(//a)[1]", ["Contact us"]),
+        ("//*[text()='Send']", ["Send"]),
+    ])
+    def test_expression_matches(self, snapshot, expression, expected):
+        assert texts(snapshot, By.XPATH, expression) == expected
+
+    def test_count_in_predicate(self, snapshot):
+        assert texts(snapshot, By.XPATH, "//ul[count(li) = 3]/li[1]") == ["Collect"]
+
+
+class TestSnapshotElements:
+
+    def test_other_locator_strategies(self, snapshot):
+        assert snapshot.get_text((By.ID, "main")).startswith("Turn used oil")
+        assert texts(snapshot, By.LINK_TEXT, "Contact us") == ["Contact us"]
+        assert texts(snapshot, By.PARTIAL_LINK_TEXT, "Insta") == ["Instagram"]
+        assert len(snapshot.find_elements((By.NAME, "email"))) == 1
+        assert len(snapshot.find_elements((By.CLASS_NAME, "step"))) == 3
+
+    def test_visibility_and_scoped_search(self, snapshot):
+        assert snapshot.is_displayed((By.CSS_SELECTOR, "li.active"))
+        assert not snapshot.is_displayed((By.XPATH, "//li[3]"))
+        steps = snapshot.find_element((By.CLASS_NAME, "steps"))
+        assert [e.text for e in steps.find_elements(By.TAG_NAME, "li")][:2] == ["Collect", "Deposit"]
+        assert steps.find_elements(By.TAG_NAME, "a") == []
+
+    def test_missing_element_raises(self, snapshot):
+        with pytest.raises(NoSuchElementException):
+            snapshot.get_text((By.ID, "missing"))
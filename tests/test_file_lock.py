@@ -0,0 +1,38 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from utils.file_lock import FileLock, lock_owner
+
+
+def dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+class TestFileLock:
+
+    def test_lock_records_owner_and_is_released(self, tmp_path):
+        path = str(tmp_path / "store.lock")
+        with FileLock(path):
+            assert lock_owner(path) == os.getpid()
+        assert not os.path.exists(path)
+
+    def test_lock_of_dead_owner_is_broken(self, tmp_path):
+        path = str(tmp_path / "store.lock")
+        with open(path, "w") as f:
+            f.write(str(dead_pid()))
+        with FileLock(path, timeout=1):
+            assert lock_owner(path) == os.getpid()
+
+    def test_live_owner_is_never_broken(self, tmp_path):
+        path = str(tmp_path / "store.lock")
+        with open(path, "w") as f:
+            f.write(str(os.getppid()))
+        with pytest.raises(TimeoutError):
+            with FileLock(path, timeout=0.2):
+                pass
+        assert lock_owner(path) == os.getppid()
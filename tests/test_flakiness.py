@@ -0,0 +1,42 @@
+import pytest
+
+from utils.config import Config
+from utils.flakiness import FlakeStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "QUARANTINE_MIN_RUNS", 5)
+    monkeypatch.setattr(Config, "QUARANTINE_THRESHOLD", 0.3)
+    store = FlakeStore(str(tmp_path / "flakiness.db"))
+    yield store
+    store.close()
+
+
+def record_sessions(store, nodeid, sessions):
+    """Each session is a string of attempt outcomes, e.g. 'FP' failed then passed on a rerun"""
+    for index, attempts in enumerate(sessions):
+        for attempt, outcome in enumerate(attempts, start=1):
+            store.record(f"s{index}", nodeid, "chrome", attempt, "passed" if outcome == "P" else "failed", 1.0)
+        store.record_session(f"s{index}", {})
+
+
+class TestFlakeStore:
+
+    def test_alternating_failures_are_not_flaky(self, store):
+        record_sessions(store, "t::alternating", ["P", "F", "P", "F", "P"])
+        stats = store.stats()["t::alternating"]
+        assert stats["flake_rate"] == 0
+        assert stats["outcome_changes"] == 4
+        assert store.quarantined() == {}
+
+    def test_passing_on_rerun_is_flaky(self, store):
+        record_sessions(store, "t::flaky", ["FP", "P", "FP", "P", "P"])
+        assert store.stats()["t::flaky"]["flake_rate"] == 0.4
+        assert store.quarantined() == {"t::flaky": 0.4}
+
+    def test_prune_keeps_the_latest_sessions(self, store):
+        record_sessions(store, "t::a", ["P"] * 6)
+        store.prune(keep=3)
+        assert store.stats()["t::a"]["sessions"] == 3
+        assert len(store.trend()) == 3
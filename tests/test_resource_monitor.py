@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from utils import resource_monitor as monitor_module
+from utils.config import Config
+from utils.resource_monitor import RecyclableDriver, ResourceMonitor
+
+
+class FakeDriver:
+
+    def __init__(self, windows=1, closable=True):
+        self.window_handles = [f"w{i}" for i in range(windows)]
+        self.current = self.window_handles[0]
+        self.closable = closable
+        self.switch_to = self
+        self.quit_count = 0
+
+    def window(self, handle):
+        self.current = handle
+
+    def close(self):
+        if not self.closable:
+            raise RuntimeError("window will not close")
+        self.window_handles.remove(self.current)
+
+    def execute_script(self, script):
+        return None
+
+    def quit(self):
+        self.quit_count += 1
+
+
+@pytest.fixture
+def monitor(tmp_path, monkeypatch):
+    monkeypatch.setattr(monitor_module, "driver_root_pid", lambda driver: None)
+    monkeypatch.setattr(Config, "RECYCLE_WINDOW_HANDLES", 3)
+    return ResourceMonitor("gw0", str(tmp_path))
+
+
+class TestResourceMonitor:
+
+    def test_leftover_windows_are_closed_instead_of_recycling(self, monitor):
+        driver = RecyclableDriver(lambda: FakeDriver(windows=5))
+        monitor.before_test(driver, "t::a")
+        assert monitor.after_test(driver, "t::a") is None
+        assert driver.window_handles == ["w0"] and driver.current == "w0"
+
+    def test_the_leak_is_still_recorded(self, monitor):
+        driver = FakeDriver()
+        monitor.before_test(driver, "t::a")
+        driver.window_handles += ["w1", "w2"]
+        monitor.after_test(driver, "t::a")
+        with open(monitor.path) as f:
+            end = [json.loads(line) for line in f][-1]
+        assert end["windows"] == 3 and end["delta"]["windows"] == 2
+
+    def test_windows_that_will_not_close_recycle(self, monitor):
+        driver = FakeDriver(windows=5, closable=False)
+        monitor.before_test(driver, "t::a")
+        assert monitor.after_test(driver, "t::a") == "5 open windows > 3"
+
+
+def test_recycle_replaces_the_wrapped_driver():
+    drivers = []
+    proxy = RecyclableDriver(lambda: drivers.append(FakeDriver()) or drivers[-1])
+    proxy.recycle("test")
+    assert proxy.wrapped_driver is drivers[1] and drivers[0].quit_count == 1
+    assert proxy.recycle_count == 1
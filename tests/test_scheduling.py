@@ -0,0 +1,78 @@
+import pytest
+
+from utils.scheduling import DurationHistory, allocate_workers, appended, browser_of, lpt_partition
+
+
+class TestAppended:
+
+    def test_samples_added_to_a_copy(self):
+        assert appended([1.0, 2.0], [1.0, 2.0, 3.0, 4.0]) == [3.0, 4.0]
+
+    def test_capped_copy_scrolled_off_the_front(self):
+        assert appended([1.0, 2.0, 3.0], [2.0, 3.0, 4.0]) == [4.0]
+
+    def test_nothing_added(self):
+        assert appended([1.0, 2.0], [1.0, 2.0]) == []
+
+    def test_unknown_base(self):
+        assert appended([], [5.0]) == [5.0]
+
+
+class TestDurationHistory:
+
+    def test_absorb_takes_only_what_each_shard_added(self, tmp_path):
+        base = DurationHistory(str(tmp_path / "base.json"))
+        base.record("t[chrome]", 1.0)
+        merged = DurationHistory(base.path)
+        merged.tests = {key: list(samples) for key, samples in base.tests.items()}
+        shards = []
+        for seconds in (2.0, 3.0):
+            shard = DurationHistory(base.path)
+            shard.tests = {key: list(samples) for key, samples in base.tests.items()}
+            shard.record("t[chrome]", seconds)
+            shards.append(shard)
+        for shard in shards:
+            merged.absorb(base, shard)
+        assert merged.tests["t[chrome]"] == [1.0, 2.0, 3.0]
+
+    def test_estimate_falls_back_to_the_browser_median(self, tmp_path):
+        history = DurationHistory(str(tmp_path / "durations.json"))
+        history.record("a[chrome]", 2.0)
+        history.record("b[chrome]", 4.0)
+        history.record("c[firefox]", 10.0)
+        assert history.estimate("a[chrome]", "chrome") == 2.0
+        assert history.estimate("new[chrome]", "chrome", ["chrome", "firefox"]) == 3.0
+
+    def test_save_round_trips(self, tmp_path):
+        history = DurationHistory(str(tmp_path / "history" / "durations.json"))
+        history.record("a[chrome]", 1.5)
+        history.record_startup("chrome", 3.0)
+        history.save()
+        loaded = DurationHistory(history.path)
+        assert loaded.tests == {"a[chrome]": [1.5]}
+        assert loaded.startup_estimate("chrome") == 3.0
+
+
+class TestPartition:
+
+    def test_browser_of_parametrized_ids(self):
+        assert browser_of("t.py::T::test_x[firefox]", ["chrome", "firefox"]) == "firefox"
+        assert browser_of("t.py::test_y", ["chrome", "firefox"]) == "chrome"
+
+    def test_longest_first_onto_least_loaded_bin(self):
+        entries = [(0, "chrome", 5.0), (1, "chrome", 4.0), (2, "chrome", 3.0), (3, "chrome", 3.0)]
+        plan = lpt_partition(entries, 2, {})
+        assert sorted(plan.loads) == [7.0, 8.0]
+        assert sorted(i for shard in plan.bins for i in shard) == [0, 1, 2, 3]
+
+    def test_startup_is_paid_once_per_bin_and_browser(self):
+        entries = [(0, "chrome", 5.0), (1, "chrome", 1.0), (2, "chrome", 1.0)]
+        plan = lpt_partition(entries, 2, {"chrome": 3.0})
+        assert plan.bins == [[0], [1, 2]]
+        assert plan.loads == [8.0, 5.0]
+
+    @pytest.mark.parametrize("workers", [1, 2, 5])
+    def test_every_browser_gets_a_worker(self, workers):
+        allocation = allocate_workers({"chrome": 30.0, "firefox": 10.0}, workers)
+        assert len(allocation) == workers
+        assert {browser for worker in allocation for browser in worker} == {"chrome", "firefox"}
@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+from utils.scheduling import DurationHistory
+from utils.sharding import digest, parse_shard, plan_shards, verify
+
+BROWSERS = ["chrome", "firefox"]
+NODEIDS = [f"tests/test_smoke_home.py::TestSmokeHome::test_{name}[{browser}]"
+           for name in ("load", "navigation", "contact", "footer", "journey") for browser in BROWSERS]
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = DurationHistory(str(tmp_path / "test_durations.json"))
+    for seconds, nodeid in enumerate(NODEIDS, start=1):
+        history.record(nodeid, float(seconds))
+    history.record_startup("chrome", 2.0)
+    history.record_startup("firefox", 4.0)
+    return history
+
+
+def manifests(history, total, nodeids=NODEIDS):
+    """The manifests every shard of a run writes (see ShardingPlugin.write_manifest)"""
+    ordered, plan = plan_shards(nodeids, total, history, BROWSERS)
+    history_digest = digest([json.dumps(history.tests, sort_keys=True)])
+    return [{"shard": index, "total": total, "collection_digest": digest(ordered), "history_digest": history_digest,
+             "collection": ordered, "selected": [ordered[i] for i in plan.bins[index - 1]]}
+            for index in range(1, total + 1)]
+
+
+class TestParseShard:
+
+    def test_valid_spec(self):
+        assert parse_shard(" 2/4 ") == (2, 4)
+
+    @pytest.mark.parametrize("value", ["0/2", "3/2", "1-2", "a/b", ""])
+    def test_invalid_spec(self, value):
+        with pytest.raises(pytest.UsageError):
+            parse_shard(value)
+
+
+class TestPlanShards:
+
+    @pytest.mark.parametrize("total", [1, 2, 3, 4])
+    def test_shards_partition_the_collection(self, history, total):
+        ordered, plan = plan_shards(NODEIDS, total, history, BROWSERS)
+        selected = [ordered[i] for shard in plan.bins for i in shard]
+        assert sorted(selected) == sorted(NODEIDS)
+        assert len(selected) == len(set(selected))
+
+    def test_plan_ignores_collection_order(self, history):
+        forward = plan_shards(NODEIDS, 3, history, BROWSERS)
+        backward = plan_shards(list(reversed(NODEIDS)), 3, history, BROWSERS)
+        assert forward[0] == backward[0]
+        assert forward[1].bins == backward[1].bins
+
+    def test_shards_are_balanced(self, history):
+        _, plan = plan_shards(NODEIDS, 2, history, BROWSERS)
+        assert plan.makespan - min(plan.loads) <= max(history.estimate(n, "chrome") for n in NODEIDS)
+
+
+class TestVerify:
+
+    def test_complete_shards_verify(self, history):
+        assert verify(manifests(history, 3)) == []
+
+    def test_missing_shard_leaves_tests_unrun(self, history):
+        problems = verify(manifests(history, 3)[:2])
+        assert "missing shards: [3]" in problems
+        assert any(problem.startswith("not run by any shard") for problem in problems)
+
+    def test_duplicate_shard_runs_tests_twice(self, history):
+        shards = manifests(history, 2)
+        problems = verify(shards + [shards[0]])
+        assert "duplicate manifests for shards: [1]" in problems
+        assert any(problem.startswith("run by shards [1, 1]") for problem in problems)
+
+    def test_different_collections_and_histories_are_reported(self, history, tmp_path):
+        first = manifests(history, 2)
+        other = DurationHistory(str(tmp_path / "other.json"))
+        second = manifests(other, 2, NODEIDS[:-1])
+        problems = verify([first[0], second[1]])
+        assert "shards collected different test sets" in problems
+        assert "shards planned from different duration histories" in problems
+
+    def test_no_manifests(self):
+        assert verify([]) == ["no shard manifests found"]
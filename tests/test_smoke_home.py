@@ -1,8 +1,10 @@
 import pytest
 import allure
 import time
+import json
 from pages.pg_home import HomePage
 from elements.el_home import HomeElements
+from utils.user_journey import journey_steps
 import logging
 
 logger = logging.getLogger(__name__)
@@ -104,7 +106,7 @@ class TestSmokeHome:
             assert all_valid, f"Process steps verification failed: {step_results}"
 
         with allure.step("Take screenshot of process steps"):
-            self.page.take_screenshot("ucollect_process_steps")
+            self.page.take_screenshot("ucollect_process_steps", locator=self.page.elements.UCOllectSection.SECTION_CONTAINER)
 
     @allure.story("App Download Links")
     @allure.severity(allure.severity_level.CRITICAL)
@@ -154,13 +156,13 @@ class TestSmokeHome:
                 driver.switch_to.window(original_windows[0])
 
         with allure.step("Take screenshot of app download section"):
-            self.page.take_screenshot("app_download_section")
+            self.page.take_screenshot("app_download_section", locator=self.page.elements.AppDownload.SECTION_CONTAINER)
 
     @allure.story("Contact Form")
     @allure.severity(allure.severity_level.CRITICAL)
     @pytest.mark.smoke
     @pytest.mark.critical
-    def test_contact_form_functionality(self, driver):
+    def test_contact_form_functionality(self, driver, contact_stub):
         """TC005: Verify contact form validation and submission"""
         with allure.step("Navigate to homepage"):
             self.page.navigate_to_homepage()
@@ -185,16 +187,49 @@ class TestSmokeHome:
 
             # Click send button
             self.page.click_send_message_button()
-            time.sleep(2)  # Wait for form processing
+            if contact_stub:
+                submission = contact_stub.wait_for_submission(1)
+                assert submission["fields"].get("userEmail") == self.elements.TestData.VALID_EMAIL, \
+                    f"Unexpected contact payload: {submission['body']}"
+            else:
+                time.sleep(2)  # Wait for form processing
 
         with allure.step("Test empty form submission"):
             self.page.clear_contact_form()
             self.page.click_send_message_button()
-            time.sleep(1)
+            if contact_stub:
+                with pytest.raises(TimeoutError):
+                    contact_stub.wait_for_submission(2, timeout=1)
+            else:
+                time.sleep(1)
 
         with allure.step("Take screenshot of contact form"):
             self.page.take_screenshot("contact_form_section")
 
+    @allure.story("Contact Form")
+    @allure.severity(allure.severity_level.NORMAL)
+    @pytest.mark.smoke
+    def test_contact_form_validation_matrix(self, driver, contact_stub):
+        """TC005b: Verify field validation for every invalid input case on a single page load"""
+        with allure.step("Navigate to homepage"):
+            self.page.navigate_to_homepage()
+            self.page.wait_for_preloader_to_disappear()
+
+        with allure.step("Scroll to contact section"):
+            self.page.scroll_to_contact_section()
+
+        with allure.step("Run validation cases"):
+            results = self.page.run_contact_validation_matrix()
+
+        with allure.step("Verify every case shows the expected errors"):
+            failures = {r['case']: r['mismatches'] for r in results if r['mismatches']}
+            assert not failures, f"Validation mismatches: {failures}"
+
+        if contact_stub:
+            with allure.step("Verify no invalid case reached the backend"):
+                assert contact_stub.submissions == [], \
+                    f"Invalid input was submitted: {[s['fields'] for s in contact_stub.submissions]}"
+
     @allure.story("Footer Information")
     @allure.severity(allure.severity_level.NORMAL)
     @pytest.mark.smoke
@@ -211,9 +246,11 @@ class TestSmokeHome:
             assert self.page.is_footer_logo_displayed(), "Footer logo is not displayed"
 
         with allure.step("Verify social media link URLs"):
-            assert self.page.verify_linkedin_link_url(), "LinkedIn URL is incorrect"
-            assert self.page.verify_instagram_link_url(), "Instagram URL is incorrect"
-            assert self.page.verify_email_link(), "Email link is incorrect"
+            # Read-only checks are answered from a single DOM snapshot
+            footer = self.page.static_view()
+            assert footer.verify_linkedin_link_url(), "LinkedIn URL is incorrect"
+            assert footer.verify_instagram_link_url(), "Instagram URL is incorrect"
+            assert footer.verify_email_link(), "Email link is incorrect"
 
         with allure.step("Test social media links"):
             original_windows = driver.window_handles
@@ -226,7 +263,7 @@ class TestSmokeHome:
                 driver.switch_to.window(original_windows[0])
 
         with allure.step("Verify copyright text"):
-            copyright_text = self.page.get_copyright_text()
+            copyright_text = footer.get_copyright_text()
             assert "2024" in copyright_text, f"Copyright year not found: {copyright_text}"
             assert "noovoleum" in copyright_text.lower(), f"Company name not in copyright: {copyright_text}"
 
@@ -236,6 +273,7 @@ class TestSmokeHome:
     @allure.story("Page Navigation and Scrolling")
     @allure.severity(allure.severity_level.NORMAL)
     @pytest.mark.smoke
+    @pytest.mark.screencast
     def test_navigation_and_scrolling(self, driver):
         """TC007: Verify smooth scrolling and navigation behavior"""
         with allure.step("Navigate to homepage"):
@@ -263,15 +301,22 @@ class TestSmokeHome:
     @allure.story("Performance and Loading")
     @allure.severity(allure.severity_level.NORMAL)
     @pytest.mark.smoke
-    def test_performance_and_loading(self, driver):
-        """TC008: Verify website performance and loading times"""
-        with allure.step("Navigate to homepage and measure load time"):
+    @pytest.mark.parametrize("cache_mode", ["cold", "warm"], indirect=True)
+    def test_performance_and_loading(self, driver, cache_mode):
+        """TC008: Verify website performance and loading times for first and repeat visits"""
+        with allure.step(f"Navigate to homepage ({cache_mode} cache) and measure load time"):
             start_time = time.time()
             self.page.navigate_to_homepage()
             self.page.wait_for_page_load()
             self.page.wait_for_preloader_to_disappear()
             load_time = time.time() - start_time
 
+        with allure.step("Record load metrics"):
+            metrics = dict(self.page.get_load_metrics(cache_mode), cache_mode=cache_mode,
+                           load_time_s=round(load_time, 3))
+            allure.attach(json.dumps(metrics, indent=2), name=f"Load metrics ({cache_mode} cache)",
+                          attachment_type=allure.attachment_type.JSON)
+
         with allure.step("Verify page loads within acceptable time"):
             assert load_time < 30, f"Page load time too slow: {load_time}s > 30s"
 
@@ -298,42 +343,16 @@ class TestE2EUserJourney:
     @allure.severity(allure.severity_level.CRITICAL)
     @pytest.mark.smoke
     @pytest.mark.critical
-    def test_complete_user_journey(self, driver):
-        """Test complete user journey from landing to contact form submission"""
-        with allure.step("User lands on homepage"):
-            self.page.navigate_to_homepage()
-            self.page.wait_for_preloader_to_disappear()
-            self.page.take_screenshot("user_lands_on_page")
+    @pytest.mark.screencast
+    def test_complete_user_journey(self, driver, contact_stub, checkpoints):
+        """Test complete user journey from landing to contact form submission
 
-        with allure.step("User reads main content and tagline"):
-            tagline = self.page.get_tagline_text()
-            description = self.page.get_description_text()
-            assert len(tagline) > 0 and len(description) > 0, "Main content not visible"
-
-        with allure.step("User scrolls to learn about UCOllect process"):
-            self.page.scroll_to_ucollect_section()
-            all_valid, _ = self.page.verify_all_process_steps()
-            assert all_valid, "UCOllect process steps not properly displayed"
-            self.page.take_screenshot("user_views_process_steps")
-
-        with allure.step("User checks mobile app download options"):
-            self.page.scroll_to_app_download_section()
-            assert self.page.is_app_store_button_displayed(), "App Store button not visible"
-            assert self.page.is_google_play_button_displayed(), "Google Play button not visible"
-            self.page.take_screenshot("user_views_app_download")
-
-        with allure.step("User decides to contact company"):
-            self.page.scroll_to_contact_section()
-            assert self.page.is_contact_form_displayed(), "Contact form not accessible"
-
-        with allure.step("User fills and submits contact form"):
-            self.page.submit_contact_form_with_test_data()
-            self.page.take_screenshot("user_submits_contact_form")
-
-        with allure.step("User checks company information in footer"):
-            self.page.scroll_to_footer_section()
-            assert self.page.is_footer_logo_displayed(), "Footer information not available"
-            self.page.take_screenshot("user_views_company_info")
+        Steps are checkpointed, so a rerun (--reruns) resumes at the step that failed.
+        """
+        checkpoints.after_navigation = self.page.wait_for_preloader_to_disappear
+        for title, step in journey_steps(self.page, self.elements.TestData.VALID_NAME, contact_stub,
+                                         screenshot=self.page.take_screenshot):
+            checkpoints.run(title, step)
 
         with allure.step("Complete user journey successful"):
             allure.attach(
@@ -341,3 +360,27 @@ class TestE2EUserJourney:
                 name="Journey Summary",
                 attachment_type=allure.attachment_type.TEXT
             )
+
+
+@allure.epic("Noovoleum Website Smoke Tests")
+@allure.feature("Cross-Browser Fan-Out")
+class TestCrossBrowserFanOut:
+    """Read-only checks run concurrently in every fan-out browser"""
+
+    @allure.story("Homepage Consistency")
+    @allure.severity(allure.severity_level.NORMAL)
+    @pytest.mark.smoke
+    def test_homepage_consistent_across_browsers(self, multi_driver):
+        """Homepage title, header and hero content match in every browser"""
+        def homepage_overview(driver):
+            page = HomePage(driver).navigate_to_homepage()
+            page.wait_for_preloader_to_disappear()
+            return {
+                "title": page.get_page_title(),
+                "logo_displayed": page.is_logo_displayed(),
+                "tagline": page.get_tagline_text()
+            }
+
+        result = multi_driver.run(homepage_overview)
+        assert not result.errors, f"Fan-out check failed:\n{result.summary()}"
+        assert not result.diff(), f"Browsers disagree:\n{result.summary()}"
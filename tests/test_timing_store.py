@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from utils.config import Config
+from utils.timing_store import TimingStore
+
+KEY = "visible:css=.tagline"
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "ADAPTIVE_TIMEOUTS", True)
+    monkeypatch.setattr(Config, "ADAPTIVE_MIN_SAMPLES", 5)
+    monkeypatch.setattr(Config, "ADAPTIVE_TIMEOUT_FLOOR", 2.0)
+    monkeypatch.setattr(Config, "TIMEOUT_SAFETY_FACTOR", 3.0)
+    return TimingStore(str(tmp_path / "wait_timings.json"))
+
+
+class TestEffectiveTimeout:
+
+    def test_learned_timeout_is_floored_and_capped(self, store):
+        for _ in range(10):
+            store.record("chrome", KEY, 0.3)
+        assert store.effective_timeout("chrome", KEY, 15) == 2.0
+        for _ in range(10):
+            store.record("chrome", KEY, 8.0)
+        assert store.effective_timeout("chrome", KEY, 15) == 15
+
+    def test_too_few_samples_use_the_ceiling(self, store):
+        store.record("chrome", KEY, 0.3)
+        assert store.effective_timeout("chrome", KEY, 15) == 15
+
+    def test_miss_after_long_history_uses_the_ceiling(self, store):
+        for _ in range(199):
+            store.record("chrome", KEY, 0.3)
+        assert store.effective_timeout("chrome", KEY, 15) == 2.0
+        store.miss("chrome", KEY, 2.0)
+        assert store.effective_timeout("chrome", KEY, 15) == 15
+
+    def test_timeout_is_relearned_after_a_miss(self, store):
+        for _ in range(20):
+            store.record("chrome", KEY, 0.3)
+        store.miss("chrome", KEY, 2.0)
+        for _ in range(4):
+            store.record("chrome", KEY, 1.5)
+        # Re-learned from the timed-out wait and the new samples, not from the old 0.3s history
+        assert 4.5 <= store.effective_timeout("chrome", KEY, 15) <= 6.0
+
+    def test_miss_only_affects_its_browser(self, store):
+        for browser in ("chrome", "firefox"):
+            for _ in range(10):
+                store.record(browser, KEY, 0.3)
+        store.miss("chrome", KEY, 2.0)
+        assert store.effective_timeout("firefox", KEY, 15) == 2.0
+
+    def test_saved_miss_replaces_the_stored_history(self, store):
+        for _ in range(20):
+            store.record("chrome", KEY, 0.3)
+        store.save()
+        store.miss("chrome", KEY, 2.0)
+        store.save()
+        with open(store.path) as f:
+            assert json.load(f)["chrome"][KEY] == [2.0]
+        assert TimingStore(store.path).effective_timeout("chrome", KEY, 15) == 15
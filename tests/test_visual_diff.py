@@ -0,0 +1,45 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+
+from utils import visual_diff
+from utils.config import Config
+from utils.visual_diff import compare, encode
+
+
+def page(height=64, width=64):
+    """A blocky, page-like image with enough structure for a stable perceptual hash"""
+    blocks = np.random.default_rng(7).integers(0, 256, (height // 8, width // 8, 3), dtype=np.uint8)
+    return blocks.repeat(8, axis=0).repeat(8, axis=1)
+
+
+class TestCompare:
+
+    def test_identical_bytes_are_not_decoded(self, monkeypatch):
+        monkeypatch.setattr(visual_diff, "decode", lambda png: pytest.fail("decoded identical bytes"))
+        assert compare(b"same-png", b"same-png", key="home").status == "identical"
+
+    def test_difference_inside_a_mask_is_identical(self):
+        current = page()
+        current[:8, :8] = 0
+        result = compare(encode(page()), encode(current), masks=[(0, 0, 8, 8)])
+        assert result.status == "identical"
+
+    def test_perceptually_different_image_skips_pixel_metrics(self, monkeypatch):
+        monkeypatch.setattr(visual_diff, "ssim", lambda a, b: pytest.fail("SSIM computed for a clear mismatch"))
+        result = compare(encode(page()), encode(page()[:, ::-1].copy()))
+        assert result.status == "mismatch"
+        assert result.metrics["phash_distance"] >= Config.VISUAL_PHASH_MISMATCH
+        assert result.heatmap_png is None
+
+    def test_small_change_gets_full_metrics(self):
+        current = page()
+        current[30:32, 30:32] = 255
+        result = compare(encode(page()), encode(current))
+        assert result.metrics["phash_distance"] < Config.VISUAL_PHASH_MISMATCH
+        assert "ssim" in result.metrics and result.heatmap_png is not None
+
+    def test_size_change_is_a_mismatch(self):
+        result = compare(encode(page()), encode(page(height=32)))
+        assert result.status == "mismatch" and "size" in result.metrics
@@ -0,0 +1,210 @@
+"""Merge Allure result directories from several CI jobs into one.
+
+Result and container JSON files are processed one at a time. Attachments are renamed to
+the SHA-256 of their content, so identical screenshots from different jobs are stored
+once, and every result is labelled with the browser (and worker, when known) it ran on.
+environment.properties files are merged key by key, and the flakiness trends of all
+inputs are concatenated with their label. A label may be given for several directories
+(the CI shards of one browser).
+
+Usage:
+    python -m utils.allure_merge --output allure-results-merged chrome=results/chrome firefox=results/firefox
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+RESULT_SUFFIXES = ("-result.json", "-container.json")
+FLAKINESS_TREND = "flakiness-trend.json"
+
+
+def content_name(path: str) -> str:
+    """Content-addressed attachment name, keeping the original extension"""
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            sha.update(chunk)
+    extension = os.path.splitext(path)[1]
+    return f"{sha.hexdigest()}-attachment{extension}"
+
+
+def iter_attachments(node) -> Iterator[dict]:
+    """Every attachment entry in a result or container, including those of nested steps"""
+    if isinstance(node, dict):
+        for attachment in node.get("attachments", ()):
+            yield attachment
+        for key in ("steps", "befores", "afters"):
+            for child in node.get(key, ()):
+                yield from iter_attachments(child)
+
+
+def read_properties(path: str) -> Dict[str, str]:
+    properties = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith(("#", "!")) and "=" in line:
+                key, value = line.split("=", 1)
+                properties[key.strip()] = value.strip()
+    return properties
+
+
+class AllureMerger:
+    """Streams several Allure result directories into one output directory"""
+
+    def __init__(self, output: str):
+        self.output = output
+        self.environment: Dict[str, Dict[str, str]] = {}
+        self.categories: Dict[str, dict] = {}
+        self.executor: Optional[dict] = None
+        self.trend: Dict[Tuple[str, str], dict] = {}
+        self.stats = {"results": 0, "containers": 0, "attachments": 0, "duplicates": 0,
+                      "bytes_saved": 0, "missing_attachments": 0}
+
+    def merge(self, label: str, directory: str) -> None:
+        """Merge one input directory, labelling its results with `label` (the browser)"""
+        if not os.path.isdir(directory):
+            logger.warning(f"Skipping missing results directory {directory}")
+            return
+        os.makedirs(self.output, exist_ok=True)
+        for entry in os.scandir(directory):
+            if not entry.is_file():
+                continue
+            if entry.name.endswith(RESULT_SUFFIXES):
+                self._merge_result(label, directory, entry)
+            elif entry.name == "environment.properties":
+                # Several inputs may share a label (shards of one browser); keep each one's properties
+                seen = sum(1 for key in self.environment if key == label or key.startswith(f"{label} #"))
+                key = f"{label} #{seen + 1}" if seen else label
+                self.environment[key] = read_properties(entry.path)
+            elif entry.name == "categories.json":
+                with open(entry.path) as f:
+                    for category in json.load(f):
+                        self.categories.setdefault(category.get("name"), category)
+            elif entry.name == FLAKINESS_TREND:
+                # Shards of one browser share history, so the same session can appear in both
+                with open(entry.path) as f:
+                    for run in json.load(f):
+                        self.trend.setdefault((label, run.get("session")), dict(run, label=label))
+            elif entry.name == "executor.json" and self.executor is None:
+                with open(entry.path) as f:
+                    self.executor = json.load(f)
+
+    def _merge_result(self, label: str, directory: str, entry: os.DirEntry) -> None:
+        with open(entry.path, encoding="utf-8") as f:
+            data = json.load(f)
+        renamed: Dict[str, str] = {}
+        for attachment in iter_attachments(data):
+            source = attachment.get("source")
+            if not source:
+                continue
+            if source not in renamed:
+                renamed[source] = self._store_attachment(os.path.join(directory, source))
+            if renamed[source]:
+                attachment["source"] = renamed[source]
+        if entry.name.endswith("-result.json"):
+            self._label(data, label)
+            self.stats["results"] += 1
+        else:
+            self.stats["containers"] += 1
+        target = os.path.join(self.output, entry.name)
+        if os.path.exists(target):
+            # Same uuid from another job: keep both instead of overwriting
+            target = os.path.join(self.output, f"{label}-{entry.name}")
+        with open(target, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+    def _store_attachment(self, path: str) -> Optional[str]:
+        if not os.path.isfile(path):
+            self.stats["missing_attachments"] += 1
+            return None
+        name = content_name(path)
+        target = os.path.join(self.output, name)
+        if os.path.exists(target):
+            self.stats["duplicates"] += 1
+            self.stats["bytes_saved"] += os.path.getsize(path)
+        else:
+            shutil.copyfile(path, target)
+            self.stats["attachments"] += 1
+        return name
+
+    @staticmethod
+    def _label(result: dict, browser: str) -> None:
+        labels = result.setdefault("labels", [])
+        names = {item.get("name") for item in labels}
+        if "browser" not in names:
+            labels.append({"name": "browser", "value": browser})
+        if "parentSuite" not in names:
+            labels.append({"name": "parentSuite", "value": browser})
+        worker = next((item["value"] for item in labels if item.get("name") == "worker"), None)
+        if worker and "host" not in names:
+            labels.append({"name": "host", "value": f"{browser}-{worker}"})
+
+    def finish(self) -> None:
+        """Write merged environment, categories, executor and flakiness trend files"""
+        if self.environment:
+            keys = sorted({key for properties in self.environment.values() for key in properties})
+            with open(os.path.join(self.output, "environment.properties"), "w", encoding="utf-8") as f:
+                for key in keys:
+                    values = {label: properties[key] for label, properties in self.environment.items()
+                              if key in properties}
+                    if len(set(values.values())) == 1:
+                        value = next(iter(values.values()))
+                    else:
+                        value = "; ".join(f"{label}: {v}" for label, v in sorted(values.items()))
+                    f.write(f"{key}={value}\n")
+        if self.categories:
+            with open(os.path.join(self.output, "categories.json"), "w") as f:
+                json.dump(list(self.categories.values()), f, indent=1)
+        if self.executor:
+            with open(os.path.join(self.output, "executor.json"), "w") as f:
+                json.dump(self.executor, f, indent=1)
+        if self.trend:
+            with open(os.path.join(self.output, FLAKINESS_TREND), "w") as f:
+                json.dump(sorted(self.trend.values(), key=lambda run: (run.get("ts", 0), run["label"])), f, indent=1)
+
+    def summary(self) -> str:
+        s = self.stats
+        return (f"{s['results']} results, {s['containers']} containers, {s['attachments']} attachments stored, "
+                f"{s['duplicates']} duplicates skipped ({s['bytes_saved'] / 1024:.0f} KiB saved), "
+                f"{s['missing_attachments']} missing")
+
+
+def parse_input(value: str) -> Tuple[str, str]:
+    """'chrome=path' -> ('chrome', 'path'); a bare path is labelled by its directory name"""
+    if "=" in value:
+        label, path = value.split("=", 1)
+        return label, path
+    return os.path.basename(os.path.normpath(value)), value
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Merge Allure result directories with attachment dedup")
+    parser.add_argument("inputs", nargs="+", help="Result directories as browser=path or path")
+    parser.add_argument("--output", required=True, help="Merged results directory")
+    parser.add_argument("--clean", action="store_true", help="Empty the output directory first")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if args.clean and os.path.isdir(args.output):
+        shutil.rmtree(args.output)
+    merger = AllureMerger(args.output)
+    for value in args.inputs:
+        label, path = parse_input(value)
+        merger.merge(label, path)
+        logger.info(f"Merged {path} as {label}")
+    merger.finish()
+    logger.info(merger.summary())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
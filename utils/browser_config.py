@@ -1,22 +1,32 @@
 from selenium import webdriver
-from webdriver_manager.chrome import ChromeDriverManager
-from webdriver_manager.firefox import GeckoDriverManager
-from webdriver_manager.microsoft import EdgeChromiumDriverManager
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.firefox.service import Service as FirefoxService
-from selenium.webdriver.edge.service import Service as EdgeService
-from selenium.webdriver.safari.webdriver import WebDriver as SafariDriver
+from selenium.webdriver.support.ui import WebDriverWait
+from utils.config import Config
+from utils.profile_templates import ProfileTemplates
+from utils.startup_report import startup_timer
+import importlib
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+# webdriver-manager backend and Selenium service module per browser, imported on first use:
+# the backends pull in requests and their own download machinery
+DRIVER_BACKENDS = {
+    "chrome": ("webdriver_manager.chrome", "ChromeDriverManager", "selenium.webdriver.chrome.service"),
+    "firefox": ("webdriver_manager.firefox", "GeckoDriverManager", "selenium.webdriver.firefox.service"),
+    "edge": ("webdriver_manager.microsoft", "EdgeChromiumDriverManager", "selenium.webdriver.edge.service"),
+}
+
 
 class BrowserManager:
     """Browser manager to create and configure WebDriver instances"""
 
-    def __init__(self, browser_name, headless=False):
+    def __init__(self, browser_name, headless=False, cache_mode="cold"):
         self.browser_name = browser_name.lower()
         self.headless = headless
+        # cold: the browser's own empty profile; warm: a copy of a profile template with a filled HTTP cache
+        self.cache_mode = cache_mode
+        self.profile_dir = None
 
     def get_browser_options(self):
         """Configure and return the appropriate WebDriver options based on the browser name and mode."""
@@ -46,6 +56,13 @@ class BrowserManager:
         else:
             options.add_argument("--start-maximized")
 
+        if self.profile_dir:
+            if self.browser_name == "firefox":
+                options.add_argument("-profile")
+                options.add_argument(self.profile_dir)
+            else:
+                options.add_argument(f"--user-data-dir={self.profile_dir}")
+
         # Chrome-specific options
         if self.browser_name == "chrome":
             options.add_argument("--disable-dev-shm-usage")
@@ -59,31 +76,68 @@ class BrowserManager:
 
     def create_webdriver(self):
         """Create and return a WebDriver instance based on the browser name."""
-        options = self.get_browser_options()
-
+        if self.cache_mode == "warm" and self.profile_dir is None:
+            if self.browser_name == "safari":
+                logger.warning("Safari profiles cannot be templated; starting with a cold cache")
+            else:
+                self.profile_dir = self.prepare_warm_profile()
+        driver = self._create_webdriver()
+        if self.cache_mode == "warm" and self.profile_dir:
+            self._release_profile_on_quit(driver, self.profile_dir)
+        return driver
+
+    def prepare_warm_profile(self):
+        """Copy of the browser's warm profile template, building the template first if needed"""
+        templates = ProfileTemplates()
+        templates.ensure(self.browser_name, self._build_profile_template)
+        return templates.instantiate(self.browser_name)
+
+    def _build_profile_template(self, directory):
+        """Load the warm-up URLs in a browser using `directory` as its profile, filling its disk cache"""
+        builder = BrowserManager(self.browser_name, self.headless)
+        builder.profile_dir = directory
+        driver = builder.create_webdriver()
         try:
-            if self.browser_name == "chrome":
-                driver = webdriver.Chrome(
-                    service=ChromeService(ChromeDriverManager().install()),
-                    options=options
-                )
+            driver.set_page_load_timeout(Config.PAGE_LOAD_TIMEOUT)
+            for url in Config.PROFILE_WARM_URLS:
+                driver.get(url)
+                WebDriverWait(driver, Config.PAGE_LOAD_TIMEOUT).until(
+                    lambda d: d.execute_script("return document.readyState") == "complete")
+                # Lazy-loaded assets below the fold only load once scrolled into view
+                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+                time.sleep(Config.PROFILE_WARM_SETTLE)
+        finally:
+            # Quitting flushes the cache index to disk
+            driver.quit()
+
+    @staticmethod
+    def _release_profile_on_quit(driver, profile_dir):
+        """Delete the driver's private profile copy once the browser has quit"""
+        quit_browser = driver.quit
+
+        def quit():
+            try:
+                quit_browser()
+            finally:
+                ProfileTemplates.release(profile_dir)
 
-            elif self.browser_name == "firefox":
-                driver = webdriver.Firefox(
-                    service=FirefoxService(GeckoDriverManager().install()),
-                    options=options
-                )
+        driver.quit = quit
+        driver.profile_dir = profile_dir
 
-            elif self.browser_name == "edge":
-                driver = webdriver.Edge(
-                    service=EdgeService(EdgeChromiumDriverManager().install()),
-                    options=options
-                )
+    def _create_webdriver(self):
+        options = self.get_browser_options()
+
+        try:
+            if self.browser_name in DRIVER_BACKENDS:
+                service = self.driver_service()
+                with startup_timer().phase("browser launch"):
+                    driver = self._webdriver_class()(service=service, options=options)
 
             elif self.browser_name == "safari":
                 if self.headless:
                     raise ValueError("Safari does not support headless mode")
-                driver = SafariDriver()
+                with startup_timer().phase("browser launch"):
+                    driver = webdriver.Safari()
 
             else:
                 raise ValueError(f"Unsupported browser: {self.browser_name}")
@@ -101,14 +155,9 @@ class BrowserManager:
             # Fallback: try without webdriver-manager
             try:
                 logger.info(f"Attempting fallback for {self.browser_name}...")
-                if self.browser_name == "chrome":
-                    driver = webdriver.Chrome(options=options)
-                elif self.browser_name == "firefox":
-                    driver = webdriver.Firefox(options=options)
-                elif self.browser_name == "edge":
-                    driver = webdriver.Edge(options=options)
-                else:
+                if self.browser_name not in DRIVER_BACKENDS:
                     raise e
+                driver = self._webdriver_class()(options=options)
 
                 logger.info(f"Fallback successful for {self.browser_name}")
                 return driver
@@ -120,4 +169,26 @@ class BrowserManager:
                     f"Original error: {str(e)}. "
                     f"Fallback error: {str(fallback_error)}. "
                     f"Please ensure {self.browser_name} browser is installed."
-                )
\ No newline at end of file
+                )
+
+    def _webdriver_class(self):
+        return {"chrome": webdriver.Chrome, "firefox": webdriver.Firefox, "edge": webdriver.Edge}[self.browser_name]
+
+    def driver_service(self):
+        """Selenium service for the browser's driver binary, resolved through webdriver-manager"""
+        manager_module, manager_class, service_module = DRIVER_BACKENDS[self.browser_name]
+        with startup_timer().phase("driver resolution"):
+            manager = getattr(importlib.import_module(manager_module), manager_class)
+            return importlib.import_module(service_module).Service(manager().install())
+
+    def attach_webdriver(self, debugger_address):
+        """Create a WebDriver session attached to an already running Chromium browser."""
+        if self.browser_name == "chrome":
+            options = webdriver.ChromeOptions()
+            options.debugger_address = debugger_address
+            return webdriver.Chrome(service=self.driver_service(), options=options)
+        if self.browser_name == "edge":
+            options = webdriver.EdgeOptions()
+            options.debugger_address = debugger_address
+            return webdriver.Edge(service=self.driver_service(), options=options)
+        raise ValueError(f"Attaching to a running browser is not supported for {self.browser_name}")
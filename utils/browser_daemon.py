@@ -0,0 +1,230 @@
+"""Keep browsers running between pytest invocations for fast local iteration.
+
+The daemon launches the configured browsers once and publishes their local WebDriver
+endpoints and session ids in a state file. `pytest --attach-daemon` then attaches the
+`driver` fixture to those sessions instead of resolving drivers and launching a browser,
+and the session is reset (cookies, storage, extra windows) on attach and on detach.
+
+Usage:
+    python -m utils.browser_daemon start --browsers chrome,firefox --sessions 2 --headless
+    python -m utils.browser_daemon status
+    python -m utils.browser_daemon stop
+"""
+import argparse
+import json
+import logging
+import os
+import signal
+import sys
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from selenium import webdriver
+from selenium.webdriver.chromium.remote_connection import ChromiumRemoteConnection
+from selenium.webdriver.remote.webdriver import WebDriver as RemoteWebDriver
+
+from utils.config import Config
+from utils.file_lock import pid_alive
+from utils.resource_monitor import close_extra_windows
+
+logger = logging.getLogger(__name__)
+
+OPTIONS = {'chrome': webdriver.ChromeOptions, 'edge': webdriver.EdgeOptions, 'firefox': webdriver.FirefoxOptions}
+VENDOR_PREFIX = {'chrome': 'goog', 'edge': 'ms'}
+CLEAR_STORAGE_SCRIPT = "try { localStorage.clear(); sessionStorage.clear(); } catch (e) {}"
+
+
+class AttachedDriver(RemoteWebDriver):
+    """WebDriver bound to an existing daemon session instead of creating a new one
+
+    quit() only resets and detaches; the daemon owns the browser.
+    """
+
+    def __init__(self, browser: str, entry: dict):
+        self._entry = entry
+        self.root_pid = entry.get('pid')
+        executor = entry['executor_url']
+        if browser in VENDOR_PREFIX:
+            # Chromium connections carry the vendor commands (CDP) the suite relies on
+            browser_name = OPTIONS[browser]().capabilities['browserName']
+            executor = ChromiumRemoteConnection(executor, VENDOR_PREFIX[browser], browser_name)
+        super().__init__(command_executor=executor, options=OPTIONS[browser]())
+
+    def start_session(self, capabilities: dict) -> None:
+        self.session_id = self._entry['session_id']
+        self.caps = self._entry['capabilities']
+
+    def execute_cdp_cmd(self, cmd: str, cmd_args: dict):
+        """Chrome DevTools command through the driver's vendor endpoint (Chromium only)"""
+        return self.execute("executeCdpCommand", {"cmd": cmd, "params": cmd_args})["value"]
+
+    def quit(self) -> None:
+        reset_session(self)
+        _release(self._entry)
+
+
+def reset_session(driver) -> None:
+    """Bring a reused session back to a clean state, keeping the HTTP cache warm"""
+    close_extra_windows(driver)
+    if urlparse(driver.current_url).scheme in ('http', 'https'):
+        driver.execute_script(CLEAR_STORAGE_SCRIPT)
+        driver.delete_all_cookies()
+    if driver.capabilities.get('browserName') in ('chrome', 'msedge', 'MicrosoftEdge'):
+        driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+        for url in (Config.BASE_URL, Config.ENGLISH_URL):
+            parts = urlparse(url)
+            driver.execute_cdp_cmd('Storage.clearDataForOrigin', {
+                'origin': f"{parts.scheme}://{parts.netloc}",
+                'storageTypes': 'cookies,local_storage,session_storage,indexeddb,service_workers'
+            })
+    driver.get('about:blank')
+
+
+def read_state() -> Dict[str, List[dict]]:
+    try:
+        with open(Config.DAEMON_STATE_PATH) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _lock_path(entry: dict) -> str:
+    return f"{Config.DAEMON_STATE_PATH}.{entry['session_id']}.lock"
+
+
+def _claim(entry: dict) -> bool:
+    """Take a session exclusively for this process; stale claims of dead processes are broken"""
+    path = _lock_path(entry)
+    for _ in range(2):
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                with open(path) as f:
+                    owner = int(f.read().strip() or 0)
+            except (FileNotFoundError, ValueError):
+                owner = 0
+            if owner and pid_alive(owner):
+                return False
+            _release(entry)
+            continue
+        with os.fdopen(fd, 'w') as f:
+            f.write(str(os.getpid()))
+        return True
+    return False
+
+
+def _release(entry: dict) -> None:
+    try:
+        os.remove(_lock_path(entry))
+    except FileNotFoundError:
+        pass
+
+
+def attach(browser: str) -> AttachedDriver:
+    """Attach to a free daemon session for the browser and reset it"""
+    if browser not in OPTIONS:
+        raise ValueError(f"The browser daemon does not support {browser}")
+    entries = read_state().get(browser)
+    if not entries:
+        raise RuntimeError(f"No daemon session for {browser}; run: python -m utils.browser_daemon start "
+                           f"--browsers {browser}")
+    # xdist workers prefer their own slot, then any free one
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "gw0")
+    start = int(worker[2:]) if worker[2:].isdigit() else 0
+    for offset in range(len(entries)):
+        entry = entries[(start + offset) % len(entries)]
+        if _claim(entry):
+            driver = AttachedDriver(browser, entry)
+            reset_session(driver)
+            logger.info(f"Attached to daemon {browser} session {entry['session_id']}")
+            return driver
+    raise RuntimeError(f"All {len(entries)} daemon {browser} sessions are in use; start more with --sessions")
+
+
+def serve(browsers: List[str], sessions: int, headless: bool) -> None:
+    """Launch the browsers, publish their sessions and wait until stopped"""
+    from utils.browser_config import BrowserManager
+
+    drivers, state = [], {'daemon_pid': os.getpid()}
+    stop = []
+    signal.signal(signal.SIGTERM, lambda *_: stop.append(True))
+    try:
+        for browser in browsers:
+            state[browser] = []
+            for _ in range(sessions):
+                driver = BrowserManager(browser, headless).create_webdriver()
+                drivers.append(driver)
+                state[browser].append({
+                    'executor_url': driver.service.service_url,
+                    'session_id': driver.session_id,
+                    'capabilities': driver.capabilities,
+                    'pid': driver.service.process.pid
+                })
+        os.makedirs(os.path.dirname(os.path.abspath(Config.DAEMON_STATE_PATH)), exist_ok=True)
+        with open(Config.DAEMON_STATE_PATH, 'w') as f:
+            json.dump(state, f, indent=1)
+        logger.info(f"Browser daemon ready: {', '.join(f'{b} x{sessions}' for b in browsers)} "
+                    f"(state in {Config.DAEMON_STATE_PATH})")
+        while not stop:
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception as e:
+                logger.error(f"Error quitting daemon browser: {str(e)}")
+        try:
+            os.remove(Config.DAEMON_STATE_PATH)
+        except FileNotFoundError:
+            pass
+        logger.info("Browser daemon stopped")
+
+
+def status() -> int:
+    state = read_state()
+    if not state:
+        print("Browser daemon is not running")
+        return 1
+    print(f"Browser daemon pid {state.get('daemon_pid')} "
+          f"({'alive' if pid_alive(state.get('daemon_pid', 0)) else 'dead'})")
+    for browser, entries in state.items():
+        if browser == 'daemon_pid':
+            continue
+        for entry in entries:
+            in_use = os.path.exists(_lock_path(entry))
+            print(f"  {browser} {entry['session_id']} at {entry['executor_url']}{' (in use)' if in_use else ''}")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Warm-browser daemon for fast local test runs")
+    commands = parser.add_subparsers(dest="command", required=True)
+    start = commands.add_parser("start", help="Launch browsers and keep them running (foreground)")
+    start.add_argument("--browsers", default=Config.DEFAULT_BROWSER, help="Comma-separated browsers")
+    start.add_argument("--sessions", type=int, default=1, help="Sessions per browser (one per xdist worker)")
+    start.add_argument("--headless", action="store_true", help="Run browsers headless")
+    commands.add_parser("status", help="Show published sessions")
+    commands.add_parser("stop", help="Stop a running daemon")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=getattr(logging, Config.LOG_LEVEL),
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if args.command == "start":
+        serve([b.strip() for b in args.browsers.split(",")], args.sessions, args.headless)
+        return 0
+    if args.command == "status":
+        return status()
+    pid = read_state().get('daemon_pid')
+    if not pid or not pid_alive(pid):
+        print("Browser daemon is not running")
+        return 1
+    os.kill(pid, signal.SIGTERM)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,375 @@
+"""Select the tests a change can affect from the page objects and locators they touched.
+
+While tests run, calls to HomePage/BasePage methods and the HomeElements locators passed to
+them are recorded per test into a dependency map. Given a git base, changed lines are mapped
+to methods, locators and tests; only tests that touched one of them, tests without recorded
+dependencies and the safety set (tests carrying Config.IMPACT_SAFETY_MARKERS) are selected.
+Changes that cannot be attributed (conftest, utils, requirements...) select everything.
+
+Usage:
+    pytest tests/ --changed-since origin/main
+    python -m utils.change_impact --base origin/main
+"""
+import argparse
+import ast
+import functools
+import inspect
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+import uuid
+from typing import Dict, Iterable, List, Optional, Set
+
+import pytest
+
+from utils.config import Config
+from utils.file_lock import FileLock
+
+logger = logging.getLogger(__name__)
+
+PAGE_FILES = ("pages/pg_home.py", "pages/__base.py")
+ELEMENTS_FILE = "elements/el_home.py"
+TESTS_DIR = "tests/"
+IGNORED_SUFFIXES = (".md",)
+IGNORED_PREFIXES = ("reports/",)
+HUNK = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+
+
+def item_key(nodeid: str) -> str:
+    """Node id without the browser parameter: dependencies are shared by all browsers"""
+    return nodeid.split("[", 1)[0]
+
+
+class DependencyTracer:
+    """Records which page-object methods and locators the running test touches"""
+
+    def __init__(self, locator_names: Dict[tuple, List[str]]):
+        self.locator_names = locator_names
+        self.current: Optional[str] = None
+        self.touched: Dict[str, Set[str]] = {}
+
+    def start(self, nodeid: str) -> None:
+        self.current = item_key(nodeid)
+        self.touched.setdefault(self.current, set())
+
+    def stop(self) -> None:
+        self.current = None
+
+    def _record(self, symbol: str, args: Iterable) -> None:
+        touched = self.touched[self.current]
+        touched.add(symbol)
+        for arg in args:
+            self._record_locators(touched, arg)
+
+    def _record_locators(self, touched: Set[str], arg) -> None:
+        """Record a (By, value) locator, or every locator inside a list or tuple of them"""
+        if isinstance(arg, tuple) and len(arg) == 2 and all(isinstance(a, str) for a in arg):
+            touched.update(self.locator_names.get(arg, ()))
+        elif isinstance(arg, (list, tuple)):
+            for item in arg:
+                self._record_locators(touched, item)
+
+    def instrument(self, cls) -> None:
+        """Wrap the methods defined on the class so calls are attributed to the current test"""
+        for name, value in list(vars(cls).items()):
+            if inspect.isfunction(value) and not name.startswith("__") and not hasattr(value, "__traced__"):
+                setattr(cls, name, self._traced(value, f"{cls.__name__}.{name}"))
+
+    def _traced(self, func, symbol: str):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if self.current is not None:
+                self._record(symbol, args[1:] + tuple(kwargs.values()))
+            return func(*args, **kwargs)
+
+        wrapper.__traced__ = True
+        return wrapper
+
+    def save(self, path: str, session: str) -> None:
+        """Merge this process's tests into the map; entries from other sessions are replaced"""
+        if not self.touched:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with FileLock(path + ".lock"):
+            tests = load_map(path)
+            for key, symbols in self.touched.items():
+                entry = tests.get(key)
+                if entry and entry.get("session") == session:
+                    symbols = symbols | set(entry["symbols"])
+                tests[key] = {"session": session, "symbols": sorted(symbols)}
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump({"tests": tests}, f, indent=1, sort_keys=True)
+            os.replace(tmp, path)
+
+
+def load_map(path: str) -> Dict[str, dict]:
+    try:
+        with open(path) as f:
+            return json.load(f).get("tests", {})
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable dependency map {path}: {str(e)}")
+        return {}
+
+
+class Changes:
+    """What a diff touches: page-object symbols, individual tests, whole test files, or everything"""
+
+    def __init__(self):
+        self.full: List[str] = []
+        self.symbols: Set[str] = set()
+        self.tests: Set[str] = set()
+        self.test_files: Set[str] = set()
+
+    def describe(self) -> str:
+        if self.full:
+            return f"full run ({'; '.join(self.full[:3])})"
+        return (f"{len(self.symbols)} page-object symbols, {len(self.tests)} tests, "
+                f"{len(self.test_files)} test files changed")
+
+
+def changed_lines(base: str, root: str = ".") -> Dict[str, Set[int]]:
+    """Changed line numbers of the working tree against the merge base with `base`, per file
+
+    Pure deletions are attributed to the lines on both sides of where they were removed.
+    """
+    merge_base = subprocess.run(["git", "merge-base", base, "HEAD"], cwd=root, capture_output=True, text=True)
+    if merge_base.returncode == 0:
+        base = merge_base.stdout.strip()
+    diff = subprocess.run(["git", "diff", "-U0", "--no-color", base, "--"], cwd=root,
+                          capture_output=True, text=True, check=True).stdout
+    changes: Dict[str, Set[int]] = {}
+    path = None
+    for line in diff.splitlines():
+        if line.startswith("+++ "):
+            path = None if line[4:] == "/dev/null" else line[6:]
+            if path is not None:
+                changes.setdefault(path, set())
+        elif line.startswith("--- a/"):
+            changes.setdefault(line[6:], set())
+        elif path is not None:
+            match = HUNK.match(line)
+            if match:
+                start, count = int(match.group(1)), int(match.group(2) or 1)
+                changes[path].update(range(start, start + count) if count else {max(start, 1), start + 1})
+    untracked = subprocess.run(["git", "ls-files", "--others", "--exclude-standard"], cwd=root,
+                               capture_output=True, text=True, check=True).stdout.split()
+    for path in untracked:
+        changes.setdefault(path, set())
+    return changes
+
+
+def _span(node) -> range:
+    start = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+    return range(start, node.end_lineno + 1)
+
+
+def page_symbols(source: str, lines: Set[int]) -> Optional[Set[str]]:
+    """Methods covering the changed lines, plus methods using changed module-level names
+
+    None when a change cannot be attributed (imports, class bodies outside methods).
+    """
+    tree = ast.parse(source)
+    symbols, names, methods = set(), set(), []
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            for item in node.body:
+                if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    methods.append((f"{node.name}.{item.name}", item))
+    for line in lines:
+        hit = [symbol for symbol, item in methods if line in _span(item)]
+        if hit:
+            symbols.update(hit)
+            continue
+        top = next((node for node in tree.body if line in _span(node)), None)
+        if top is None:
+            continue  # blank lines or comments between definitions
+        if isinstance(top, ast.Assign):
+            names.update(t.id for t in top.targets if isinstance(t, ast.Name))
+        else:
+            return None
+    for symbol, item in methods:
+        if names & {n.id for n in ast.walk(item) if isinstance(n, ast.Name)}:
+            symbols.add(symbol)
+    return symbols
+
+
+def locator_symbols(source: str, lines: Set[int]) -> Optional[Set[str]]:
+    """'Section.NAME' locators assigned on the changed lines; None for any other change"""
+    tree = ast.parse(source)
+    assignments = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ClassDef):
+            for item in node.body:
+                if isinstance(item, ast.Assign) and isinstance(item.value, ast.Tuple) \
+                        and len(item.value.elts) == 2:
+                    assignments.extend((f"{node.name}.{t.id}", item) for t in item.targets if isinstance(t, ast.Name))
+    top_level = [node for node in tree.body]
+    symbols = set()
+    for line in lines:
+        hit = [symbol for symbol, item in assignments if line in _span(item)]
+        if hit:
+            symbols.update(hit)
+        elif any(line in _span(node) for node in top_level):
+            return None
+    return symbols
+
+
+def changed_tests(path: str, source: str, lines: Set[int]) -> Optional[Set[str]]:
+    """Test keys ('file::Class::test') covering the changed lines; None for shared code"""
+    tree = ast.parse(source)
+    tests = []
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            tests.extend((f"{path}::{node.name}::{item.name}", item) for item in node.body
+                         if isinstance(item, ast.FunctionDef) and item.name.startswith("test"))
+        elif isinstance(node, ast.FunctionDef) and node.name.startswith("test"):
+            tests.append((f"{path}::{node.name}", node))
+    keys = set()
+    for line in lines:
+        hit = [key for key, item in tests if line in _span(item)]
+        if hit:
+            keys.update(hit)
+        elif any(line in _span(node) for node in tree.body):
+            return None
+    return keys
+
+
+def analyze(changes_by_file: Dict[str, Set[int]], root: str = ".") -> Changes:
+    """Attribute changed lines to symbols and tests"""
+    changes = Changes()
+    for path, lines in sorted(changes_by_file.items()):
+        if path.endswith(IGNORED_SUFFIXES) or path.startswith(IGNORED_PREFIXES):
+            continue
+        is_test = path.startswith(TESTS_DIR) and os.path.basename(path).startswith("test_") and path.endswith(".py")
+        if path not in PAGE_FILES and path != ELEMENTS_FILE and not is_test:
+            changes.full.append(f"{path} changed")
+            continue
+        full_path = os.path.join(root, path)
+        if not os.path.exists(full_path):
+            changes.full.append(f"{path} deleted")
+            continue
+        with open(full_path, encoding="utf-8") as f:
+            source = f.read()
+        if is_test:
+            found = changed_tests(path, source, lines)
+            if found is None:
+                changes.test_files.add(path)
+            else:
+                changes.tests.update(found)
+            continue
+        found = page_symbols(source, lines) if path in PAGE_FILES else locator_symbols(source, lines)
+        if found is None:
+            changes.full.append(f"{path} changed")
+        else:
+            changes.symbols.update(found)
+    return changes
+
+
+def select(keys: Iterable[str], dependency_map: Dict[str, dict], changes: Changes,
+           safety: Iterable[str] = ()) -> Dict[str, str]:
+    """Selected test keys with the reason each one was selected"""
+    if changes.full:
+        return {key: "full run" for key in keys}
+    selected = {}
+    safety = set(safety)
+    for key in keys:
+        entry = dependency_map.get(key)
+        touched = changes.symbols.intersection(entry["symbols"]) if entry else set()
+        if key in changes.tests:
+            selected[key] = "test changed"
+        elif key.split("::", 1)[0] in changes.test_files:
+            selected[key] = "test file changed"
+        elif entry is None:
+            selected[key] = "no recorded dependencies"
+        elif touched:
+            selected[key] = f"touches {', '.join(sorted(touched)[:3])}"
+        elif key in safety:
+            selected[key] = "safety set"
+    return selected
+
+
+class ChangeImpactPlugin:
+    """Traces dependencies during the run and, with --changed-since, deselects unaffected tests"""
+
+    def __init__(self, config, changed_since: Optional[str] = None):
+        self.config = config
+        self.changed_since = changed_since
+        self.session = os.environ.setdefault("CHANGE_IMPACT_SESSION", uuid.uuid4().hex)
+        self.tracer: Optional[DependencyTracer] = None
+
+    def _start_tracing(self) -> DependencyTracer:
+        """Instrument the page objects once the first test runs, not when the plugin loads"""
+        from elements.el_home import HomeElements
+        from pages.__base import BasePage
+        from pages.pg_home import HomePage
+
+        locator_names: Dict[tuple, List[str]] = {}
+        for name, locator in HomeElements.registry().items():
+            locator_names.setdefault(locator, []).append(name)
+        tracer = DependencyTracer(locator_names)
+        tracer.instrument(BasePage)
+        tracer.instrument(HomePage)
+        return tracer
+
+    def pytest_collection_modifyitems(self, config, items):
+        if not self.changed_since:
+            return
+        changes = analyze(changed_lines(self.changed_since, str(config.rootpath)), str(config.rootpath))
+        safety = {item_key(item.nodeid) for item in items
+                  if any(item.get_closest_marker(m) for m in Config.IMPACT_SAFETY_MARKERS)}
+        selected = select({item_key(item.nodeid) for item in items}, load_map(Config.DEPENDENCY_MAP_PATH),
+                          changes, safety)
+        keep = [item for item in items if item_key(item.nodeid) in selected]
+        deselected = [item for item in items if item_key(item.nodeid) not in selected]
+        if deselected:
+            config.hook.pytest_deselected(items=deselected)
+            items[:] = keep
+        logger.info(f"Change-based selection since {self.changed_since}: {changes.describe()}; "
+                    f"running {len(keep)} of {len(keep) + len(deselected)} tests")
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_protocol(self, item):
+        if not Config.TRACE_DEPENDENCIES:
+            yield
+            return
+        if self.tracer is None:
+            self.tracer = self._start_tracing()
+        self.tracer.start(item.nodeid)
+        yield
+        self.tracer.stop()
+
+    def pytest_sessionfinish(self, session):
+        if self.tracer is not None:
+            try:
+                self.tracer.save(Config.DEPENDENCY_MAP_PATH, self.session)
+            except OSError as e:
+                logger.error(f"Failed to save dependency map: {str(e)}")
+        if not hasattr(self.config, "workerinput"):
+            os.environ.pop("CHANGE_IMPACT_SESSION", None)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="List the tests affected by changes since a git base")
+    parser.add_argument("--base", required=True, help="Git revision to diff the working tree against")
+    parser.add_argument("--map", default=Config.DEPENDENCY_MAP_PATH, help="Recorded dependency map")
+    args = parser.parse_args(argv)
+
+    changes = analyze(changed_lines(args.base))
+    dependency_map = load_map(args.map)
+    print(f"# {changes.describe()}", file=sys.stderr)
+    if changes.full:
+        print("ALL")
+        return 0
+    for key, reason in sorted(select(dependency_map, dependency_map, changes).items()):
+        print(f"{key}  # {reason}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
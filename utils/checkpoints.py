@@ -0,0 +1,140 @@
+import json
+import logging
+from typing import Any, Callable, Dict, List, Optional
+import allure
+
+logger = logging.getLogger(__name__)
+
+# Page state a later step needs to resume: URL, scroll position and form values
+CAPTURE_STATE_SCRIPT = """
+var fields = [];
+document.querySelectorAll('input, textarea, select').forEach(function (el) {
+    if (['password', 'file', 'hidden', 'submit', 'button'].indexOf(el.type) >= 0) return;
+    var selector = el.id ? '#' + CSS.escape(el.id)
+        : el.name ? el.tagName.toLowerCase() + '[name="' + el.name + '"]' : null;
+    if (selector) fields.push({selector: selector, value: el.value, checked: !!el.checked});
+});
+return {url: location.href, scrollX: window.scrollX, scrollY: window.scrollY, fields: fields};
+"""
+
+RESTORE_STATE_SCRIPT = """
+var state = arguments[0];
+state.fields.forEach(function (field) {
+    var el = document.querySelector(field.selector);
+    if (!el) return;
+    if (el.type === 'checkbox' || el.type === 'radio') {
+        el.checked = field.checked;
+    } else {
+        var proto = el.tagName === 'TEXTAREA' ? HTMLTextAreaElement.prototype
+            : el.tagName === 'SELECT' ? HTMLSelectElement.prototype : HTMLInputElement.prototype;
+        Object.getOwnPropertyDescriptor(proto, 'value').set.call(el, field.value);
+    }
+    el.dispatchEvent(new Event('input', {bubbles: true}));
+    el.dispatchEvent(new Event('change', {bubbles: true}));
+});
+window.scrollTo(state.scrollX, state.scrollY);
+"""
+
+
+class Checkpoint:
+    """A passed step: its return value and, when restorable, the page state right after it"""
+
+    def __init__(self, title: str, attempt: int, value: Any, state: Optional[dict]):
+        self.title = title
+        self.attempt = attempt
+        self.value = value
+        self.state = state
+
+    @property
+    def restorable(self) -> bool:
+        return self.state is not None
+
+
+# nodeid -> checkpoints of passed steps in order; reruns happen in the same process
+_passed: Dict[str, List[Checkpoint]] = {}
+
+
+class Checkpoints:
+    """Runs a test's steps so that a rerun resumes at the failed step instead of the start
+
+    Steps that passed in an earlier attempt are reported but not executed again, up to the
+    nearest restorable checkpoint before the failure; its page state is restored and the
+    test continues from there.
+    """
+
+    def __init__(self, driver, nodeid: str, attempt: int = 1,
+                 after_navigation: Optional[Callable[[], Any]] = None):
+        self.driver = driver
+        self.nodeid = nodeid
+        self.attempt = attempt
+        self.after_navigation = after_navigation
+        if attempt <= 1:
+            _passed.pop(nodeid, None)
+        self._previous = _passed.get(nodeid, [])
+        self._resume_at = self._resume_index(self._previous)
+        self._index = 0
+        self.skipped: List[str] = []
+        _passed[nodeid] = list(self._previous[:self._resume_at])
+
+    @staticmethod
+    def _resume_index(previous: List[Checkpoint]) -> int:
+        """Index of the first step to execute: after the last restorable checkpoint"""
+        index = len(previous)
+        while index > 0 and not previous[index - 1].restorable:
+            index -= 1
+        return index
+
+    def run(self, title: str, step: Callable[[], Any], restorable: bool = True) -> Any:
+        """Run the step as an Allure step, or replay its recorded result on a resumed attempt
+
+        Non-restorable steps (e.g. ones that leave state a reload loses) are re-executed on resume.
+        """
+        index, self._index = self._index, self._index + 1
+        if index < self._resume_at and self._previous[index].title == title:
+            checkpoint = self._previous[index]
+            with allure.step(f"{title} (passed in attempt {checkpoint.attempt}, resumed)"):
+                self.skipped.append(title)
+            if index == self._resume_at - 1:
+                self._restore(checkpoint)
+            return checkpoint.value
+        if index < self._resume_at:
+            # The test's steps changed between attempts: stop replaying
+            logger.warning(f"Checkpoint mismatch at step {index} of {self.nodeid}; running from here")
+            self._resume_at = index
+            del _passed[self.nodeid][index:]
+            if index > 0 and self._previous[index - 1].restorable:
+                self._restore(self._previous[index - 1])
+        with allure.step(title):
+            value = step()
+        state = self._capture() if restorable else None
+        _passed[self.nodeid].append(Checkpoint(title, self.attempt, value, state))
+        return value
+
+    def _capture(self) -> Optional[dict]:
+        try:
+            return self.driver.execute_script(CAPTURE_STATE_SCRIPT)
+        except Exception as e:
+            logger.debug(f"Could not capture checkpoint state: {str(e)}")
+            return None
+
+    @allure.step("Restore checkpoint state")
+    def _restore(self, checkpoint: Checkpoint) -> None:
+        from pages.__base import BasePage
+
+        logger.info(f"Resuming {self.nodeid} after '{checkpoint.title}' at {checkpoint.state['url']}")
+        page = BasePage(self.driver)
+        page.navigate_to(checkpoint.state['url'])
+        page.wait_for_page_load()
+        if self.after_navigation:
+            self.after_navigation()
+        self.driver.execute_script(RESTORE_STATE_SCRIPT, checkpoint.state)
+
+    def finish(self, passed: bool) -> None:
+        """Attach retry metadata; a passed test forgets its checkpoints"""
+        if self.attempt > 1:
+            allure.dynamic.label("attempt", str(self.attempt))
+            allure.attach(json.dumps({'attempt': self.attempt, 'resumed_steps': self.skipped,
+                                      'resumed_from': self.skipped[-1] if self.skipped else None}, indent=2),
+                          name="Checkpoint resume", attachment_type=allure.attachment_type.JSON)
+        if passed:
+            _passed.pop(self.nodeid, None)
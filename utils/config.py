@@ -34,10 +34,111 @@ class Config:
     PAGE_LOAD_TIMEOUT = int(os.getenv('PAGE_LOAD_TIMEOUT', '30'))
     SCRIPT_TIMEOUT = int(os.getenv('SCRIPT_TIMEOUT', '30'))
 
+    # Adaptive timeouts: waits use learned p99 x safety factor, capped by the constants above
+    ADAPTIVE_TIMEOUTS = os.getenv('ADAPTIVE_TIMEOUTS', 'true').lower() == 'true'
+    TIMEOUT_SAFETY_FACTOR = float(os.getenv('TIMEOUT_SAFETY_FACTOR', '3.0'))
+    ADAPTIVE_TIMEOUT_FLOOR = float(os.getenv('ADAPTIVE_TIMEOUT_FLOOR', '2.0'))
+    ADAPTIVE_MIN_SAMPLES = int(os.getenv('ADAPTIVE_MIN_SAMPLES', '5'))
+    TIMING_STORE_PATH = os.getenv('TIMING_STORE_PATH', 'reports/history/wait_timings.json')
+
+    # Per-test durations recorded by the controller, used to plan parallel runs
+    RECORD_DURATIONS = os.getenv('RECORD_DURATIONS', 'true').lower() == 'true'
+    DURATION_HISTORY_PATH = os.getenv('DURATION_HISTORY_PATH', 'reports/history/test_durations.json')
+    SHARD_MANIFEST_PATH = os.getenv('SHARD_MANIFEST_PATH', 'reports/shards/')
+
+    # Fail immediately on locators the page contract found missing after navigation
+    CONTRACT_FAIL_FAST = os.getenv('CONTRACT_FAIL_FAST', 'true').lower() == 'true'
+
+    # Page-health circuit breaker: after consecutive error pages, fail fast and re-probe with exponential backoff
+    PAGE_HEALTH_BREAKER = os.getenv('PAGE_HEALTH_BREAKER', 'true').lower() == 'true'
+    BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', '2'))
+    BREAKER_BASE_BACKOFF = float(os.getenv('BREAKER_BASE_BACKOFF', '15'))
+    BREAKER_MAX_BACKOFF = float(os.getenv('BREAKER_MAX_BACKOFF', '240'))
+
+    # Browser resource monitor: recycle the session driver when a threshold is crossed between tests
+    RESOURCE_MONITOR = os.getenv('RESOURCE_MONITOR', 'true').lower() == 'true'
+    RESOURCE_MONITOR_PATH = os.getenv('RESOURCE_MONITOR_PATH', 'reports/resources/')
+    RECYCLE_RSS_MB = float(os.getenv('RECYCLE_RSS_MB', '2048'))
+    RECYCLE_WINDOW_HANDLES = int(os.getenv('RECYCLE_WINDOW_HANDLES', '3'))
+    RECYCLE_JS_HEAP_MB = float(os.getenv('RECYCLE_JS_HEAP_MB', '512'))
+
+    # Warm-browser daemon sessions published for `pytest --attach-daemon`
+    DAEMON_STATE_PATH = os.getenv('DAEMON_STATE_PATH', 'reports/daemon/sessions.json')
+
+    # Set text fields natively (input/change events) instead of typing keystroke by keystroke
+    FAST_INPUT = os.getenv('FAST_INPUT', 'true').lower() == 'true'
+
+    # Flakiness history: quarantine (xfail, non-blocking) flaky tests and budget reruns by time
+    FLAKE_TRACKING = os.getenv('FLAKE_TRACKING', 'true').lower() == 'true'
+    FLAKE_DB_PATH = os.getenv('FLAKE_DB_PATH', 'reports/history/flakiness.db')
+    FLAKE_WINDOW = int(os.getenv('FLAKE_WINDOW', '20'))
+    QUARANTINE_THRESHOLD = float(os.getenv('QUARANTINE_THRESHOLD', '0.3'))
+    QUARANTINE_MIN_RUNS = int(os.getenv('QUARANTINE_MIN_RUNS', '5'))
+    # Marking flaky tests xfail hides real failures, so it has to be turned on; critical tests never are
+    AUTO_QUARANTINE = os.getenv('AUTO_QUARANTINE', 'false').lower() == 'true'
+    FLAKE_HISTORY_SESSIONS = int(os.getenv('FLAKE_HISTORY_SESSIONS', '100'))
+    RETRY_BUDGET_SECONDS = float(os.getenv('RETRY_BUDGET_SECONDS', '0'))
+    MAX_RERUNS = int(os.getenv('MAX_RERUNS', '2'))
+
+    # Change-based selection: per-test page-object/locator dependencies traced at runtime
+    TRACE_DEPENDENCIES = os.getenv('TRACE_DEPENDENCIES', 'true').lower() == 'true'
+    DEPENDENCY_MAP_PATH = os.getenv('DEPENDENCY_MAP_PATH', 'reports/history/test_dependencies.json')
+    IMPACT_SAFETY_MARKERS = [m.strip() for m in os.getenv('IMPACT_SAFETY_MARKERS', 'critical').split(',') if m.strip()]
+
+    # Execution traces: off, on, or retain-on-failure (record always, keep only failed tests' traces)
+    TRACE_MODES = ('off', 'on', 'retain-on-failure')
+    TRACE_MODE = os.getenv('TRACE_MODE', 'off').lower()
+    TRACE_PATH = os.getenv('TRACE_PATH', 'reports/traces/')
+    TRACE_MAX_EVENTS = int(os.getenv('TRACE_MAX_EVENTS', '50000'))
+
+    # Screencast video of Chromium tabs, attached on failure: off, marked (@pytest.mark.screencast) or all
+    SCREENCAST = os.getenv('SCREENCAST', 'off').lower()
+    SCREENCAST_MAX_FRAMES = int(os.getenv('SCREENCAST_MAX_FRAMES', '600'))
+    SCREENCAST_MAX_MB = float(os.getenv('SCREENCAST_MAX_MB', '48'))
+    SCREENCAST_QUALITY = int(os.getenv('SCREENCAST_QUALITY', '60'))
+    SCREENCAST_MAX_WIDTH = int(os.getenv('SCREENCAST_MAX_WIDTH', '960'))
+    SCREENCAST_MAX_HEIGHT = int(os.getenv('SCREENCAST_MAX_HEIGHT', '960'))
+    SCREENCAST_MAX_FPS = float(os.getenv('SCREENCAST_MAX_FPS', '8'))
+
+    # OpenMetrics export of suite telemetry: per-worker files merged into suite.prom, optional scrape port
+    METRICS_EXPORT = os.getenv('METRICS_EXPORT', 'true').lower() == 'true'
+    METRICS_PATH = os.getenv('METRICS_PATH', 'reports/metrics/')
+    METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+    METRICS_FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', '15'))
+
+    # Per-process startup phase timings written with --startup-report
+    STARTUP_REPORT_PATH = os.getenv('STARTUP_REPORT_PATH', 'reports/startup/')
+
+    # Visual regression of take_screenshot() captures against baselines per test/browser/viewport
+    VISUAL_REGRESSION = os.getenv('VISUAL_REGRESSION', 'false').lower() == 'true'
+    VISUAL_UPDATE_BASELINES = os.getenv('VISUAL_UPDATE_BASELINES', 'false').lower() == 'true'
+    VISUAL_BASELINE_PATH = os.getenv('VISUAL_BASELINE_PATH', 'visual_baselines/')
+    VISUAL_PIXEL_TOLERANCE = int(os.getenv('VISUAL_PIXEL_TOLERANCE', '16'))
+    VISUAL_MAX_DIFF_RATIO = float(os.getenv('VISUAL_MAX_DIFF_RATIO', '0.002'))
+    VISUAL_MIN_SSIM = float(os.getenv('VISUAL_MIN_SSIM', '0.98'))
+    # Perceptual-hash bits (of 64) that fail a screenshot without per-pixel and SSIM comparison
+    VISUAL_PHASH_MISMATCH = int(os.getenv('VISUAL_PHASH_MISMATCH', '12'))
+
+    # Contact submissions go to a local stub unless pytest runs with --live-contact.
+    # Requests carrying the form's fields are routed; the pattern adds endpoint URLs to route.
+    CONTACT_ENDPOINT_PATTERN = os.getenv('CONTACT_ENDPOINT_PATTERN', '')
+    CONTACT_STUB_PORT = int(os.getenv('CONTACT_STUB_PORT', '0'))
+
     # Application URLs
     BASE_URL = os.getenv('BASE_URL', 'https://noovoleum.com/id/')
     ENGLISH_URL = os.getenv('ENGLISH_URL', 'https://noovoleum.com/')
 
+    # HTTP cache of new drivers: cold (empty profile) or warm (copy of a profile template)
+    CACHE_MODES = ('cold', 'warm')
+    CACHE_MODE = os.getenv('CACHE_MODE', 'cold').lower()
+    PROFILE_TEMPLATE_PATH = os.getenv('PROFILE_TEMPLATE_PATH', 'reports/profiles/')
+    PROFILE_TEMPLATE_MAX_AGE_HOURS = float(os.getenv('PROFILE_TEMPLATE_MAX_AGE_HOURS', '24'))
+    PROFILE_WARM_URLS = [u.strip() for u in os.getenv('PROFILE_WARM_URLS', BASE_URL).split(',') if u.strip()]
+    PROFILE_WARM_SETTLE = float(os.getenv('PROFILE_WARM_SETTLE', '2'))
+
+    # Synthetic-user load runner (python -m utils.load_runner --url <staging> | --mirror <dir>)
+    LOAD_REPORT_BUCKET_SECONDS = float(os.getenv('LOAD_REPORT_BUCKET_SECONDS', '10'))
+
     # Test Environment
     ENVIRONMENT = os.getenv('ENVIRONMENT', 'production')
     TEST_DATA_PATH = os.getenv('TEST_DATA_PATH', 'test_data/')
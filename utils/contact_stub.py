@@ -0,0 +1,223 @@
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+from urllib.parse import parse_qs, urlparse
+from utils.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+# Routes the contact form's submission (XHR, fetch or native form submit) to the stub.
+# A request counts as a contact submission when its body carries the form's field names,
+# or its URL matches the optional pattern. Safe to evaluate more than once per document.
+ROUTER_SCRIPT = """
+(function (stubUrl, pattern, fields) {
+    if (window.__contactStubRouter) return;
+    window.__contactStubRouter = true;
+    var matcher = pattern ? new RegExp(pattern, 'i') : null;
+    function isContact(url, body) {
+        if (matcher && matcher.test(String(url))) return true;
+        if (!body) return false;
+        if (typeof FormData !== 'undefined' && body instanceof FormData) {
+            return fields.some(function (f) { return body.has(f); });
+        }
+        var text = typeof body === 'string' ? body : (body instanceof URLSearchParams ? body.toString() : '');
+        return fields.some(function (f) { return text.indexOf(f) >= 0; });
+    }
+    function routed(url) {
+        return stubUrl + '?original=' + encodeURIComponent(new URL(url || location.href, location.href).href);
+    }
+
+    var open = XMLHttpRequest.prototype.open, send = XMLHttpRequest.prototype.send,
+        setHeader = XMLHttpRequest.prototype.setRequestHeader;
+    XMLHttpRequest.prototype.open = function () {
+        this.__stubOpen = Array.prototype.slice.call(arguments);
+        this.__stubHeaders = [];
+        return open.apply(this, arguments);
+    };
+    XMLHttpRequest.prototype.setRequestHeader = function (name, value) {
+        (this.__stubHeaders = this.__stubHeaders || []).push([name, value]);
+        return setHeader.apply(this, arguments);
+    };
+    XMLHttpRequest.prototype.send = function (body) {
+        var args = this.__stubOpen;
+        if (args && String(args[0]).toUpperCase() !== 'GET' && isContact(args[1], body)) {
+            args = args.slice();
+            args[1] = routed(args[1]);
+            open.apply(this, args);
+            for (var i = 0; i < this.__stubHeaders.length; i++) setHeader.apply(this, this.__stubHeaders[i]);
+        }
+        return send.apply(this, arguments);
+    };
+
+    if (window.fetch) {
+        var originalFetch = window.fetch;
+        window.fetch = function (input, init) {
+            var url = typeof input === 'string' ? input : input.url;
+            var method = (init && init.method) || (input && input.method) || 'GET';
+            if (method.toUpperCase() !== 'GET' && isContact(url, init && init.body)) {
+                return originalFetch.call(this, routed(url), init);
+            }
+            return originalFetch.apply(this, arguments);
+        };
+    }
+
+    function routeForm(form) {
+        if (fields.some(function (f) { return form.querySelector('[name="' + f + '"]'); })) {
+            form.action = routed(form.getAttribute('action'));
+            form.method = 'post';
+        }
+    }
+    var submit = HTMLFormElement.prototype.submit;
+    HTMLFormElement.prototype.submit = function () {
+        routeForm(this);
+        return submit.apply(this, arguments);
+    };
+    window.addEventListener('submit', function (event) {
+        if (!event.defaultPrevented) routeForm(event.target);
+    });
+})(%s, %s, %s);
+"""
+
+CONTACT_FIELDS = ['userName', 'userEmail', 'userMessage']
+
+
+class ContactStub:
+    """Local stand-in for the contact form backend
+
+    Records every submission for assertions and answers with a configurable status, body
+    and latency. Submissions are numbered from 1 in arrival order.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+        self._condition = threading.Condition()
+        self.submissions: List[dict] = []
+        self.respond()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/submit"
+
+    def start(self) -> 'ContactStub':
+        self._thread = threading.Thread(target=self._server.serve_forever, name="contact-stub", daemon=True)
+        self._thread.start()
+        logger.info(f"Contact stub listening on {self.url}")
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def respond(self, status: int = 200, body: str = '{"status": "success"}',
+                content_type: str = "application/json", latency: float = 0.0) -> 'ContactStub':
+        """Configure the response for subsequent submissions"""
+        self.response = {"status": status, "body": body, "content_type": content_type, "latency": latency}
+        return self
+
+    def reset(self) -> None:
+        """Forget recorded submissions and restore the default response"""
+        with self._condition:
+            self.submissions = []
+        self.respond()
+
+    def router_script(self) -> str:
+        """In-page script that sends contact submissions to this stub"""
+        return ROUTER_SCRIPT % (json.dumps(self.url), json.dumps(Config.CONTACT_ENDPOINT_PATTERN),
+                                json.dumps(CONTACT_FIELDS))
+
+    def wait_for_submission(self, n: int = 1, timeout: float = 10.0) -> dict:
+        """Block until submission number n (from 1) has arrived and return it"""
+        with self._condition:
+            if not self._condition.wait_for(lambda: len(self.submissions) >= n, timeout):
+                raise TimeoutError(f"Contact submission {n} not received within {timeout}s "
+                                   f"({len(self.submissions)} received)")
+            return self.submissions[n - 1]
+
+    def wait_for_field(self, field: str, value: str, timeout: float = 10.0) -> dict:
+        """Block until a submission whose form field has the given value has arrived and return it"""
+        def find():
+            return next((s for s in reversed(self.submissions) if s["fields"].get(field) == value), None)
+
+        with self._condition:
+            if not self._condition.wait_for(lambda: find() is not None, timeout):
+                raise TimeoutError(f"No contact submission with {field}={value!r} within {timeout}s "
+                                   f"({len(self.submissions)} received)")
+            return find()
+
+    def _record(self, submission: dict) -> None:
+        with self._condition:
+            submission["n"] = len(self.submissions) + 1
+            self.submissions.append(submission)
+            self._condition.notify_all()
+        logger.info(f"Contact stub received submission {submission['n']}: {submission['fields']}")
+
+
+def parse_body(body: bytes, content_type: str) -> dict:
+    """Form fields from an urlencoded, JSON or multipart body"""
+    text = body.decode("utf-8", errors="replace")
+    if "json" in content_type:
+        try:
+            return json.loads(text)
+        except ValueError:
+            return {}
+    if "multipart/form-data" in content_type and "boundary=" in content_type:
+        boundary = "--" + content_type.split("boundary=", 1)[1].strip('"')
+        fields = {}
+        for part in text.split(boundary):
+            if 'name="' in part and "\r\n\r\n" in part:
+                header, value = part.split("\r\n\r\n", 1)
+                fields[header.split('name="', 1)[1].split('"', 1)[0]] = value.rstrip("\r\n-")
+        return fields
+    return {key: values[-1] for key, values in parse_qs(text, keep_blank_values=True).items()}
+
+
+def _make_handler(stub: ContactStub):
+    class Handler(BaseHTTPRequestHandler):
+        def _cors(self):
+            self.send_header("Access-Control-Allow-Origin", self.headers.get("Origin") or "*")
+            self.send_header("Access-Control-Allow-Credentials", "true")
+            self.send_header("Access-Control-Allow-Methods", "POST, OPTIONS")
+            self.send_header("Access-Control-Allow-Headers",
+                             self.headers.get("Access-Control-Request-Headers") or "*")
+            # Chromium's Private Network Access preflight for public page -> loopback
+            self.send_header("Access-Control-Allow-Private-Network", "true")
+
+        def do_OPTIONS(self):
+            self.send_response(204)
+            self._cors()
+            self.end_headers()
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length)
+            content_type = self.headers.get("Content-Type", "")
+            query = parse_qs(urlparse(self.path).query)
+            stub._record({
+                "received_at": time.time(),
+                "original_url": query.get("original", [""])[0],
+                "content_type": content_type,
+                "body": body.decode("utf-8", errors="replace"),
+                "fields": parse_body(body, content_type)
+            })
+            response = stub.response
+            if response["latency"]:
+                time.sleep(response["latency"])
+            payload = response["body"].encode()
+            self.send_response(response["status"])
+            self._cors()
+            self.send_header("Content-Type", response["content_type"])
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            logger.debug(f"Contact stub: {format % args}")
+
+    return Handler
@@ -0,0 +1,202 @@
+"""Run several isolated tests concurrently inside one Chromium process.
+
+Each slot of the pool is a DevTools browser context (own window, cookies and storage)
+created with Target.createBrowserContext on a single host browser. Every context gets its
+own WebDriver session attached to that browser through its debugger address, so a thread
+per context can drive it independently.
+
+The benchmark compares memory per concurrent test against one browser per test:
+    python -m utils.context_pool --contexts 4 --rounds 2 --baseline
+"""
+import argparse
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.browser_config import BrowserManager
+from utils.config import Config
+from utils.process_stats import driver_root_pid, sample_tree
+
+logger = logging.getLogger(__name__)
+
+DEBUGGER_CAPABILITY = {'chrome': 'goog:chromeOptions', 'edge': 'ms:edgeOptions'}
+
+
+class BrowserContext:
+    """One isolated context of the host browser and the session attached to its window"""
+
+    def __init__(self, context_id: str, target_id: str, driver):
+        self.context_id = context_id
+        self.target_id = target_id
+        self.driver = driver
+
+
+class ContextPool:
+    """Fixed set of browser contexts in one host browser, leased to threads one at a time"""
+
+    def __init__(self, size: int, browser: str = "chrome", headless: bool = True):
+        if browser not in DEBUGGER_CAPABILITY:
+            raise ValueError(f"Browser contexts need a Chromium browser, not {browser}")
+        self.size = size
+        self.browser = browser
+        self.headless = headless
+        self.host = None
+        self.address: Optional[str] = None
+        self.contexts: List[BrowserContext] = []
+        self._free: "queue.Queue[BrowserContext]" = queue.Queue()
+        self._cdp_lock = threading.Lock()
+
+    def start(self) -> 'ContextPool':
+        manager = BrowserManager(self.browser, self.headless)
+        self.host = manager.create_webdriver()
+        self.address = self.host.capabilities[DEBUGGER_CAPABILITY[self.browser]]['debuggerAddress']
+        for _ in range(self.size):
+            context = self._open_context(manager.attach_webdriver(self.address))
+            self.contexts.append(context)
+            self._free.put(context)
+        logger.info(f"Context pool started: {self.size} contexts in one {self.browser} at {self.address}")
+        return self
+
+    def _open_context(self, driver) -> BrowserContext:
+        with self._cdp_lock:
+            context_id = self.host.execute_cdp_cmd('Target.createBrowserContext', {})['browserContextId']
+            target_id = self.host.execute_cdp_cmd('Target.createTarget', {
+                'url': 'about:blank', 'browserContextId': context_id, 'newWindow': True
+            })['targetId']
+        driver.switch_to.window(target_id)
+        driver.set_page_load_timeout(Config.PAGE_LOAD_TIMEOUT)
+        driver.set_script_timeout(Config.SCRIPT_TIMEOUT)
+        return BrowserContext(context_id, target_id, driver)
+
+    def reset(self, context: BrowserContext) -> None:
+        """Replace the context with a fresh one, dropping its cookies, storage and windows"""
+        with self._cdp_lock:
+            self.host.execute_cdp_cmd('Target.disposeBrowserContext', {'browserContextId': context.context_id})
+        fresh = self._open_context(context.driver)
+        context.context_id, context.target_id = fresh.context_id, fresh.target_id
+
+    @contextmanager
+    def lease(self):
+        """Borrow a context for one test; it is reset before it is handed out again"""
+        context = self._free.get()
+        try:
+            yield context.driver
+        finally:
+            try:
+                self.reset(context)
+            except Exception as e:
+                logger.error(f"Failed to reset browser context {context.context_id}: {str(e)}")
+            self._free.put(context)
+
+    def map(self, test: Callable[[Any], Any], count: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Run `test(driver)` `count` times (default: once per context), one thread per context"""
+        def run(index):
+            with self.lease() as driver:
+                start = time.perf_counter()
+                try:
+                    return {'index': index, 'result': test(driver), 'error': None,
+                            'seconds': round(time.perf_counter() - start, 3)}
+                except Exception as e:
+                    return {'index': index, 'result': None, 'error': f"{type(e).__name__}: {str(e)}",
+                            'seconds': round(time.perf_counter() - start, 3)}
+
+        with ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="context") as executor:
+            return list(executor.map(run, range(count or self.size)))
+
+    def memory(self) -> Optional[dict]:
+        """RSS of the host browser tree plus every attached driver service"""
+        roots = [self.host] + [context.driver for context in self.contexts]
+        samples = [sample_tree(pid) for pid in map(driver_root_pid, roots) if pid]
+        samples = [sample for sample in samples if sample]
+        if not samples:
+            return None
+        return {'rss_mb': round(sum(s['rss_mb'] for s in samples), 1),
+                'processes': sum(s['processes'] for s in samples)}
+
+    def stop(self) -> None:
+        for context in self.contexts:
+            try:
+                context.driver.quit()
+            except Exception as e:
+                logger.debug(f"Ignoring error detaching context session: {str(e)}")
+        if self.host is not None:
+            self.host.quit()
+        self.contexts, self.host = [], None
+
+
+def smoke_check(driver) -> dict:
+    """Read-only homepage check used by the benchmark"""
+    from pages.pg_home import HomePage
+    page = HomePage(driver).navigate_to_homepage()
+    page.wait_for_preloader_to_disappear()
+    return {'title': page.get_page_title(), 'logo': page.is_logo_displayed()}
+
+
+def baseline_memory(count: int, browser: str, headless: bool) -> Optional[dict]:
+    """Memory of `count` separate browsers running the same check, one per test"""
+    drivers = []
+    try:
+        for _ in range(count):
+            drivers.append(BrowserManager(browser, headless).create_webdriver())
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            list(executor.map(smoke_check, drivers))
+        samples = [sample_tree(pid) for pid in map(driver_root_pid, drivers) if pid]
+        samples = [sample for sample in samples if sample]
+        return {'rss_mb': round(sum(s['rss_mb'] for s in samples), 1)} if samples else None
+    finally:
+        for driver in drivers:
+            driver.quit()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark concurrent tests in browser contexts")
+    parser.add_argument("--browser", default="chrome", choices=sorted(DEBUGGER_CAPABILITY))
+    parser.add_argument("--contexts", type=int, default=4, help="Concurrent contexts in the host browser")
+    parser.add_argument("--rounds", type=int, default=1, help="Checks per context")
+    parser.add_argument("--headed", action="store_true", help="Show the browser window")
+    parser.add_argument("--baseline", action="store_true", help="Also measure one browser per test")
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=getattr(logging, Config.LOG_LEVEL),
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    pool = ContextPool(args.contexts, args.browser, headless=not args.headed).start()
+    try:
+        start = time.perf_counter()
+        results = pool.map(smoke_check, args.contexts * args.rounds)
+        elapsed = time.perf_counter() - start
+        memory = pool.memory()
+    finally:
+        pool.stop()
+
+    report = {
+        'browser': args.browser,
+        'contexts': args.contexts,
+        'tests': len(results),
+        'failed': [r for r in results if r['error']],
+        'wall_seconds': round(elapsed, 2),
+        'test_seconds': [r['seconds'] for r in results],
+        'contexts_rss_mb': memory and memory['rss_mb'],
+        'rss_mb_per_concurrent_test': memory and round(memory['rss_mb'] / args.contexts, 1)
+    }
+    if args.baseline:
+        baseline = baseline_memory(args.contexts, args.browser, not args.headed)
+        report['baseline_rss_mb'] = baseline and baseline['rss_mb']
+        report['baseline_rss_mb_per_test'] = baseline and round(baseline['rss_mb'] / args.contexts, 1)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    return 1 if report['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1009 @@
+import re
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import NoSuchElementException
+
+logger = logging.getLogger(__name__)
+
+
+# Serializes the whole document in one round trip. Every element becomes a flat record:
+# t=tag, a=raw attributes, q=DOM properties WebDriver reports instead of attributes,
+# p=parent index, c=children (element indexes and text strings), v=visible, r=bounding box.
+SNAPSHOT_SCRIPT = """
+return (function () {
+    var SKIP_TEXT = {script: 1, style: 1, noscript: 1, template: 1};
+    var PROPS = ['href', 'src', 'value', 'checked', 'selected'];
+    var nodes = [];
+    var stack = [[document.documentElement, -1, true]];
+    while (stack.length) {
+        var entry = stack.pop(), el = entry[0], parent = entry[1], parentVisible = entry[2];
+        if (typeof el === 'string') {
+            nodes[parent].c.push(el);
+            continue;
+        }
+        var tag = el.localName, attrs = {}, props = {};
+        for (var i = 0; i < el.attributes.length; i++) {
+            attrs[el.attributes[i].name] = el.attributes[i].value;
+        }
+        for (var j = 0; j < PROPS.length; j++) {
+            var prop = el[PROPS[j]];
+            if (prop !== undefined && prop !== null && typeof prop !== 'object') props[PROPS[j]] = prop;
+        }
+        var style = window.getComputedStyle(el), rect = el.getBoundingClientRect();
+        var shown = parentVisible && style.display !== 'none' && tag !== 'head' &&
+            !(tag === 'input' && (el.type || '').toLowerCase() === 'hidden');
+        var visible = shown && style.visibility !== 'hidden' && style.visibility !== 'collapse' &&
+            parseFloat(style.opacity || '1') > 0 && rect.width > 0 && rect.height > 0;
+        var index = nodes.length;
+        nodes.push({
+            t: tag, a: attrs, q: props, p: parent, c: [], v: visible,
+            r: [rect.left + window.scrollX, rect.top + window.scrollY, rect.width, rect.height]
+        });
+        if (parent >= 0) nodes[parent].c.push(index);
+        // Children go on the stack in reverse so text and elements land in document order.
+        for (var k = el.childNodes.length - 1; k >= 0; k--) {
+            var child = el.childNodes[k];
+            if (child.nodeType === 1) {
+                stack.push([child, index, shown]);
+            } else if (child.nodeType === 3 && !SKIP_TEXT[tag]) {
+                stack.push([child.nodeValue, index, shown]);
+            }
+        }
+    }
+    return {url: location.href, title: document.title, nodes: nodes};
+})();
+"""
+
+# Elements whose rendered text starts on a new line, mirroring WebDriver's visible-text rules
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt', 'fieldset',
+    'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header',
+    'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre', 'section', 'table', 'tr', 'ul'
+}
+
+
+class SnapshotElement:
+    """Read-only stand-in for a WebElement, answered from a DomSnapshot"""
+
+    def __init__(self, snapshot: 'DomSnapshot', index: int):
+        self._snapshot = snapshot
+        self.index = index
+
+    @property
+    def tag_name(self) -> str:
+        return self._snapshot._tags[self.index]
+
+    @property
+    def text(self) -> str:
+        return self._snapshot._visible_text(self.index)
+
+    @property
+    def rect(self) -> Dict[str, float]:
+        x, y, width, height = self._snapshot._rects[self.index]
+        return {'x': x, 'y': y, 'width': width, 'height': height}
+
+    @property
+    def location(self) -> Dict[str, float]:
+        rect = self.rect
+        return {'x': rect['x'], 'y': rect['y']}
+
+    @property
+    def size(self) -> Dict[str, float]:
+        rect = self.rect
+        return {'width': rect['width'], 'height': rect['height']}
+
+    def get_attribute(self, name: str) -> Optional[str]:
+        """Return the property WebDriver would report, falling back to the raw attribute"""
+        props = self._snapshot._props[self.index]
+        if name in props:
+            value = props[name]
+            if isinstance(value, bool):
+                return 'true' if value else None
+            return str(value)
+        return self._snapshot._attrs[self.index].get(name)
+
+    def get_dom_attribute(self, name: str) -> Optional[str]:
+        """Return the raw attribute value as written in the markup"""
+        return self._snapshot._attrs[self.index].get(name)
+
+    def is_displayed(self) -> bool:
+        return self._snapshot._visible[self.index]
+
+    def find_element(self, by: str = By.ID, value: Optional[str] = None) -> 'SnapshotElement':
+        return self._snapshot._first((by, value), scope=self.index)
+
+    def find_elements(self, by: str = By.ID, value: Optional[str] = None) -> List['SnapshotElement']:
+        return self._snapshot._wrap(self._snapshot._query(by, value, scope=self.index))
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, SnapshotElement) and other._snapshot is self._snapshot and other.index == self.index
+
+    def __hash__(self) -> int:
+        return hash((id(self._snapshot), self.index))
+
+    def __repr__(self) -> str:
+        return f"<SnapshotElement {self.tag_name} #{self.index}>"
+
+
+class DomSnapshot:
+    """Offline view of a page captured by BasePage.snapshot().
+
+    Answers get_text, get_attribute, is_displayed and find_elements with the same
+    signatures as BasePage, using a local CSS and XPath engine over indexed nodes.
+    """
+
+    def __init__(self, payload: Dict[str, Any]):
+        self.url = payload.get('url', '')
+        self.title = payload.get('title', '')
+        nodes = payload.get('nodes') or []
+
+        self._tags = [node['t'] for node in nodes]
+        self._attrs = [node.get('a') or {} for node in nodes]
+        self._props = [node.get('q') or {} for node in nodes]
+        self._parents = [node.get('p', -1) for node in nodes]
+        self._children = [node.get('c') or [] for node in nodes]
+        self._visible = [bool(node.get('v')) for node in nodes]
+        self._rects = [tuple(node.get('r') or (0, 0, 0, 0)) for node in nodes]
+        self._classes = [attrs.get('class', '').split() for attrs in self._attrs]
+        self._element_children = [[c for c in children if isinstance(c, int)] for children in self._children]
+
+        self._build_indexes()
+        self._text_cache: Dict[int, str] = {}
+        self._content_cache: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._tags)
+
+    def _build_indexes(self) -> None:
+        """Index nodes by id, tag and class, and record preorder subtree ranges"""
+        self._by_id: Dict[str, List[int]] = {}
+        self._by_tag: Dict[str, List[int]] = {}
+        self._by_class: Dict[str, List[int]] = {}
+        for index, tag in enumerate(self._tags):
+            self._by_tag.setdefault(tag, []).append(index)
+            element_id = self._attrs[index].get('id')
+            if element_id:
+                self._by_id.setdefault(element_id, []).append(index)
+            for class_name in self._classes[index]:
+                self._by_class.setdefault(class_name, []).append(index)
+
+        # Nodes arrive in preorder, so a subtree is the contiguous range [index, end]
+        self._subtree_end = list(range(len(self._tags)))
+        for index in range(len(self._tags) - 1, -1, -1):
+            parent = self._parents[index]
+            if parent >= 0 and self._subtree_end[index] > self._subtree_end[parent]:
+                self._subtree_end[parent] = self._subtree_end[index]
+
+        self._sibling_position = [0] * len(self._tags)
+        self._type_position = [0] * len(self._tags)
+        for children in self._element_children:
+            type_counts: Dict[str, int] = {}
+            for position, child in enumerate(children, start=1):
+                self._sibling_position[child] = position
+                tag = self._tags[child]
+                type_counts[tag] = type_counts.get(tag, 0) + 1
+                self._type_position[child] = type_counts[tag]
+
+    # Public API mirroring BasePage
+    def find_elements(self, locator: tuple, timeout: int = None) -> List[SnapshotElement]:
+        """Find all elements matching the locator"""
+        by, value = locator
+        return self._wrap(self._query(by, value))
+
+    def find_element(self, locator: tuple) -> SnapshotElement:
+        """Find the first element matching the locator"""
+        return self._first(locator)
+
+    def get_text(self, locator: tuple) -> str:
+        """Get visible text from the first matching element"""
+        return self._first(locator).text
+
+    def get_attribute(self, locator: tuple, attribute: str) -> Optional[str]:
+        """Get attribute value from the first matching element"""
+        return self._first(locator).get_attribute(attribute)
+
+    def is_displayed(self, locator: tuple, timeout: int = None) -> bool:
+        """Check if the first matching element was visible when the snapshot was taken"""
+        matches = self._query(*locator)
+        return bool(matches) and self._visible[matches[0]]
+
+    # Query helpers
+    def _wrap(self, indexes: List[int]) -> List[SnapshotElement]:
+        return [SnapshotElement(self, index) for index in indexes]
+
+    def _first(self, locator: tuple, scope: Optional[int] = None) -> SnapshotElement:
+        by, value = locator
+        matches = self._query(by, value, scope=scope)
+        if not matches:
+            raise NoSuchElementException(f"No element in DOM snapshot of {self.url} matches {locator}")
+        return SnapshotElement(self, matches[0])
+
+    def _query(self, by: str, value: str, scope: Optional[int] = None) -> List[int]:
+        if by == By.XPATH:
+            return _XPathEngine(self).select(value, scope)
+        if by == By.ID:
+            candidates = self._by_id.get(value, [])
+        elif by == By.CLASS_NAME:
+            candidates = self._by_class.get(value, [])
+        elif by == By.TAG_NAME:
+            candidates = self._by_tag.get(value.lower(), [])
+        elif by == By.NAME:
+            candidates = [i for i in range(len(self._tags)) if self._attrs[i].get('name') == value]
+        elif by in (By.LINK_TEXT, By.PARTIAL_LINK_TEXT):
+            candidates = [i for i in self._by_tag.get('a', [])
+                          if (self._visible_text(i) == value.strip() if by == By.LINK_TEXT
+                              else value in self._visible_text(i))]
+        elif by == By.CSS_SELECTOR:
+            return _CssEngine(self).select(value, scope)
+        else:
+            raise ValueError(f"Unsupported locator strategy for DOM snapshot: {by}")
+        return [i for i in candidates if scope is None or self._is_descendant(i, scope)]
+
+    def _is_descendant(self, index: int, ancestor: int) -> bool:
+        return ancestor < index <= self._subtree_end[ancestor]
+
+    def _text_content(self, index: int) -> str:
+        """All descendant text regardless of visibility (XPath string-value)"""
+        if index not in self._content_cache:
+            parts = []
+            for child in self._children[index]:
+                parts.append(self._text_content(child) if isinstance(child, int) else child)
+            self._content_cache[index] = ''.join(parts)
+        return self._content_cache[index]
+
+    def _visible_text(self, index: int) -> str:
+        """Rendered text of an element, approximating WebElement.text"""
+        if index not in self._text_cache:
+            if not self._visible[index] and not self._has_visible_descendant(index):
+                self._text_cache[index] = ''
+            else:
+                lines = ''.join(self._collect_text(index)).split('\n')
+                cleaned = [re.sub(r'[ \t\r\f\v ]+', ' ', line).strip() for line in lines]
+                self._text_cache[index] = '\n'.join(line for line in cleaned if line)
+        return self._text_cache[index]
+
+    def _has_visible_descendant(self, index: int) -> bool:
+        return any(self._visible[i] for i in range(index + 1, self._subtree_end[index] + 1))
+
+    def _collect_text(self, index: int) -> List[str]:
+        parts = []
+        block = self._tags[index] in BLOCK_TAGS
+        if block:
+            parts.append('\n')
+        if self._tags[index] == 'br':
+            return ['\n']
+        for child in self._children[index]:
+            if isinstance(child, int):
+                if self._visible[child] or self._has_visible_descendant(child):
+                    parts.extend(self._collect_text(child))
+            elif self._visible[index]:
+                parts.append(child.replace('\n', ' '))
+        if block:
+            parts.append('\n')
+        return parts
+
+
+class _CssEngine:
+    """Right-to-left CSS selector matcher over a DomSnapshot"""
+
+    _TOKEN = re.compile(r'-?(?:[_a-zA-Z]|\\.)(?:[_a-zA-Z0-9-]|\\.)*')
+
+    def __init__(self, snapshot: DomSnapshot):
+        self.s = snapshot
+
+    def select(self, selector: str, scope: Optional[int] = None) -> List[int]:
+        matches = set()
+        for parts in _CssEngine.parse(selector):
+            for index in self._candidates(parts[-1][1]):
+                if scope is not None and not self.s._is_descendant(index, scope):
+                    continue
+                if index not in matches and self._match_complex(parts, len(parts) - 1, index):
+                    matches.add(index)
+        return sorted(matches)
+
+    def _candidates(self, compound: Dict[str, Any]) -> List[int]:
+        if compound['ids']:
+            return self.s._by_id.get(compound['ids'][0], [])
+        if compound['classes']:
+            return min((self.s._by_class.get(c, []) for c in compound['classes']), key=len)
+        if compound['tag']:
+            return self.s._by_tag.get(compound['tag'], [])
+        return range(len(self.s._tags))
+
+    # Parsing
+    @classmethod
+    def parse(cls, selector: str) -> List[List[Tuple[Optional[str], Dict[str, Any]]]]:
+        """Parse a selector list into complex selectors of (combinator, compound) pairs"""
+        groups, parts = [], []
+        pos, length = 0, len(selector)
+        combinator = None
+        while pos < length:
+            start = pos
+            while pos < length and selector[pos].isspace():
+                pos += 1
+            if pos >= length:
+                break
+            char = selector[pos]
+            if char == ',':
+                groups.append(cls._finish(parts, selector))
+                parts, combinator = [], None
+                pos += 1
+                continue
+            if char in '>+~':
+                combinator = char
+                pos += 1
+                continue
+            if parts and combinator is None:
+                if pos == start:
+                    raise ValueError(f"Invalid CSS selector: {selector}")
+                combinator = ' '
+            compound, pos = cls._parse_compound(selector, pos)
+            parts.append((combinator, compound))
+            combinator = None
+        groups.append(cls._finish(parts, selector))
+        return groups
+
+    @staticmethod
+    def _finish(parts: list, selector: str) -> list:
+        if not parts:
+            raise ValueError(f"Invalid CSS selector: {selector}")
+        return parts
+
+    @classmethod
+    def _parse_compound(cls, selector: str, pos: int) -> Tuple[Dict[str, Any], int]:
+        compound = {'tag': None, 'ids': [], 'classes': [], 'attrs': [], 'pseudos': []}
+        length = len(selector)
+        if selector[pos] == '*':
+            pos += 1
+        else:
+            match = cls._TOKEN.match(selector, pos)
+            if match:
+                compound['tag'] = match.group().lower()
+                pos = match.end()
+        while pos < length and selector[pos] not in ' \t\n,>+~':
+            char = selector[pos]
+            if char in '#.':
+                match = cls._TOKEN.match(selector, pos + 1)
+                if not match:
+                    raise ValueError(f"Invalid CSS selector: {selector}")
+                name = re.sub(r'\\(.)', r'\1', match.group())
+                compound['ids' if char == '#' else 'classes'].append(name)
+                pos = match.end()
+            elif char == '[':
+                end = cls._closing(selector, pos, '[', ']')
+                compound['attrs'].append(cls._parse_attribute(selector[pos + 1:end], selector))
+                pos = end + 1
+            elif char == ':':
+                pos += 2 if selector.startswith('::', pos) else 1
+                match = cls._TOKEN.match(selector, pos)
+                if not match:
+                    raise ValueError(f"Invalid CSS selector: {selector}")
+                name, argument = match.group().lower(), None
+                pos = match.end()
+                if pos < length and selector[pos] == '(':
+                    end = cls._closing(selector, pos, '(', ')')
+                    argument = selector[pos + 1:end].strip()
+                    pos = end + 1
+                compound['pseudos'].append(cls._parse_pseudo(name, argument, selector))
+            else:
+                raise ValueError(f"Invalid CSS selector: {selector}")
+        return compound, pos
+
+    @staticmethod
+    def _closing(selector: str, pos: int, opening: str, closing: str) -> int:
+        depth, quote = 0, None
+        for index in range(pos, len(selector)):
+            char = selector[index]
+            if quote:
+                if char == quote:
+                    quote = None
+            elif char in '\'"':
+                quote = char
+            elif char == opening:
+                depth += 1
+            elif char == closing:
+                depth -= 1
+                if depth == 0:
+                    return index
+        raise ValueError(f"Unbalanced '{opening}' in CSS selector: {selector}")
+
+    @staticmethod
+    def _parse_attribute(body: str, selector: str) -> Tuple[str, Optional[str], Optional[str], bool]:
+        match = re.match(
+            r'\s*([^\s~|^$*!=]+)\s*(?:([~|^$*]?=)\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s\]]+))\s*(i)?)?\s*$',
+            body
+        )
+        if not match:
+            raise ValueError(f"Invalid attribute selector in: {selector}")
+        name, operator, double, single, bare, insensitive = match.groups()
+        value = next((v for v in (double, single, bare) if v is not None), None)
+        return name.lower(), operator, value, bool(insensitive)
+
+    @classmethod
+    def _parse_pseudo(cls, name: str, argument: Optional[str], selector: str) -> Tuple[str, Any]:
+        if name in ('nth-child', 'nth-last-child', 'nth-of-type', 'nth-last-of-type'):
+            return name, cls._parse_nth(argument or '', selector)
+        if name == 'not':
+            return name, cls.parse(argument or '')
+        if name in ('first-child', 'last-child', 'only-child', 'first-of-type', 'last-of-type',
+                    'only-of-type', 'empty', 'root', 'checked', 'disabled', 'enabled'):
+            return name, None
+        raise ValueError(f"Unsupported pseudo-class ':{name}' in CSS selector: {selector}")
+
+    @staticmethod
+    def _parse_nth(argument: str, selector: str) -> Tuple[int, int]:
+        argument = argument.replace(' ', '').lower()
+        if argument == 'odd':
+            return 2, 1
+        if argument == 'even':
+            return 2, 0
+        match = re.match(r'^([+-]?\d*)n([+-]\d+)?$', argument)
+        if match:
+            step = match.group(1)
+            a = -1 if step == '-' else 1 if step in ('', '+') else int(step)
+            return a, int(match.group(2) or 0)
+        if re.match(r'^[+-]?\d+$', argument):
+            return 0, int(argument)
+        raise ValueError(f"Invalid :nth-* argument '{argument}' in CSS selector: {selector}")
+
+    # Matching
+    def _match_complex(self, parts: list, position: int, index: int) -> bool:
+        combinator, compound = parts[position]
+        if not self._match_compound(compound, index):
+            return False
+        if position == 0:
+            return True
+        parents = self.s._parents
+        if combinator == '>':
+            return parents[index] >= 0 and self._match_complex(parts, position - 1, parents[index])
+        if combinator == ' ':
+            ancestor = parents[index]
+            while ancestor >= 0:
+                if self._match_complex(parts, position - 1, ancestor):
+                    return True
+                ancestor = parents[ancestor]
+            return False
+        siblings = self._siblings(index)
+        previous = siblings[:self.s._sibling_position[index] - 1]
+        if combinator == '+':
+            return bool(previous) and self._match_complex(parts, position - 1, previous[-1])
+        return any(self._match_complex(parts, position - 1, sibling) for sibling in previous)
+
+    def _siblings(self, index: int) -> List[int]:
+        parent = self.s._parents[index]
+        return self.s._element_children[parent] if parent >= 0 else [index]
+
+    def _match_compound(self, compound: Dict[str, Any], index: int) -> bool:
+        s = self.s
+        if compound['tag'] and s._tags[index] != compound['tag']:
+            return False
+        attrs = s._attrs[index]
+        if any(attrs.get('id') != element_id for element_id in compound['ids']):
+            return False
+        if compound['classes'] and not set(compound['classes']).issubset(s._classes[index]):
+            return False
+        for name, operator, value, insensitive in compound['attrs']:
+            if not self._match_attribute(attrs.get(name), operator, value, insensitive):
+                return False
+        return all(self._match_pseudo(name, argument, index) for name, argument in compound['pseudos'])
+
+    @staticmethod
+    def _match_attribute(actual: Optional[str], operator: Optional[str], expected: Optional[str],
+                         insensitive: bool) -> bool:
+        if actual is None:
+            return False
+        if operator is None:
+            return True
+        if insensitive:
+            actual, expected = actual.lower(), expected.lower()
+        if operator == '=':
+            return actual == expected
+        if operator == '~=':
+            return expected in actual.split()
+        if operator == '|=':
+            return actual == expected or actual.startswith(expected + '-')
+        if not expected:
+            return False
+        if operator == '^=':
+            return actual.startswith(expected)
+        if operator == '$=':
+            return actual.endswith(expected)
+        return expected in actual
+
+    def _match_pseudo(self, name: str, argument: Any, index: int) -> bool:
+        s = self.s
+        if name == 'not':
+            return not any(len(parts) == 1 and self._match_compound(parts[0][1], index) for parts in argument)
+        if name == 'root':
+            return s._parents[index] < 0
+        if name == 'empty':
+            return not s._children[index]
+        if name == 'checked':
+            return bool(s._props[index].get('checked') or s._props[index].get('selected'))
+        if name in ('disabled', 'enabled'):
+            return ('disabled' in s._attrs[index]) == (name == 'disabled')
+
+        siblings = self._siblings(index)
+        same_type = [i for i in siblings if s._tags[i] == s._tags[index]]
+        if name.endswith('of-type'):
+            position, count = s._type_position[index], len(same_type)
+        else:
+            position, count = s._sibling_position[index], len(siblings)
+        if name in ('first-child', 'first-of-type'):
+            return position == 1
+        if name in ('last-child', 'last-of-type'):
+            return position == count
+        if name in ('only-child', 'only-of-type'):
+            return count == 1
+        if 'last' in name:
+            position = count - position + 1
+        a, b = argument
+        if a == 0:
+            return position == b
+        return (position - b) % a == 0 and (position - b) // a >= 0
+
+
+class _XPathEngine:
+    """Evaluator for the XPath 1.0 subset used by page-object locators"""
+
+    _TOKENS = re.compile(r"""
+        \s*(?:
+            (?P<string>"[^"]*"|'[^']*')
+          | (?P<number>\d+(?:\.\d*)?|\.\d+)
+          | (?P<op>//|/|::|\.\.|\.|\[|\]|\(|\)|@|,|!=|<=|>=|=|<|>|\||\*|\+|-)
+          | (?P<name>[A-Za-z_][\w.-]*(?::[A-Za-z_][\w.-]*)?)
+        )""", re.VERBOSE)
+
+    _AXES = {
+        'child', 'descendant', 'descendant-or-self', 'self', 'parent', 'ancestor',
+        'ancestor-or-self', 'attribute', 'following-sibling', 'preceding-sibling'
+    }
+    _REVERSE_AXES = {'ancestor', 'ancestor-or-self', 'preceding-sibling', 'parent'}
+    _DOCUMENT = ('d',)
+
+    def __init__(self, snapshot: DomSnapshot):
+        self.s = snapshot
+
+    def select(self, expression: str, scope: Optional[int] = None) -> List[int]:
+        self._tokens = self._tokenize(expression)
+        self._pos = 0
+        self._expression = expression
+        tree = self._parse_or()
+        if self._pos != len(self._tokens):
+            raise ValueError(f"Unexpected token in XPath: {expression}")
+        context = self._DOCUMENT if scope is None else ('e', scope)
+        result = self._eval(tree, context, 1, 1)
+        if not isinstance(result, list):
+            raise ValueError(f"XPath does not select elements: {expression}")
+        return [item[1] for item in result if item[0] == 'e']
+
+    # Tokenizing and parsing
+    def _tokenize(self, expression: str) -> List[Tuple[str, str]]:
+        tokens, pos = [], 0
+        expression = expression.rstrip()
+        while pos < len(expression):
+            match = self._TOKENS.match(expression, pos)
+            if not match or match.end() == pos:
+                raise ValueError(f"Invalid XPath: {expression}")
+            kind = match.lastgroup
+            tokens.append((kind, match.group(kind)))
+            pos = match.end()
+        return tokens
+
+    def _peek(self, offset: int = 0) -> Tuple[Optional[str], Optional[str]]:
+        index = self._pos + offset
+        return self._tokens[index] if index < len(self._tokens) else (None, None)
+
+    def _accept(self, value: str) -> bool:
+        if self._peek()[1] == value and self._peek()[0] in ('op', 'name'):
+            self._pos += 1
+            return True
+        return False
+
+    def _expect(self, value: str) -> None:
+        if not self._accept(value):
+            raise ValueError(f"Expected '{value}' in XPath: {self._expression}")
+
+    def _parse_or(self):
+        node = self._parse_and()
+        while self._peek() == ('name', 'or'):
+            self._pos += 1
+            node = ('or', node, self._parse_and())
+        return node
+
+    def _parse_and(self):
+        node = self._parse_equality()
+        while self._peek() == ('name', 'and'):
+            self._pos += 1
+            node = ('and', node, self._parse_equality())
+        return node
+
+    def _parse_equality(self):
+        node = self._parse_relational()
+        while self._peek()[1] in ('=', '!=') and self._peek()[0] == 'op':
+            operator = self._tokens[self._pos][1]
+            self._pos += 1
+            node = ('cmp', operator, node, self._parse_relational())
+        return node
+
+    def _parse_relational(self):
+        node = self._parse_union()
+        while self._peek()[1] in ('<', '>', '<=', '>=') and self._peek()[0] == 'op':
+            operator = self._tokens[self._pos][1]
+            self._pos += 1
+            node = ('cmp', operator, node, self._parse_union())
+        return node
+
+    def _parse_union(self):
+        node = self._parse_path()
+        while self._accept('|'):
+            node = ('union', node, self._parse_path())
+        return node
+
+    def _parse_path(self):
+        kind, value = self._peek()
+        if kind in ('string', 'number') or (value == '(' and kind == 'op') or self._is_function_call():
+            node = ('filter', self._parse_primary(), self._parse_predicates())
+            if self._peek()[1] in ('/', '//') and self._peek()[0] == 'op':
+                return ('path', node, self._parse_steps())
+            return node
+        if value in ('/', '//') and kind == 'op':
+            absolute = ('root',)
+            if value == '/':
+                self._pos += 1
+                next_kind, next_value = self._peek()
+                if next_kind is None or next_value in (')', ']', '|', ','):
+                    return absolute
+                return ('path', absolute, self._parse_relative_steps())
+            return ('path', absolute, self._parse_steps())
+        return ('path', ('context',), self._parse_relative_steps())
+
+    def _is_function_call(self) -> bool:
+        kind, value = self._peek()
+        return (kind == 'name' and self._peek(1) == ('op', '(')
+                and value not in ('text', 'node', 'comment', 'processing-instruction'))
+
+    def _parse_primary(self):
+        kind, value = self._peek()
+        self._pos += 1
+        if kind == 'string':
+            return ('literal', value[1:-1])
+        if kind == 'number':
+            return ('number', float(value))
+        if value == '(':
+            node = self._parse_or()
+            self._expect(')')
+            return node
+        self._expect('(')
+        arguments = []
+        if not self._accept(')'):
+            arguments.append(self._parse_or())
+            while self._accept(','):
+                arguments.append(self._parse_or())
+            self._expect(')')
+        return ('call', value, arguments)
+
+    def _parse_steps(self) -> list:
+        """Parse steps following a '/' or '//' separator"""
+        steps = []
+        while self._peek()[1] in ('/', '//') and self._peek()[0] == 'op':
+            separator = self._tokens[self._pos][1]
+            self._pos += 1
+            if separator == '//':
+                steps.append(('descendant-or-self', 'node()', []))
+            steps.append(self._parse_step())
+        return steps
+
+    def _parse_relative_steps(self) -> list:
+        steps = [self._parse_step()]
+        return steps + self._parse_steps()
+
+    def _parse_step(self):
+        if self._accept('.'):
+            return ('self', 'node()', [])
+        if self._accept('..'):
+            return ('parent', 'node()', [])
+        axis = 'child'
+        if self._accept('@'):
+            axis = 'attribute'
+        elif self._peek()[0] == 'name' and self._peek(1) == ('op', '::'):
+            axis = self._tokens[self._pos][1]
+            if axis not in self._AXES:
+                raise ValueError(f"Unsupported XPath axis '{axis}': {self._expression}")
+            self._pos += 2
+        kind, value = self._peek()
+        if value == '*' and kind == 'op':
+            self._pos += 1
+            test = '*'
+        elif kind == 'name':
+            self._pos += 1
+            test = value.lower()
+            if self._accept('('):
+                self._expect(')')
+                test += '()'
+        else:
+            raise ValueError(f"Invalid XPath step: {self._expression}")
+        return (axis, test, self._parse_predicates())
+
+    def _parse_predicates(self) -> list:
+        predicates = []
+        while self._accept('['):
+            predicates.append(self._parse_or())
+            self._expect(']')
+        return predicates
+
+    # Evaluation
+    def _eval(self, node, context, position: int, size: int):
+        kind = node[0]
+        if kind == 'literal':
+            return node[1]
+        if kind == 'number':
+            return node[1]
+        if kind == 'context':
+            return [context]
+        if kind == 'root':
+            return [self._DOCUMENT]
+        if kind == 'or':
+            return self._boolean(self._eval(node[1], context, position, size)) or \
+                self._boolean(self._eval(node[2], context, position, size))
+        if kind == 'and':
+            return self._boolean(self._eval(node[1], context, position, size)) and \
+                self._boolean(self._eval(node[2], context, position, size))
+        if kind == 'cmp':
+            return self._compare(node[1], self._eval(node[2], context, position, size),
+                                 self._eval(node[3], context, position, size))
+        if kind == 'union':
+            left = self._eval(node[1], context, position, size)
+            right = self._eval(node[2], context, position, size)
+            return self._document_order(left + right)
+        if kind == 'filter':
+            value = self._eval(node[1], context, position, size)
+            for predicate in node[2]:
+                value = self._filter(value, predicate)
+            return value
+        if kind == 'path':
+            items = self._eval(node[1], context, position, size)
+            return self._walk(items, node[2])
+        if kind == 'call':
+            return self._call(node[1], node[2], context, position, size)
+        raise ValueError(f"Unsupported XPath construct: {kind}")
+
+    def _walk(self, items: list, steps: list) -> list:
+        index = 0
+        while index < len(steps):
+            axis, test, predicates = steps[index]
+            following = steps[index + 1] if index + 1 < len(steps) else None
+            # '//name[...]' without positional predicates reads straight from the tag index
+            if (axis, test) == ('descendant-or-self', 'node()') and following and following[0] == 'child' \
+                    and not following[1].endswith('()') and not any(map(self._positional, following[2])):
+                items = self._indexed_descendants(items, following[1])
+                items = self._apply_predicates(items, following[2])
+                index += 2
+                continue
+            result = []
+            for item in items:
+                selected = [i for i in self._axis(axis, item) if self._node_test(i, test, axis)]
+                if axis in self._REVERSE_AXES:
+                    selected.reverse()
+                selected = self._apply_predicates(selected, predicates)
+                result.extend(selected)
+            items = self._document_order(result)
+            index += 1
+        return items
+
+    def _apply_predicates(self, items: list, predicates: list) -> list:
+        for predicate in predicates:
+            items = self._filter(items, predicate)
+        return items
+
+    def _filter(self, items: Any, predicate) -> list:
+        if not isinstance(items, list):
+            raise ValueError(f"Predicate applied to a non node-set in XPath: {self._expression}")
+        size = len(items)
+        kept = []
+        for position, item in enumerate(items, start=1):
+            value = self._eval(predicate, item, position, size)
+            if isinstance(value, float) and not isinstance(value, bool):
+                if value == position:
+                    kept.append(item)
+            elif self._boolean(value):
+                kept.append(item)
+        return kept
+
+    def _positional(self, node) -> bool:
+        """Whether a predicate depends on context position, which rules out the tag index"""
+        if isinstance(node, list):
+            return any(self._positional(child) for child in node)
+        if not isinstance(node, tuple):
+            return False
+        if node[0] == 'number' or (node[0] == 'call' and node[1] in ('position', 'last')):
+            return True
+        return any(self._positional(child) for child in node[1:])
+
+    def _indexed_descendants(self, items: list, test: str) -> list:
+        candidates = range(len(self.s._tags)) if test == '*' else self.s._by_tag.get(test, [])
+        if any(item == self._DOCUMENT for item in items):
+            return [('e', i) for i in candidates]
+        roots = [item[1] for item in items if item[0] == 'e']
+        return [('e', i) for i in candidates if any(self.s._is_descendant(i, root) for root in roots)]
+
+    def _axis(self, axis: str, item) -> list:
+        s = self.s
+        if item[0] in ('a', 't'):
+            if axis == 'self':
+                return [item]
+            if axis in ('parent', 'ancestor', 'ancestor-or-self'):
+                owner = [('e', item[1])]
+                return ([item] if axis == 'ancestor-or-self' else []) + owner + \
+                    (self._axis('ancestor', owner[0]) if axis != 'parent' else [])
+            return []
+        if item == self._DOCUMENT:
+            roots = [i for i in range(len(s._tags)) if s._parents[i] < 0]
+            if axis == 'child':
+                return [('e', i) for i in roots]
+            if axis in ('descendant', 'descendant-or-self'):
+                nodes = [('e', i) for i in range(len(s._tags))]
+                return ([item] if axis == 'descendant-or-self' else []) + nodes
+            return [item] if axis == 'self' else []
+
+        index = item[1]
+        if axis == 'self':
+            return [item]
+        if axis == 'child':
+            result = []
+            for position, child in enumerate(s._children[index]):
+                result.append(('e', child) if isinstance(child, int) else ('t', index, position))
+            return result
+        if axis in ('descendant', 'descendant-or-self'):
+            result = [item] if axis == 'descendant-or-self' else []
+            for descendant in range(index + 1, s._subtree_end[index] + 1):
+                result.append(('e', descendant))
+            return result
+        if axis == 'attribute':
+            return [('a', index, name) for name in s._attrs[index]]
+        if axis in ('parent', 'ancestor', 'ancestor-or-self'):
+            result = [item] if axis == 'ancestor-or-self' else []
+            parent = s._parents[index]
+            while parent >= 0:
+                result.append(('e', parent))
+                if axis == 'parent':
+                    return result
+                parent = s._parents[parent]
+            result.append(self._DOCUMENT)
+            return self._document_order(result)
+        parent = s._parents[index]
+        siblings = s._element_children[parent] if parent >= 0 else [index]
+        position = siblings.index(index)
+        chosen = siblings[position + 1:] if axis == 'following-sibling' else siblings[:position]
+        return [('e', i) for i in chosen]
+
+    def _node_test(self, item, test: str, axis: str) -> bool:
+        if test == 'node()':
+            return True
+        if test == 'text()':
+            return item[0] == 't'
+        if axis == 'attribute':
+            return item[0] == 'a' and (test == '*' or item[2] == test)
+        return item[0] == 'e' and (test == '*' or self.s._tags[item[1]] == test)
+
+    def _document_order(self, items: list) -> list:
+        def key(item):
+            if item[0] == 'd':
+                return (-1, 0, '')
+            if item[0] == 'e':
+                return (item[1], 0, '')
+            if item[0] == 'a':
+                return (item[1], 1, item[2])
+            return (item[1], 2, '%08d' % item[2])
+        unique = {key(item): item for item in items}
+        return [unique[k] for k in sorted(unique)]
+
+    def _string_value(self, item) -> str:
+        if item[0] == 'd':
+            roots = [i for i in range(len(self.s._tags)) if self.s._parents[i] < 0]
+            return ''.join(self.s._text_content(i) for i in roots)
+        if item[0] == 'e':
+            return self.s._text_content(item[1])
+        if item[0] == 'a':
+            return self.s._attrs[item[1]].get(item[2], '')
+        return self.s._children[item[1]][item[2]]
+
+    def _string(self, value) -> str:
+        if isinstance(value, list):
+            return self._string_value(value[0]) if value else ''
+        if isinstance(value, bool):
+            return 'true' if value else 'false'
+        if isinstance(value, float):
+            return str(int(value)) if value.is_integer() else str(value)
+        return value
+
+    def _number(self, value) -> float:
+        if isinstance(value, bool):
+            return 1.0 if value else 0.0
+        if isinstance(value, float):
+            return value
+        try:
+            return float(self._string(value).strip())
+        except ValueError:
+            return float('nan')
+
+    @staticmethod
+    def _boolean(value) -> bool:
+        if isinstance(value, float) and not isinstance(value, bool):
+            return value != 0 and value == value
+        return bool(value)
+
+    def _compare(self, operator: str, left, right) -> bool:
+        compare: Dict[str, Callable[[Any, Any], bool]] = {
+            '=': lambda a, b: a == b, '!=': lambda a, b: a != b,
+            '<': lambda a, b: a < b, '>': lambda a, b: a > b,
+            '<=': lambda a, b: a <= b, '>=': lambda a, b: a >= b
+        }[operator]
+        relational = operator not in ('=', '!=')
+        if isinstance(left, list) and isinstance(right, list):
+            return any(compare(*self._coerce(self._string_value(a), self._string_value(b), relational))
+                       for a in left for b in right)
+        if isinstance(left, list) or isinstance(right, list):
+            nodes, other, flipped = (left, right, False) if isinstance(left, list) else (right, left, True)
+            if isinstance(other, bool):
+                pair = (self._boolean(nodes), other)
+                return compare(*(pair[::-1] if flipped else pair))
+            for item in nodes:
+                value = self._string_value(item)
+                value = self._number(value) if isinstance(other, float) or relational else value
+                target = self._number(other) if relational else other
+                if compare(*((target, value) if flipped else (value, target))):
+                    return True
+            return False
+        if not relational and (isinstance(left, bool) or isinstance(right, bool)):
+            return compare(self._boolean(left), self._boolean(right))
+        return compare(*self._coerce(left, right, relational))
+
+    def _coerce(self, left, right, relational: bool) -> Tuple[Any, Any]:
+        if relational or isinstance(left, float) or isinstance(right, float):
+            return self._number(left), self._number(right)
+        return self._string(left), self._string(right)
+
+    def _call(self, name: str, arguments: list, context, position: int, size: int):
+        values = [self._eval(argument, context, position, size) for argument in arguments]
+        if name == 'position':
+            return float(position)
+        if name == 'last':
+            return float(size)
+        if name == 'count':
+            return float(len(values[0]))
+        if name == 'not':
+            return not self._boolean(values[0])
+        if name == 'true':
+            return True
+        if name == 'false':
+            return False
+        if name == 'boolean':
+            return self._boolean(values[0])
+        if name == 'number':
+            return self._number(values[0] if values else [context])
+        if name == 'string':
+            return self._string(values[0] if values else [context])
+        if name == 'string-length':
+            return float(len(self._string(values[0] if values else [context])))
+        if name == 'normalize-space':
+            return ' '.join(self._string(values[0] if values else [context]).split())
+        if name == 'concat':
+            return ''.join(self._string(value) for value in values)
+        if name == 'contains':
+            return self._string(values[1]) in self._string(values[0])
+        if name == 'starts-with':
+            return self._string(values[0]).startswith(self._string(values[1]))
+        if name == 'ends-with':
+            return self._string(values[0]).endswith(self._string(values[1]))
+        if name == 'translate':
+            source, target = self._string(values[1]), self._string(values[2])
+            table = {ord(c): (target[i] if i < len(target) else None) for i, c in enumerate(source)}
+            return self._string(values[0]).translate(table)
+        if name in ('name', 'local-name'):
+            items = values[0] if values else [context]
+            if not items or items[0][0] not in ('e', 'a'):
+                return ''
+            return self.s._tags[items[0][1]] if items[0][0] == 'e' else items[0][2]
+        raise ValueError(f"Unsupported XPath function '{name}()': {self._expression}")
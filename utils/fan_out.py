@@ -0,0 +1,119 @@
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+import allure
+from utils.page_health import isolated_breaker, page_health_breaker
+from utils.timing_store import timing_store
+
+logger = logging.getLogger(__name__)
+
+
+class FanOutResult:
+    """Per-browser outcomes of one check run concurrently in several browsers"""
+
+    def __init__(self, name: str, outcomes: Dict[str, dict], wall_seconds: float):
+        self.name = name
+        self.outcomes = outcomes
+        self.wall_seconds = wall_seconds
+
+    @property
+    def errors(self) -> Dict[str, str]:
+        return {browser: o['error'] for browser, o in self.outcomes.items() if o['error']}
+
+    @property
+    def serial_seconds(self) -> float:
+        """What running the browsers one after another would have cost"""
+        return round(sum(o['seconds'] for o in self.outcomes.values()), 3)
+
+    def diff(self) -> Dict[str, Dict[str, Any]]:
+        """Values that differ between browsers: key -> {browser: value}
+
+        Dict results are compared key by key; anything else is compared as a whole under "result".
+        """
+        results = {browser: o['result'] for browser, o in self.outcomes.items() if not o['error']}
+        if all(isinstance(r, dict) for r in results.values()):
+            keys = sorted({key for r in results.values() for key in r})
+            values = {key: {browser: r.get(key) for browser, r in results.items()} for key in keys}
+        else:
+            values = {'result': results}
+        return {key: by_browser for key, by_browser in values.items()
+                if len({json.dumps(v, sort_keys=True, default=str) for v in by_browser.values()}) > 1}
+
+    def summary(self) -> str:
+        lines = [f"{self.name}: {self.wall_seconds:.2f}s wall, {self.serial_seconds:.2f}s serial"]
+        for browser, outcome in self.outcomes.items():
+            status = f"ERROR {outcome['error']}" if outcome['error'] else "ok"
+            lines.append(f"  {browser}: {outcome['seconds']:.2f}s {status}")
+        for key, by_browser in self.diff().items():
+            lines.append(f"  differs {key}: " + ", ".join(f"{b}={v!r}" for b, v in by_browser.items()))
+        return "\n".join(lines)
+
+    def attach(self) -> None:
+        """One combined Allure entry with every browser's result, timing and the diff"""
+        allure.attach(self.summary(), name=f"Fan-out: {self.name}", attachment_type=allure.attachment_type.TEXT)
+        allure.attach(json.dumps({'outcomes': self.outcomes, 'diff': self.diff(),
+                                  'wall_seconds': self.wall_seconds, 'serial_seconds': self.serial_seconds},
+                                 indent=2, default=str),
+                      name=f"Fan-out details: {self.name}", attachment_type=allure.attachment_type.JSON)
+
+
+class MultiDriver:
+    """Runs the same page-object calls against several browsers at once, one thread each"""
+
+    def __init__(self, drivers: Dict[str, Any]):
+        self.drivers = drivers
+        # Create the process-wide singletons before threads race to do it
+        timing_store()
+        page_health_breaker()
+
+    @property
+    def browsers(self) -> List[str]:
+        return list(self.drivers)
+
+    def run(self, check: Callable[[Any], Any], name: Optional[str] = None) -> FanOutResult:
+        """Call `check(driver)` in every browser concurrently and attach the combined result"""
+        name = name or getattr(check, '__name__', 'check')
+
+        def run_one(browser):
+            start = time.perf_counter()
+            try:
+                # One browser's error page must not fail the others' checks through a shared breaker
+                with isolated_breaker():
+                    result, error = check(self.drivers[browser]), None
+            except Exception as e:
+                logger.error(f"Fan-out {name} failed on {browser}: {str(e)}")
+                result, error = None, f"{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}"
+            return browser, {'result': result, 'error': error, 'seconds': round(time.perf_counter() - start, 3)}
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(self.drivers), thread_name_prefix="fan-out") as executor:
+            outcomes = dict(executor.map(run_one, self.browsers))
+        fan_out = FanOutResult(name, outcomes, round(time.perf_counter() - start, 3))
+        logger.info(fan_out.summary())
+        fan_out.attach()
+        return fan_out
+
+    @classmethod
+    def start(cls, browsers: List[str], factory: Callable[[str], Any]) -> 'MultiDriver':
+        """Create one driver per browser in parallel; drivers that did start are quit if any fails"""
+        with ThreadPoolExecutor(max_workers=len(browsers), thread_name_prefix="fan-out-start") as executor:
+            futures = {browser: executor.submit(factory, browser) for browser in browsers}
+        drivers, failures = {}, []
+        for browser, future in futures.items():
+            try:
+                drivers[browser] = future.result()
+            except Exception as e:
+                failures.append(f"{browser}: {str(e)}")
+        if failures:
+            cls(drivers).quit()
+            raise RuntimeError(f"Fan-out driver setup failed for {'; '.join(failures)}")
+        return cls(drivers)
+
+    def quit(self) -> None:
+        for browser, driver in self.drivers.items():
+            try:
+                driver.quit()
+            except Exception as e:
+                logger.error(f"Error quitting {browser} fan-out driver: {str(e)}")
@@ -0,0 +1,104 @@
+"""Cross-process lock files shared by xdist workers.
+
+The lock file holds the owner's pid. A lock is broken only when its owner is dead, so a
+slow holder (a profile template build, a large history save) is never raced by a second
+process that merely got tired of waiting.
+"""
+import logging
+import os
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# An empty lock file is an owner between creating the file and writing its pid
+UNWRITTEN_GRACE_SECONDS = 5.0
+
+
+def pid_alive(pid: int) -> bool:
+    """Whether a process with this pid exists on this host"""
+    try:
+        os.kill(pid, 0)
+        return True
+    except PermissionError:
+        return True
+    except (OSError, ValueError):
+        return False
+
+
+def lock_owner(path: str) -> Optional[int]:
+    """Pid written to a lock file, 0 while it is still being written, None if there is no lock"""
+    try:
+        with open(path) as f:
+            return int(f.read().strip() or 0)
+    except FileNotFoundError:
+        return None
+    except ValueError:
+        return 0
+
+
+class FileLock:
+    """Exclusive lock file; waits while the owner is alive and breaks locks of dead owners
+
+    With a timeout, TimeoutError is raised when a live owner holds the lock for longer.
+    """
+
+    def __init__(self, path: str, timeout: Optional[float] = 30.0):
+        self.path = path
+        self.timeout = timeout
+
+    def __enter__(self):
+        deadline = None if self.timeout is None else time.time() + self.timeout
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if self._stale(self.path) and self._break():
+                    continue
+                if deadline is not None and time.time() > deadline:
+                    raise TimeoutError(f"Lock {self.path} still held by pid {lock_owner(self.path)}")
+                time.sleep(0.05)
+                continue
+            with os.fdopen(fd, "w") as f:
+                f.write(str(os.getpid()))
+            return self
+
+    def __exit__(self, *exc_info):
+        self._remove()
+
+    @staticmethod
+    def _stale(path: str) -> bool:
+        owner = lock_owner(path)
+        if owner is None:
+            return False
+        if owner == 0:
+            try:
+                return time.time() - os.path.getmtime(path) > UNWRITTEN_GRACE_SECONDS
+            except FileNotFoundError:
+                return False
+        return not pid_alive(owner)
+
+    def _break(self) -> bool:
+        """Move a stale lock aside; another waiter may have replaced it with a live one meanwhile"""
+        aside = f"{self.path}.{os.getpid()}.stale"
+        try:
+            os.rename(self.path, aside)
+        except FileNotFoundError:
+            return True
+        if not self._stale(aside):
+            # Not the lock we judged stale: put it back unless someone took the path again
+            try:
+                os.link(aside, self.path)
+            except FileExistsError:
+                pass
+            os.remove(aside)
+            return False
+        os.remove(aside)
+        logger.warning(f"Broke lock {self.path} left behind by a dead process")
+        return True
+
+    def _remove(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
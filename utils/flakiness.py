@@ -0,0 +1,289 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from typing import Dict, List, Optional
+import allure_commons
+import pytest
+from utils.config import Config
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session TEXT NOT NULL,
+    nodeid TEXT NOT NULL,
+    browser TEXT,
+    attempt INTEGER NOT NULL,
+    outcome TEXT NOT NULL,
+    duration REAL NOT NULL,
+    step TEXT,
+    exception TEXT,
+    worker TEXT,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_nodeid ON runs (nodeid, id);
+CREATE TABLE IF NOT EXISTS sessions (
+    session TEXT PRIMARY KEY,
+    ts REAL NOT NULL,
+    summary TEXT NOT NULL
+);
+"""
+
+FAILING = ("failed", "error")
+
+
+class FlakeStore:
+    """SQLite history of test attempts shared by the controller and all xdist workers"""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+    def record(self, session: str, nodeid: str, browser: Optional[str], attempt: int, outcome: str,
+               duration: float, step: Optional[str] = None, exception: Optional[str] = None,
+               worker: Optional[str] = None) -> None:
+        self._db.execute(
+            "INSERT INTO runs (session, nodeid, browser, attempt, outcome, duration, step, exception, worker, ts) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (session, nodeid, browser, attempt, outcome, round(duration, 3), step, exception, worker, time.time())
+        )
+
+    def stats(self, window: int = None) -> Dict[str, dict]:
+        """Per test over its last `window` sessions: flake rate, failures and mean duration
+
+        A session is flaky when the test failed and then passed on a rerun in that session.
+        Changes of the final outcome between sessions are reported separately: a test broken
+        on one branch and green on another is failing, not flaky.
+        """
+        window = window or Config.FLAKE_WINDOW
+        sessions: Dict[str, Dict[str, List[tuple]]] = {}
+        for nodeid, session, attempt, outcome, duration in self._db.execute(
+                "SELECT nodeid, session, attempt, outcome, duration FROM runs ORDER BY id"):
+            sessions.setdefault(nodeid, {}).setdefault(session, []).append((attempt, outcome, duration))
+        stats = {}
+        for nodeid, by_session in sessions.items():
+            attempts = [a for a in list(by_session.values())[-window:] if any(o != "skipped" for _, o, _ in a)]
+            if not attempts:
+                continue
+            finals = [max(a)[1] for a in attempts]
+            flaky = sum(1 for a, final in zip(attempts, finals)
+                        if final == "passed" and any(o in FAILING for _, o, _ in a))
+            flips = sum(1 for previous, final in zip(finals, finals[1:])
+                        if (previous == "passed") != (final == "passed"))
+            durations = [d for a in attempts for _, o, d in a if o != "skipped"]
+            stats[nodeid] = {
+                "sessions": len(attempts),
+                "failures": sum(1 for a in attempts for _, o, _ in a if o in FAILING),
+                "flaky_sessions": flaky,
+                "outcome_changes": flips,
+                "flake_rate": round(flaky / len(attempts), 3),
+                "mean_duration": round(sum(durations) / len(durations), 3) if durations else None
+            }
+        return stats
+
+    def quarantined(self, stats: Dict[str, dict] = None) -> Dict[str, float]:
+        """Tests flaky enough to run without blocking the build, with their flake rate"""
+        stats = self.stats() if stats is None else stats
+        return {nodeid: s["flake_rate"] for nodeid, s in stats.items()
+                if s["sessions"] >= Config.QUARANTINE_MIN_RUNS and s["flake_rate"] >= Config.QUARANTINE_THRESHOLD}
+
+    def prune(self, keep: int = None) -> int:
+        """Drop the attempts and summaries of all but the latest `keep` sessions, so stats() stays bounded"""
+        keep = keep or Config.FLAKE_HISTORY_SESSIONS
+        removed = self._db.execute(
+            "DELETE FROM runs WHERE session NOT IN "
+            "(SELECT session FROM runs GROUP BY session ORDER BY MAX(id) DESC LIMIT ?)", (keep,)).rowcount
+        self._db.execute("DELETE FROM sessions WHERE session NOT IN "
+                         "(SELECT session FROM sessions ORDER BY ts DESC LIMIT ?)", (keep,))
+        return removed
+
+    def session_summary(self, session: str) -> dict:
+        """Tests, failures, rerun time and failing steps of one session"""
+        rows = self._db.execute(
+            "SELECT nodeid, attempt, outcome, duration, step, exception FROM runs WHERE session = ? ORDER BY id",
+            (session,)).fetchall()
+        finals: Dict[str, tuple] = {}
+        for row in rows:
+            if row[0] not in finals or row[1] >= finals[row[0]][1]:
+                finals[row[0]] = row
+        retried = [row for row in rows if row[1] < finals[row[0]][1]]
+        return {
+            "tests": len(finals),
+            "failed": sum(1 for row in finals.values() if row[2] in FAILING),
+            "passed_on_rerun": sum(1 for row in finals.values() if row[2] == "passed" and row[1] > 1),
+            "rerun_seconds": round(sum(row[3] for row in retried), 1),
+            "failing_steps": sorted({f"{row[4]} ({row[5]})" for row in rows if row[2] in FAILING and row[4]})
+        }
+
+    def record_session(self, session: str, summary: dict) -> None:
+        self._db.execute("INSERT OR REPLACE INTO sessions (session, ts, summary) VALUES (?, ?, ?)",
+                         (session, time.time(), json.dumps(summary)))
+
+    def trend(self, limit: int = 20) -> List[dict]:
+        rows = self._db.execute("SELECT session, ts, summary FROM sessions ORDER BY ts DESC LIMIT ?", (limit,))
+        return [dict(json.loads(summary), session=session, ts=ts) for session, ts, summary in reversed(rows.fetchall())]
+
+    def last_id(self) -> int:
+        return self._db.execute("SELECT COALESCE(MAX(id), 0) FROM runs").fetchone()[0]
+
+    def absorb(self, path: str, after_id: int) -> int:
+        """Copy the attempts and sessions another job recorded in its copy of this store (ids after `after_id`)"""
+        self._db.execute("ATTACH DATABASE ? AS other", (path,))
+        try:
+            copied = self._db.execute(
+                "INSERT INTO runs (session, nodeid, browser, attempt, outcome, duration, step, exception, worker, ts) "
+                "SELECT session, nodeid, browser, attempt, outcome, duration, step, exception, worker, ts "
+                "FROM other.runs WHERE id > ? ORDER BY id", (after_id,)).rowcount
+            self._db.execute("INSERT OR IGNORE INTO sessions (session, ts, summary) "
+                             "SELECT session, ts, summary FROM other.sessions")
+        finally:
+            self._db.execute("DETACH DATABASE other")
+        return copied
+
+    def close(self) -> None:
+        self._db.close()
+
+
+class StepTracker:
+    """Listens to allure steps to name the step a test failed in, e.g. 'Open form > Click send'"""
+
+    def __init__(self):
+        self.stack: List[str] = []
+        self.failed_step: Optional[str] = None
+
+    def reset(self) -> None:
+        self.stack, self.failed_step = [], None
+
+    @allure_commons.hookimpl
+    def start_step(self, uuid, title, params):
+        self.stack.append(title)
+
+    @allure_commons.hookimpl
+    def stop_step(self, uuid, exc_type, exc_val, exc_tb):
+        if exc_type is not None and self.failed_step is None:
+            self.failed_step = " > ".join(self.stack)
+        if self.stack:
+            self.stack.pop()
+
+
+class FlakinessPlugin:
+    """Records every attempt, quarantines flaky tests and hands out reruns from a time budget"""
+
+    def __init__(self, config, retry_budget: float = 0.0):
+        self.config = config
+        # The controller picks the session id; xdist workers inherit it through the environment
+        self.session = os.environ.setdefault("FLAKE_SESSION_ID", uuid.uuid4().hex)
+        self.worker = os.environ.get("PYTEST_XDIST_WORKER", "main")
+        self.store = FlakeStore(Config.FLAKE_DB_PATH)
+        self.stats = self.store.stats()
+        self.quarantine = self.store.quarantined(self.stats) if Config.AUTO_QUARANTINE else {}
+        workers = config.workerinput.get("workercount", 1) if hasattr(config, "workerinput") else 1
+        self.budgeting = retry_budget > 0
+        self.retry_budget = retry_budget / workers
+        self.steps = StepTracker()
+        allure_commons.plugin_manager.register(self.steps)
+
+    def pytest_collection_modifyitems(self, items):
+        for item in items:
+            if item.nodeid in self.quarantine and item.get_closest_marker("critical") is not None:
+                # A critical test stays blocking (and keeps its reruns) however flaky it is
+                del self.quarantine[item.nodeid]
+            if item.nodeid in self.quarantine:
+                item.add_marker(pytest.mark.xfail(
+                    reason=f"quarantined: flake rate {self.quarantine[item.nodeid]:.0%}", strict=False))
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_runtest_protocol(self, item):
+        """Give the test as many reruns as its expected duration fits in the remaining budget"""
+        self.steps.reset()
+        if not self.budgeting:
+            return
+        # Unknown tests are assumed to be slow; very short ones still cost a second of setup
+        mean = (self.stats.get(item.nodeid) or {}).get("mean_duration")
+        expected = max(1.0, mean if mean is not None else 30.0)
+        reruns = 0
+        if item.nodeid not in self.quarantine and self.retry_budget > 0:
+            reruns = min(Config.MAX_RERUNS, int(self.retry_budget // expected))
+        item.add_marker(pytest.mark.flaky(reruns=reruns))
+
+    def pytest_runtest_logreport(self, report):
+        if report.outcome == "rerun":
+            self.retry_budget -= report.duration
+
+    def record(self, item, call, report) -> None:
+        """Store the outcome of a setup error or a call, with the failing step and exception class"""
+        if report.when == "teardown" or (report.when == "setup" and not report.failed):
+            return
+        outcome = "error" if report.when == "setup" and report.failed else report.outcome
+        if hasattr(report, "wasxfail"):
+            outcome = "failed" if report.skipped else "passed"
+        exception = call.excinfo.typename if outcome in FAILING and call.excinfo is not None else None
+        callspec = getattr(item, "callspec", None)
+        try:
+            self.store.record(self.session, item.nodeid, callspec.params.get("driver") if callspec else None,
+                              getattr(item, "execution_count", 1), outcome, report.duration,
+                              self.steps.failed_step if outcome in FAILING else None, exception, self.worker)
+        except sqlite3.Error as e:
+            logger.error(f"Failed to record test outcome: {str(e)}")
+
+    def summary(self) -> dict:
+        stats = self.store.stats()
+        quarantine = self.store.quarantined(stats) if Config.AUTO_QUARANTINE else {}
+        return dict(self.store.session_summary(self.session),
+                    flaky_tests=sum(1 for s in stats.values() if s["flake_rate"] > 0),
+                    quarantined=sorted(quarantine))
+
+    def pytest_sessionfinish(self, session):
+        if hasattr(self.config, "workerinput"):
+            return
+        summary = self.summary()
+        if not summary["tests"]:
+            return
+        self.store.record_session(self.session, summary)
+        self.store.prune()
+        trend = self.store.trend()
+        self._write_allure(summary, trend)
+        os.environ.pop("FLAKE_SESSION_ID", None)
+
+    def _write_allure(self, summary: dict, trend: List[dict]) -> None:
+        # The run's --alluredir (what CI uploads), falling back to the configured results path
+        results = self.config.getoption("allure_report_dir", None) or Config.ALLURE_RESULTS_PATH
+        os.makedirs(results, exist_ok=True)
+        with open(os.path.join(results, "environment.properties"), "a") as f:
+            f.write(f"Flaky.Tests={summary['flaky_tests']}\n")
+            f.write(f"Quarantined.Tests={len(summary['quarantined'])}\n")
+            f.write(f"Passed.On.Rerun={summary['passed_on_rerun']}\n")
+            f.write(f"Rerun.Seconds={summary['rerun_seconds']}\n")
+        categories_path = os.path.join(results, "categories.json")
+        categories = []
+        if os.path.exists(categories_path):
+            with open(categories_path) as f:
+                categories = json.load(f)
+        if not any(c.get("name") == "Quarantined tests" for c in categories):
+            categories.append({"name": "Quarantined tests", "matchedStatuses": ["skipped", "broken", "failed"],
+                               "messageRegex": ".*quarantined: flake rate.*"})
+        with open(categories_path, "w") as f:
+            json.dump(categories, f, indent=2)
+        with open(os.path.join(results, "flakiness-trend.json"), "w") as f:
+            json.dump(trend, f, indent=2)
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if hasattr(self.config, "workerinput"):
+            return
+        stats = self.store.stats()
+        flaky = sorted(((n, s) for n, s in stats.items() if s["flake_rate"] > 0), key=lambda ns: -ns[1]["flake_rate"])
+        if not flaky and not self.quarantine:
+            return
+        terminalreporter.section("flakiness")
+        for nodeid, s in flaky[:10]:
+            mark = " [quarantined]" if nodeid in self.quarantine else ""
+            terminalreporter.write_line(f"{s['flake_rate']:.0%} over {s['sessions']} runs{mark}: {nodeid}")
+        summary = self.store.session_summary(self.session)
+        terminalreporter.write_line(f"reruns cost {summary['rerun_seconds']}s this run, "
+                                    f"{summary['passed_on_rerun']} tests passed on rerun")
@@ -0,0 +1,315 @@
+"""Synthetic-user load runner built on the end-to-end user journey.
+
+Runs the user journey of TestE2EUserJourney.test_complete_user_journey (utils.user_journey) from
+`--users` concurrent headless browser sessions. New journeys arrive at `--rate` per second
+(an open model: arrivals do not wait for earlier journeys, so a saturated pool shows up as
+queue delay). Contact submissions are routed to a local stub unless --live-contact is given.
+Per-step latency percentiles, error rates and throughput over time are written as JSON and
+an HTML summary.
+
+Usage:
+    python -m utils.load_runner --url https://staging.example.com/id/ --users 4 --rate 0.5 --journeys 40
+    python -m utils.load_runner --mirror ./site-mirror --mirror-index id/index.html --users 8 --duration 300
+"""
+import argparse
+import html
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from utils.config import Config
+from utils.stats import percentile
+from utils.user_journey import journey_steps
+
+logger = logging.getLogger(__name__)
+
+
+class LoadRunner:
+    """Pool of browser sessions executing journeys as they arrive"""
+
+    def __init__(self, url: str, users: int, rate: float, browser: str = "chrome",
+                 journeys: Optional[int] = None, duration: Optional[float] = None, contact_stub=None):
+        self.url = url
+        self.users = users
+        self.rate = rate
+        self.browser = browser
+        self.journeys = journeys if journeys is not None or duration is not None else users * 5
+        self.duration = duration
+        self.contact_stub = contact_stub
+        self.records: List[dict] = []
+        self.journey_results: List[dict] = []
+        self._arrivals: "queue.Queue[Optional[Tuple[int, float]]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self.started = 0.0
+
+    def _create_driver(self):
+        from utils.browser_config import BrowserManager
+
+        driver = BrowserManager(self.browser, headless=True).create_webdriver()
+        driver.implicitly_wait(0)
+        driver.set_page_load_timeout(Config.PAGE_LOAD_TIMEOUT)
+        driver.set_script_timeout(Config.SCRIPT_TIMEOUT)
+        return driver
+
+    def _schedule(self) -> None:
+        """Enqueue journey arrivals at a fixed rate, then one stop marker per session"""
+        index = 0
+        while (self.journeys is None or index < self.journeys) and \
+                (self.duration is None or index / self.rate < self.duration):
+            due = self.started + index / self.rate
+            time.sleep(max(0.0, due - time.perf_counter()))
+            self._arrivals.put((index, due))
+            index += 1
+        for _ in range(self.users):
+            self._arrivals.put(None)
+
+    def _session(self, slot: int) -> None:
+        from pages.pg_home import HomePage
+
+        try:
+            driver = self._create_driver()
+        except Exception as e:
+            logger.error(f"Session {slot} could not start a browser: {str(e)}")
+            self._drain_as_failed(slot, f"{type(e).__name__}: browser start failed")
+            return
+        try:
+            page = HomePage(driver, base_url=self.url)
+            if self.contact_stub is not None:
+                page.add_init_script(self.contact_stub.router_script())
+            while True:
+                arrival = self._arrivals.get()
+                if arrival is None:
+                    return
+                self._run_journey(page, slot, *arrival)
+                driver.delete_all_cookies()
+        finally:
+            driver.quit()
+
+    def _drain_as_failed(self, slot: int, error: str) -> None:
+        """A session without a browser still consumes its share of arrivals, each a failed journey"""
+        while True:
+            arrival = self._arrivals.get()
+            if arrival is None:
+                return
+            now = time.perf_counter() - self.started
+            with self._lock:
+                self.journey_results.append({"journey": arrival[0], "session": slot, "queued": 0.0,
+                                             "start": now, "end": now, "ok": False, "error": error})
+
+    def _run_journey(self, page, slot: int, index: int, due: float) -> None:
+        begin = time.perf_counter()
+        user = f"Load User {index}"
+        error = None
+        for title, step in journey_steps(page, user, self.contact_stub):
+            start = time.perf_counter()
+            try:
+                step()
+            except Exception as e:
+                error = f"{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}"
+            record = {"journey": index, "session": slot, "step": title, "start": round(start - self.started, 3),
+                      "latency": round(time.perf_counter() - start, 3), "ok": error is None, "error": error}
+            with self._lock:
+                self.records.append(record)
+            if error:
+                logger.warning(f"Journey {index} failed at '{title}': {error}")
+                break
+        end = time.perf_counter()
+        with self._lock:
+            self.journey_results.append({"journey": index, "session": slot, "queued": round(begin - due, 3),
+                                         "start": round(begin - self.started, 3),
+                                         "end": round(end - self.started, 3), "ok": error is None, "error": error})
+
+    def run(self) -> dict:
+        from utils.page_health import page_health_breaker
+        from utils.timing_store import timing_store
+
+        # Slow or failing pages are what a load run measures: wait the full timeouts and never
+        # skip steps, instead of learning from or tripping on the degradation being produced
+        Config.ADAPTIVE_TIMEOUTS = False
+        Config.PAGE_HEALTH_BREAKER = False
+        # Create the process-wide singletons before session threads race to do it
+        timing_store()
+        page_health_breaker()
+        self.started = time.perf_counter()
+        sessions = [threading.Thread(target=self._session, args=(slot,), name=f"load-user-{slot}")
+                    for slot in range(self.users)]
+        for session in sessions:
+            session.start()
+        self._schedule()
+        for session in sessions:
+            session.join()
+        return self.report(time.perf_counter() - self.started)
+
+    def report(self, elapsed: float, bucket: float = None) -> dict:
+        bucket = bucket or Config.LOAD_REPORT_BUCKET_SECONDS
+        steps: Dict[str, List[dict]] = {}
+        for record in self.records:
+            steps.setdefault(record["step"], []).append(record)
+        step_stats = {}
+        for title, records in steps.items():
+            latencies = [r["latency"] for r in records if r["ok"]]
+            errors = sum(1 for r in records if not r["ok"])
+            step_stats[title] = {
+                "count": len(records),
+                "errors": errors,
+                "error_rate": round(errors / len(records), 4),
+                "p50": round(percentile(latencies, 50), 3),
+                "p95": round(percentile(latencies, 95), 3),
+                "p99": round(percentile(latencies, 99), 3),
+                "max": round(max(latencies), 3) if latencies else 0.0
+            }
+        timeline = []
+        for i in range(int(elapsed // bucket) + 1):
+            low, high = i * bucket, (i + 1) * bucket
+            finished = [j for j in self.journey_results if low <= j["end"] < high]
+            started = [r for r in self.records if low <= r["start"] < high]
+            timeline.append({
+                "t": round(low, 1),
+                "journeys_completed": sum(1 for j in finished if j["ok"]),
+                "journeys_failed": sum(1 for j in finished if not j["ok"]),
+                "throughput_per_s": round(sum(1 for j in finished if j["ok"]) / bucket, 3),
+                "step_p95": round(percentile([r["latency"] for r in started if r["ok"]], 95), 3),
+                "step_errors": sum(1 for r in started if not r["ok"])
+            })
+        completed = sum(1 for j in self.journey_results if j["ok"])
+        failures: Dict[str, int] = {}
+        for journey in self.journey_results:
+            if journey["error"]:
+                failures[journey["error"]] = failures.get(journey["error"], 0) + 1
+        durations = [j["end"] - j["start"] for j in self.journey_results if j["ok"]]
+        queued = [j["queued"] for j in self.journey_results]
+        return {
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+            "target": self.url,
+            "browser": self.browser,
+            "users": self.users,
+            "arrival_rate_per_s": self.rate,
+            "elapsed_s": round(elapsed, 1),
+            "journeys": {
+                "total": len(self.journey_results),
+                "completed": completed,
+                "failed": len(self.journey_results) - completed,
+                "error_rate": round(1 - completed / len(self.journey_results), 4) if self.journey_results else 0.0,
+                "throughput_per_s": round(completed / elapsed, 3) if elapsed else 0.0,
+                "p50_s": round(percentile(durations, 50), 3),
+                "p95_s": round(percentile(durations, 95), 3),
+                "p99_s": round(percentile(durations, 99), 3),
+                "queue_delay_p95_s": round(percentile(queued, 95), 3)
+            },
+            "steps": step_stats,
+            "timeline": timeline,
+            "failures": dict(sorted(failures.items(), key=lambda kv: -kv[1]))
+        }
+
+
+def render_html(report: dict) -> str:
+    """Standalone HTML summary: totals, per-step percentiles and a throughput/error timeline"""
+    journeys = report["journeys"]
+    rows = "".join(
+        f"<tr><td>{html.escape(title)}</td><td>{s['count']}</td><td>{s['error_rate']:.1%}</td>"
+        f"<td>{s['p50']:.3f}</td><td>{s['p95']:.3f}</td><td>{s['p99']:.3f}</td><td>{s['max']:.3f}</td></tr>"
+        for title, s in report["steps"].items())
+    timeline = report["timeline"]
+    peak = max([b["journeys_completed"] + b["journeys_failed"] for b in timeline] + [1])
+    width = max(1, 600 // max(1, len(timeline)))
+    bars = []
+    for i, b in enumerate(timeline):
+        ok_height = 150 * b["journeys_completed"] / peak
+        failed_height = 150 * b["journeys_failed"] / peak
+        bars.append(f'<rect x="{i * width}" y="{150 - ok_height:.1f}" width="{width - 1}" height="{ok_height:.1f}" '
+                    f'fill="#4caf50"><title>t={b["t"]}s: {b["journeys_completed"]} completed, '
+                    f'step p95 {b["step_p95"]}s</title></rect>')
+        if failed_height:
+            bars.append(f'<rect x="{i * width}" y="{150 - ok_height - failed_height:.1f}" width="{width - 1}" '
+                        f'height="{failed_height:.1f}" fill="#e53935"><title>t={b["t"]}s: '
+                        f'{b["journeys_failed"]} failed</title></rect>')
+    failures = "".join(f"<li>{count} &times; {html.escape(error)}</li>" for error, count in report["failures"].items())
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Load run {html.escape(report['generated_at'])}</title>
+<style>
+body {{ font: 14px system-ui, sans-serif; margin: 24px; }}
+table {{ border-collapse: collapse; }} td, th {{ border: 1px solid #ccc; padding: 4px 10px; text-align: right; }}
+td:first-child, th:first-child {{ text-align: left; }}
+</style></head><body>
+<h1>Load run against {html.escape(report['target'])}</h1>
+<p>{report['users']} {html.escape(report['browser'])} sessions, {report['arrival_rate_per_s']} journeys/s arriving,
+{report['elapsed_s']}s elapsed.</p>
+<p><b>{journeys['completed']}</b> of {journeys['total']} journeys completed
+(error rate {journeys['error_rate']:.1%}), {journeys['throughput_per_s']} journeys/s.
+Journey p50 {journeys['p50_s']}s, p95 {journeys['p95_s']}s, p99 {journeys['p99_s']}s;
+queue delay p95 {journeys['queue_delay_p95_s']}s.</p>
+<h2>Steps (seconds)</h2>
+<table><tr><th>Step</th><th>Runs</th><th>Errors</th><th>p50</th><th>p95</th><th>p99</th><th>max</th></tr>{rows}</table>
+<h2>Journeys finished per {html.escape(str(Config.LOAD_REPORT_BUCKET_SECONDS))}s</h2>
+<svg width="{max(600, width * len(timeline))}" height="155">{''.join(bars)}</svg>
+<h2>Failures</h2><ul>{failures or '<li>none</li>'}</ul>
+</body></html>
+"""
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the user journey from concurrent synthetic users")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="Homepage to load (staging; the BASE_URL host is refused)")
+    target.add_argument("--mirror", help="Serve this local mirror directory")
+    parser.add_argument("--mirror-index", default="index.html", help="Entry page inside the mirror")
+    parser.add_argument("--browser", default=Config.DEFAULT_BROWSER, help="chrome, firefox or edge")
+    parser.add_argument("--users", type=int, default=4, help="Concurrent browser sessions")
+    parser.add_argument("--rate", type=float, default=0.5, help="Journey arrivals per second")
+    parser.add_argument("--journeys", type=int, default=None, help="Journeys to start (default: 5 per user)")
+    parser.add_argument("--duration", type=float, default=None, help="Stop starting journeys after this many seconds")
+    parser.add_argument("--live-contact", action="store_true", help="Submit the contact form to the real backend")
+    parser.add_argument("--output", default="reports/load/", help="Directory for load_report.json/.html")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from utils.contact_stub import ContactStub
+    from utils.locator_analyzer import serve_mirror
+
+    args = parse_args(argv)
+    logging.basicConfig(level=getattr(logging, Config.LOG_LEVEL),
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if args.users < 1 or args.rate <= 0:
+        logger.error("--users must be at least 1 and --rate positive")
+        return 2
+    if args.url and urlparse(args.url).netloc == urlparse(Config.BASE_URL).netloc:
+        logger.error(f"Refusing to load production ({urlparse(Config.BASE_URL).netloc}); use a staging --url or --mirror")
+        return 2
+
+    server, url = None, args.url
+    if args.mirror:
+        server, base = serve_mirror(args.mirror)
+        url = base + args.mirror_index.lstrip('/')
+    stub = None if args.live_contact else ContactStub(port=Config.CONTACT_STUB_PORT).start()
+    try:
+        runner = LoadRunner(url, args.users, args.rate, args.browser, args.journeys, args.duration, stub)
+        report = runner.run()
+    finally:
+        if stub:
+            stub.stop()
+        if server:
+            server.shutdown()
+
+    os.makedirs(args.output, exist_ok=True)
+    json_path = os.path.join(args.output, "load_report.json")
+    with open(json_path, "w") as f:
+        json.dump(dict(report, records=runner.records), f, indent=2)
+    with open(os.path.join(args.output, "load_report.html"), "w") as f:
+        f.write(render_html(report))
+
+    journeys = report["journeys"]
+    print(f"{journeys['completed']}/{journeys['total']} journeys completed, error rate {journeys['error_rate']:.1%}, "
+          f"{journeys['throughput_per_s']} journeys/s, p95 {journeys['p95_s']}s -> {json_path}")
+    return 1 if journeys["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,316 @@
+"""Locator performance analyzer for HomeElements.
+
+Loads the homepage (live or from a local mirror), times how long every locator takes to
+resolve inside the page across repeated runs, flags missing, ambiguous and slow locators,
+and proposes faster selectors that are verified to match exactly the same nodes.
+
+Usage:
+    python -m utils.locator_analyzer --browser chrome --loads 3 --output reports/locator_report.json
+    python -m utils.locator_analyzer --mirror ./site-mirror --mirror-index id/index.html
+"""
+import argparse
+import functools
+import http.server
+import json
+import logging
+import os
+import re
+import sys
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from elements.el_home import HomeElements
+from utils.config import Config
+from utils.locators import QUERY_FUNCTION, expects_single_match, to_query
+from utils.stats import summarize
+
+logger = logging.getLogger(__name__)
+
+
+# Times one locator and its candidate rewrites inside the page.
+# Arguments: kind, expression, runs, iterations. Samples are microseconds per resolution.
+ANALYZE_SCRIPT = QUERY_FUNCTION + """
+var kind = arguments[0], expression = arguments[1], runs = arguments[2], iterations = arguments[3];
+
+function sample(kind, expression) {
+    var samples = [];
+    for (var r = 0; r < runs; r++) {
+        var start = performance.now();
+        for (var i = 0; i < iterations; i++) QUERY(kind, expression);
+        samples.push((performance.now() - start) * 1000 / iterations);
+    }
+    return samples;
+}
+
+function sameNodes(a, b) {
+    if (a.length !== b.length) return false;
+    for (var i = 0; i < a.length; i++) if (a[i] !== b[i]) return false;
+    return true;
+}
+
+function uniqueId(el) {
+    if (!el.id) return null;
+    var selector = '#' + CSS.escape(el.id);
+    return document.querySelectorAll(selector).length === 1 ? selector : null;
+}
+
+function scopeFor(nodes) {
+    for (var anc = nodes[0].parentElement; anc; anc = anc.parentElement) {
+        var selector = uniqueId(anc);
+        if (selector && nodes.every(function (n) { return anc.contains(n); })) return [anc, selector];
+    }
+    return null;
+}
+
+function structuralPath(el, ancestor) {
+    var steps = [];
+    for (var node = el; node && node !== ancestor; node = node.parentElement) {
+        var index = Array.prototype.indexOf.call(node.parentElement.children, node) + 1;
+        steps.unshift(node.localName + ':nth-child(' + index + ')');
+    }
+    return steps.join(' > ');
+}
+
+function candidates(nodes) {
+    var out = [];
+    var tag = nodes[0].localName;
+    var sameTag = nodes.every(function (n) { return n.localName === tag; });
+    var shared = Array.prototype.filter.call(nodes[0].classList, function (c) {
+        return nodes.every(function (n) { return n.classList.contains(c); });
+    }).map(function (c) { return '.' + CSS.escape(c); });
+    if (nodes.length === 1 && uniqueId(nodes[0])) out.push(uniqueId(nodes[0]));
+    if (sameTag) {
+        out.push(tag);
+        shared.forEach(function (c, i) {
+            out.push(c, tag + c);
+            shared.slice(i + 1).forEach(function (d) { out.push(c + d, tag + c + d); });
+        });
+        var name = nodes[0].getAttribute('name');
+        if (name && nodes.every(function (n) { return n.getAttribute('name') === name; })) {
+            out.push(tag + '[name="' + name.replace(/"/g, '\\\\"') + '"]');
+        }
+    }
+    var scope = scopeFor(nodes);
+    if (scope) {
+        if (kind === 'css' && expression.indexOf(',') < 0) out.push(scope[1] + ' ' + expression);
+        if (sameTag) {
+            out.push(scope[1] + ' ' + tag);
+            shared.forEach(function (c) { out.push(scope[1] + ' ' + c, scope[1] + ' ' + tag + c); });
+        }
+        if (nodes.length === 1) out.push(scope[1] + ' > ' + structuralPath(nodes[0], scope[0]));
+    }
+    return out.filter(function (c, i) { return c !== expression && out.indexOf(c) === i; });
+}
+
+var nodes;
+try {
+    nodes = QUERY(kind, expression);
+} catch (e) {
+    return {count: 0, error: String(e), samples: [], suggestions: []};
+}
+var result = {count: nodes.length, samples: sample(kind, expression), suggestions: []};
+if (nodes.length) {
+    candidates(nodes).forEach(function (selector) {
+        try {
+            if (sameNodes(QUERY('css', selector), nodes)) {
+                result.suggestions.push({selector: selector, samples: sample('css', selector)});
+            }
+        } catch (e) {
+            // Candidate not valid in this browser; ignore it
+        }
+    });
+}
+return result;
+"""
+
+
+def static_flags(locator: tuple) -> List[str]:
+    """Flag selector patterns that are expensive regardless of the page content"""
+    kind, expression = to_query(locator)
+    flags = []
+    if kind == 'xpath':
+        if re.search(r'contains\(\s*text\(\)', expression) or 'normalize-space(.)' in expression:
+            flags.append('xpath-text-scan')
+        if expression.startswith('//') and not re.match(r'^//[\w*-]+\[@id=', expression):
+            flags.append('unscoped-xpath')
+    else:
+        compounds = [part for part in re.split(r'[\s>+~]+', expression) if part]
+        if any(compound.count('.') >= 4 for compound in compounds):
+            flags.append('long-class-chain')
+        if ':nth-child' in expression and not expression.lstrip().startswith('#'):
+            flags.append('unscoped-nth-child')
+    return flags
+
+
+class LocatorAnalyzer:
+    """Time every HomeElements locator in a live browser and suggest faster equivalents"""
+
+    def __init__(self, driver, runs: int = 10, iterations: int = 20,
+                 slow_us: float = 250.0, min_speedup: float = 1.2):
+        self.driver = driver
+        self.runs = runs
+        self.iterations = iterations
+        self.slow_us = slow_us
+        self.min_speedup = min_speedup
+        self._samples: Dict[str, Dict[str, Any]] = {}
+
+    def measure(self, locators: List[Tuple[str, tuple]]) -> None:
+        """Resolve and time every locator against the currently loaded page"""
+        for name, locator in locators:
+            kind, expression = to_query(locator)
+            result = self.driver.execute_script(ANALYZE_SCRIPT, kind, expression, self.runs, self.iterations)
+            entry = self._samples.setdefault(name, {
+                'locator': locator, 'counts': [], 'samples': [], 'error': None, 'suggestions': {}
+            })
+            entry['counts'].append(result['count'])
+            entry['samples'].extend(result['samples'])
+            entry['error'] = entry['error'] or result.get('error')
+            for suggestion in result['suggestions']:
+                entry['suggestions'].setdefault(suggestion['selector'], []).extend(suggestion['samples'])
+
+    def report(self) -> Dict[str, Any]:
+        """Build the machine-readable report from all measured page loads"""
+        entries = []
+        for name, data in self._samples.items():
+            by, value = data['locator']
+            timing = summarize(data['samples'])
+            matches = max(data['counts']) if data['counts'] else 0
+            expects_single = expects_single_match(name)
+            flags = static_flags(data['locator'])
+            if data['error']:
+                flags.append('invalid')
+            if matches == 0:
+                flags.append('missing')
+            if len(set(data['counts'])) > 1:
+                flags.append('unstable-match-count')
+            if expects_single and matches > 1:
+                flags.append('ambiguous')
+            if timing.get('median', 0) > self.slow_us:
+                flags.append('slow')
+
+            suggestions = []
+            for selector, samples in data['suggestions'].items():
+                suggestion_timing = summarize(samples)
+                if not suggestion_timing.get('median'):
+                    continue
+                speedup = timing['median'] / suggestion_timing['median'] if timing.get('median') else 0
+                if speedup >= self.min_speedup:
+                    suggestions.append({
+                        'selector': selector,
+                        'locator': ['css selector', selector],
+                        'verified_same_nodes': True,
+                        'timing_us': suggestion_timing,
+                        'speedup': round(speedup, 2)
+                    })
+            suggestions.sort(key=lambda s: s['timing_us']['median'])
+
+            entries.append({
+                'name': name,
+                'by': by,
+                'value': value,
+                'matches': matches,
+                'expects_single': expects_single,
+                'error': data['error'],
+                'timing_us': timing,
+                'flags': flags,
+                'suggestions': suggestions[:3]
+            })
+
+        entries.sort(key=lambda e: e['timing_us'].get('median', 0), reverse=True)
+        return {
+            'summary': {
+                'total': len(entries),
+                'missing': sum('missing' in e['flags'] for e in entries),
+                'ambiguous': sum('ambiguous' in e['flags'] for e in entries),
+                'slow': sum('slow' in e['flags'] for e in entries),
+                'with_suggestions': sum(bool(e['suggestions']) for e in entries),
+                'total_median_us': round(sum(e['timing_us'].get('median', 0) for e in entries), 3)
+            },
+            'locators': entries
+        }
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        logger.debug("mirror: " + format % args)
+
+
+def serve_mirror(directory: str) -> Tuple[http.server.ThreadingHTTPServer, str]:
+    """Serve a local site mirror on a free port and return (server, base URL)"""
+    handler = functools.partial(_QuietHandler, directory=os.path.abspath(directory))
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Time and optimize HomeElements locators")
+    parser.add_argument("--url", default=Config.BASE_URL, help="Page to analyze (default: BASE_URL)")
+    parser.add_argument("--mirror", help="Serve this local mirror directory instead of the live site")
+    parser.add_argument("--mirror-index", default="index.html", help="Entry page inside the mirror")
+    parser.add_argument("--browser", default=Config.DEFAULT_BROWSER, help="chrome, firefox or edge")
+    parser.add_argument("--headed", action="store_true", help="Show the browser window")
+    parser.add_argument("--loads", type=int, default=3, help="Fresh page loads to sample")
+    parser.add_argument("--runs", type=int, default=10, help="Timing samples per locator per load")
+    parser.add_argument("--iterations", type=int, default=20, help="Resolutions averaged into one sample")
+    parser.add_argument("--slow-us", type=float, default=250.0, help="Median resolve time that counts as slow")
+    parser.add_argument("--output", default="reports/locator_report.json", help="Report path")
+    parser.add_argument("--fail-on-missing", action="store_true", help="Exit 1 when a locator matches nothing")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from pages.__base import BasePage
+    from utils.browser_config import BrowserManager
+
+    args = parse_args(argv)
+    logging.basicConfig(level=getattr(logging, Config.LOG_LEVEL),
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    server, url = None, args.url
+    if args.mirror:
+        server, base = serve_mirror(args.mirror)
+        url = base + args.mirror_index.lstrip('/')
+
+    driver = BrowserManager(args.browser, headless=not args.headed).create_webdriver()
+    try:
+        driver.set_script_timeout(max(Config.SCRIPT_TIMEOUT, 300))
+        page = BasePage(driver)
+        analyzer = LocatorAnalyzer(driver, args.runs, args.iterations, args.slow_us)
+        locators = list(HomeElements.registry().items())
+        for load in range(args.loads):
+            page.navigate_to(url)
+            page.wait_for_page_load()
+            page.wait_for_element_to_disappear(HomeElements.Preloader.CONTAINER, 10)
+            analyzer.measure(locators)
+            logger.info(f"Measured {len(locators)} locators on load {load + 1}/{args.loads}")
+
+        report = {
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'url': url,
+            'browser': args.browser,
+            'browser_version': driver.capabilities.get('browserVersion', ''),
+            'loads': args.loads,
+            'runs': args.runs,
+            'iterations': args.iterations,
+            'slow_threshold_us': args.slow_us,
+            **analyzer.report()
+        }
+    finally:
+        driver.quit()
+        if server:
+            server.shutdown()
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    summary = report['summary']
+    print(f"{summary['total']} locators: {summary['missing']} missing, {summary['ambiguous']} ambiguous, "
+          f"{summary['slow']} slow, {summary['with_suggestions']} with faster equivalents -> {args.output}")
+    return 1 if args.fail_on_missing and summary['missing'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
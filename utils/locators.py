@@ -0,0 +1,56 @@
+import json
+import re
+from typing import Tuple
+from selenium.webdriver.common.by import By
+
+
+# Locators named ALL_* or with a plural name are expected to match several nodes
+MULTI_MATCH_NAME = re.compile(r'^(ALL_.*|.*S)$')
+
+
+def expects_single_match(name: str) -> bool:
+    """Whether a registry name like 'Footer.LOGO' should resolve to exactly one node"""
+    return not MULTI_MATCH_NAME.match(name.split('.')[-1])
+
+
+def to_query(locator: tuple) -> Tuple[str, str]:
+    """Translate a Selenium locator into an in-page ('css' | 'xpath', expression) query
+
+    WebDriver does the same rewrite for ID, NAME, CLASS_NAME and TAG_NAME, so running
+    the query inside the page resolves exactly the nodes the driver would find.
+    """
+    by, value = locator
+    if by == By.CSS_SELECTOR:
+        return 'css', value
+    if by == By.XPATH:
+        return 'xpath', value
+    if by == By.ID:
+        return 'css', f'[id={json.dumps(value)}]'
+    if by == By.NAME:
+        return 'css', f'[name={json.dumps(value)}]'
+    if by == By.CLASS_NAME:
+        return 'css', '.' + value
+    if by == By.TAG_NAME:
+        return 'css', value
+    if by == By.LINK_TEXT:
+        return 'xpath', f'//a[normalize-space(.)={json.dumps(value)}]'
+    if by == By.PARTIAL_LINK_TEXT:
+        return 'xpath', f'//a[contains(., {json.dumps(value)})]'
+    raise ValueError(f"Unsupported locator strategy: {by}")
+
+
+# Shared in-page helper: QUERY(kind, expression) returns matching elements in document order
+QUERY_FUNCTION = """
+function QUERY(kind, expression, root) {
+    root = root || document;
+    if (kind === 'xpath') {
+        var snapshot = document.evaluate(expression, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        var found = [];
+        for (var i = 0; i < snapshot.snapshotLength; i++) {
+            if (snapshot.snapshotItem(i).nodeType === 1) found.push(snapshot.snapshotItem(i));
+        }
+        return found;
+    }
+    return Array.prototype.slice.call(root.querySelectorAll(expression));
+}
+"""
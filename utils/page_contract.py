@@ -0,0 +1,108 @@
+import logging
+from typing import Dict, List, Optional
+from selenium.common.exceptions import TimeoutException
+from utils.locators import QUERY_FUNCTION, expects_single_match, to_query
+
+logger = logging.getLogger(__name__)
+
+
+# Resolves every locator in one call. Argument: [[name, kind, expression], ...].
+# Returns {name: match count} with -1 for selectors the browser rejects.
+CONTRACT_SCRIPT = QUERY_FUNCTION + """
+var counts = {};
+arguments[0].forEach(function (entry) {
+    try {
+        counts[entry[0]] = QUERY(entry[1], entry[2]).length;
+    } catch (e) {
+        counts[entry[0]] = -1;
+    }
+});
+return counts;
+"""
+
+
+class MissingLocatorError(TimeoutException):
+    """Raised immediately for a locator the page contract found missing, instead of waiting it out"""
+
+
+class PageContract:
+    """Present, missing and ambiguous locators of a page, resolved in a single script call"""
+
+    def __init__(self, url: str, locators: Dict[str, tuple], counts: Dict[str, int]):
+        self.url = url
+        self.locators = locators
+        self.counts = counts
+        self._names = {}
+        for name, locator in locators.items():
+            self._names.setdefault(locator, name)
+
+    @classmethod
+    def resolve(cls, driver, locators: Dict[str, tuple]) -> 'PageContract':
+        """Resolve all locators against the current page"""
+        entries = [[name, *to_query(locator)] for name, locator in locators.items()]
+        counts = driver.execute_script(CONTRACT_SCRIPT, entries)
+        return cls(driver.current_url, locators, counts)
+
+    @property
+    def present(self) -> List[str]:
+        return [name for name, count in self.counts.items() if count > 0]
+
+    @property
+    def missing(self) -> List[str]:
+        return [name for name, count in self.counts.items() if count <= 0]
+
+    @property
+    def ambiguous(self) -> List[str]:
+        return [name for name, count in self.counts.items() if count > 1 and expects_single_match(name)]
+
+    @property
+    def ok(self) -> bool:
+        return not self.missing
+
+    def name_of(self, locator: tuple) -> Optional[str]:
+        return self._names.get(locator)
+
+    def is_missing(self, locator: tuple) -> bool:
+        name = self._names.get(locator)
+        return name is not None and self.counts.get(name, 1) <= 0
+
+    def recheck(self, driver, locator: tuple) -> bool:
+        """Re-resolve one missing locator without waiting; True if it has appeared since"""
+        name = self._names[locator]
+        count = driver.execute_script(CONTRACT_SCRIPT, [[name, *to_query(locator)]])[name]
+        self.counts[name] = count
+        return count > 0
+
+    def summary(self) -> str:
+        return (f"{len(self.present)} present, {len(self.missing)} missing, "
+                f"{len(self.ambiguous)} ambiguous of {len(self.counts)} locators")
+
+    def describe_missing(self, locator: tuple) -> str:
+        name = self.name_of(locator)
+        return (f"{name} {locator} is missing on {self.url} "
+                f"(page contract: {self.summary()}; missing: {', '.join(self.missing)})")
+
+    def report(self) -> str:
+        """Human-readable per-locator report"""
+        lines = [f"Page contract for {self.url}: {self.summary()}"]
+        for name in sorted(self.counts):
+            count = self.counts[name]
+            if count < 0:
+                status = "INVALID"
+            elif count == 0:
+                status = "MISSING"
+            elif name in self.ambiguous:
+                status = f"AMBIGUOUS ({count} matches)"
+            else:
+                status = f"ok ({count})"
+            lines.append(f"  {name:<45} {status}")
+        return "\n".join(lines)
+
+    def to_dict(self) -> dict:
+        return {
+            'url': self.url,
+            'counts': dict(self.counts),
+            'present': self.present,
+            'missing': self.missing,
+            'ambiguous': self.ambiguous
+        }
@@ -0,0 +1,164 @@
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+from selenium.common.exceptions import TimeoutException
+from utils.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+# Reads the navigation response status (Chromium 109+/Firefox expose responseStatus)
+# together with enough page facts to recognise browser and CDN error pages.
+HEALTH_SCRIPT = """
+var nav = (performance.getEntriesByType && performance.getEntriesByType('navigation')[0]) || {};
+return {
+    status: nav.responseStatus || 0,
+    url: location.href,
+    title: document.title || '',
+    readyState: document.readyState,
+    bodyLength: document.body ? document.body.innerText.length : 0,
+    heading: (document.querySelector('h1') || {}).innerText || ''
+};
+"""
+
+ERROR_URL_PREFIXES = ('chrome-error://', 'about:neterror', 'about:certerror', 'edge-error://')
+ERROR_TEXT = re.compile(
+    r"\b(40[34]|5\d\d)\b.*(error|forbidden|not found|gateway|unavailable|timeout)"
+    r"|bad gateway|service unavailable|gateway time-?out|attention required|access denied"
+    r"|this site can.t be reached|server not found|problem loading page|web server is down",
+    re.IGNORECASE
+)
+
+
+class PageUnavailableError(TimeoutException):
+    """Raised for an unhealthy page, and instead of waiting while the page-health circuit breaker is open"""
+
+
+class PageHealth:
+    """Outcome of inspecting a freshly navigated page"""
+
+    def __init__(self, ok: bool, reason: str = "", status: int = 0):
+        self.ok = ok
+        self.reason = reason
+        self.status = status
+
+    @classmethod
+    def inspect(cls, driver) -> 'PageHealth':
+        """Classify the current page as healthy or as an HTTP/CDN/browser error page"""
+        facts = driver.execute_script(HEALTH_SCRIPT)
+        status = int(facts.get('status') or 0)
+        if status >= 400:
+            return cls(False, f"HTTP {status} from {facts['url']}", status)
+        if facts['url'].startswith(ERROR_URL_PREFIXES):
+            return cls(False, f"Browser error page {facts['url']}", status)
+        for text in (facts['title'], facts['heading']):
+            if ERROR_TEXT.search(text):
+                return cls(False, f"Error page detected: '{text.strip()[:80]}'", status)
+        if facts['readyState'] == 'complete' and facts['bodyLength'] == 0:
+            return cls(False, f"Empty page body at {facts['url']}", status)
+        return cls(True, status=status)
+
+
+class PageHealthBreaker:
+    """Circuit breaker shared by all tests of one worker process
+
+    Closed: pages are used normally. Open: navigation and element checks fail
+    immediately until the next recovery probe is due. Probes back off exponentially.
+    """
+
+    CLOSED, OPEN = "closed", "open"
+
+    def __init__(self, failure_threshold: int = 1, base_backoff: float = 15.0, max_backoff: float = 240.0):
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.reason = ""
+        self.next_probe_at = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == self.OPEN
+
+    def probe_due(self) -> bool:
+        return self.is_open and time.monotonic() >= self.next_probe_at
+
+    def record_failure(self, reason: str) -> None:
+        self.failures += 1
+        self.reason = reason
+        if self.failures >= self.failure_threshold:
+            self.trips += 1
+            backoff = min(self.max_backoff, self.base_backoff * 2 ** (self.trips - 1))
+            self.state = self.OPEN
+            self.next_probe_at = time.monotonic() + backoff
+            logger.error(f"Page health breaker open: {reason}; next recovery probe in {backoff:.0f}s")
+
+    def record_success(self) -> None:
+        if self.is_open:
+            logger.info("Page health breaker closed: recovery probe succeeded")
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.reason = ""
+
+    def describe(self) -> str:
+        wait = max(0.0, self.next_probe_at - time.monotonic())
+        return f"Site unavailable ({self.reason}); failing fast, next recovery probe in {wait:.0f}s"
+
+    def check(self, driver) -> PageHealth:
+        """Inspect the page just loaded and record the outcome"""
+        health = PageHealth.inspect(driver)
+        if health.ok:
+            self.record_success()
+        else:
+            self.record_failure(health.reason)
+        return health
+
+    def probe(self, driver, url: str) -> bool:
+        """Load the URL once as a recovery probe; True when the breaker closed again"""
+        logger.info(f"Probing recovery of {url} after: {self.reason}")
+        try:
+            driver.get(url)
+        except Exception as e:
+            self.record_failure(f"Navigation to {url} failed: {str(e).splitlines()[0]}")
+            return False
+        return self.check(driver).ok
+
+    def guard(self) -> None:
+        """Raise PageUnavailableError while the breaker is open"""
+        if self.is_open:
+            raise PageUnavailableError(self.describe())
+
+
+_breaker: Optional[PageHealthBreaker] = None
+_thread_breaker = threading.local()
+
+
+def _new_breaker() -> PageHealthBreaker:
+    return PageHealthBreaker(Config.BREAKER_FAILURE_THRESHOLD, Config.BREAKER_BASE_BACKOFF, Config.BREAKER_MAX_BACKOFF)
+
+
+def page_health_breaker() -> PageHealthBreaker:
+    """Process-wide breaker configured from Config (or the calling thread's own, see isolated_breaker)"""
+    global _breaker
+    own = getattr(_thread_breaker, "breaker", None)
+    if own is not None:
+        return own
+    if _breaker is None:
+        _breaker = _new_breaker()
+    return _breaker
+
+
+@contextmanager
+def isolated_breaker() -> Iterator[PageHealthBreaker]:
+    """Give the calling thread a breaker of its own, so concurrent browsers cannot trip each other's"""
+    _thread_breaker.breaker = _new_breaker()
+    try:
+        yield _thread_breaker.breaker
+    finally:
+        _thread_breaker.breaker = None
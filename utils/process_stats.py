@@ -0,0 +1,79 @@
+import logging
+import os
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def available() -> bool:
+    """Process statistics are read from /proc, so they exist on Linux only"""
+    return os.path.isdir("/proc/self")
+
+
+def _stat_fields(pid: int) -> Optional[List[str]]:
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            data = f.read()
+    except OSError:
+        return None
+    # The command name is parenthesised and may contain spaces
+    return data[data.rindex(")") + 2:].split()
+
+
+def children_map() -> Dict[int, List[int]]:
+    """Parent pid -> child pids for every process currently visible"""
+    children: Dict[int, List[int]] = {}
+    for name in os.listdir("/proc"):
+        if name.isdigit():
+            fields = _stat_fields(int(name))
+            if fields:
+                children.setdefault(int(fields[1]), []).append(int(name))
+    return children
+
+
+def process_tree(pid: int) -> List[int]:
+    """The pid and all of its descendants"""
+    children = children_map()
+    tree, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        tree.append(current)
+        stack.extend(children.get(current, ()))
+    return tree
+
+
+def sample_tree(pid: int) -> Optional[dict]:
+    """Summed RSS (MB) and CPU time (s) of a process tree, or None when unavailable"""
+    if not available():
+        return None
+    rss_pages, cpu_ticks, processes = 0, 0, 0
+    for member in process_tree(pid):
+        fields = _stat_fields(member)
+        if not fields:
+            continue
+        try:
+            with open(f"/proc/{member}/statm") as f:
+                rss_pages += int(f.read().split()[1])
+        except OSError:
+            continue
+        cpu_ticks += int(fields[11]) + int(fields[12])
+        processes += 1
+    if not processes:
+        return None
+    return {
+        "rss_mb": round(rss_pages * PAGE_SIZE / 1024 / 1024, 1),
+        "cpu_seconds": round(cpu_ticks / CLOCK_TICKS, 2),
+        "processes": processes
+    }
+
+
+def driver_root_pid(driver) -> Optional[int]:
+    """Pid of the local driver service (chromedriver, geckodriver...), the root of the browser tree"""
+    if getattr(driver, "root_pid", None):
+        return driver.root_pid
+    service = getattr(driver, "service", None)
+    process = getattr(service, "process", None)
+    return getattr(process, "pid", None)
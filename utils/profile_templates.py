@@ -0,0 +1,92 @@
+"""Browser profile templates with a warm HTTP cache.
+
+A template is a browser profile directory that has already loaded the warm-up URLs, so its
+disk cache holds the homepage assets. It is built once per browser (shared by xdist workers
+through a file lock) and rebuilt when older than PROFILE_TEMPLATE_MAX_AGE_HOURS. Each warm
+driver gets its own copy of the template, pruned of lock files and session state, so drivers
+never share a live profile.
+"""
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from typing import Callable
+from utils.config import Config
+from utils.file_lock import FileLock
+
+logger = logging.getLogger(__name__)
+
+# Profile entries that belong to one browser process or session, never copied into a template
+PROFILE_JUNK = {
+    "SingletonLock", "SingletonCookie", "SingletonSocket", "lockfile", "lock", ".parentlock", "parent.lock",
+    "Crashpad", "crashes", "minidumps", "Sessions", "sessionstore-backups", "sessionstore.jsonlz4",
+    "BrowserMetrics", "ShaderCache", "GrShaderCache"
+}
+
+MARKER = "template.json"
+
+
+def _ignore_junk(directory, names):
+    return [name for name in names if name in PROFILE_JUNK]
+
+
+def _size_mb(path: str) -> float:
+    total = sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files
+                if not os.path.islink(os.path.join(root, name)))
+    return round(total / 1024 / 1024, 1)
+
+
+class ProfileTemplates:
+    """Per-browser warm profile templates and the per-driver copies made from them"""
+
+    def __init__(self, root: str = None):
+        self.root = root or Config.PROFILE_TEMPLATE_PATH
+
+    def path(self, browser: str) -> str:
+        return os.path.join(self.root, browser)
+
+    def is_fresh(self, browser: str) -> bool:
+        try:
+            with open(os.path.join(self.path(browser), MARKER)) as f:
+                built = json.load(f)["built"]
+        except (OSError, ValueError, KeyError):
+            return False
+        return time.time() - built < Config.PROFILE_TEMPLATE_MAX_AGE_HOURS * 3600
+
+    def ensure(self, browser: str, build: Callable[[str], None]) -> str:
+        """Return the browser's template, building it with `build(directory)` if missing or stale"""
+        os.makedirs(self.root, exist_ok=True)
+        # No timeout: a live builder is waited for, its own page loads are bounded
+        with FileLock(self.path(browser) + ".lock", timeout=None):
+            if self.is_fresh(browser):
+                return self.path(browser)
+            start = time.perf_counter()
+            building = tempfile.mkdtemp(prefix=f"{browser}-building-", dir=self.root)
+            try:
+                build(building)
+                pruned = building + "-pruned"
+                shutil.copytree(building, pruned, ignore=_ignore_junk, symlinks=True)
+                with open(os.path.join(pruned, MARKER), "w") as f:
+                    json.dump({"built": time.time(), "browser": browser, "urls": Config.PROFILE_WARM_URLS}, f)
+                shutil.rmtree(self.path(browser), ignore_errors=True)
+                os.replace(pruned, self.path(browser))
+            finally:
+                shutil.rmtree(building, ignore_errors=True)
+                shutil.rmtree(building + "-pruned", ignore_errors=True)
+            logger.info(f"Built {browser} profile template ({_size_mb(self.path(browser))} MB) "
+                        f"in {time.perf_counter() - start:.1f}s")
+            return self.path(browser)
+
+    def instantiate(self, browser: str) -> str:
+        """Private copy of the browser's template for one driver"""
+        start = time.perf_counter()
+        directory = tempfile.mkdtemp(prefix=f"profile-{browser}-warm-")
+        shutil.copytree(self.path(browser), directory, ignore=_ignore_junk, symlinks=True, dirs_exist_ok=True)
+        logger.debug(f"Copied {browser} profile template to {directory} in {time.perf_counter() - start:.2f}s")
+        return directory
+
+    @staticmethod
+    def release(directory: str) -> None:
+        shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,140 @@
+import glob
+import json
+import logging
+import os
+import time
+from typing import Callable, Dict, List, Optional
+from utils.config import Config
+from utils.process_stats import driver_root_pid, sample_tree
+
+logger = logging.getLogger(__name__)
+
+JS_HEAP_SCRIPT = "return performance.memory ? performance.memory.usedJSHeapSize : null;"
+
+
+def close_extra_windows(driver) -> int:
+    """Close every window but the first and switch back to it; return how many were closed"""
+    first, *extra = driver.window_handles
+    for handle in extra:
+        driver.switch_to.window(handle)
+        driver.close()
+    driver.switch_to.window(first)
+    return len(extra)
+
+
+class RecyclableDriver:
+    """WebDriver proxy whose underlying browser can be replaced between tests
+
+    Page objects and tests keep their reference to the proxy, so a recycled browser is
+    picked up without re-creating fixtures. The proxy is not a WebDriver subclass:
+    `isinstance(driver, WebDriver)` is False, so type checks (and helpers that make them)
+    must be given `driver.wrapped_driver`.
+    """
+
+    def __init__(self, factory: Callable[[], object]):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_driver", factory())
+        object.__setattr__(self, "recycle_count", 0)
+
+    @property
+    def wrapped_driver(self):
+        return self._driver
+
+    def recycle(self, reason: str = "") -> None:
+        """Quit the current browser and start a fresh one from the same factory"""
+        logger.warning(f"Recycling driver{': ' + reason if reason else ''}")
+        try:
+            self._driver.quit()
+        except Exception as e:
+            logger.error(f"Error quitting driver during recycle: {str(e)}")
+        object.__setattr__(self, "_driver", self._factory())
+        object.__setattr__(self, "recycle_count", self.recycle_count + 1)
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._driver, name, value)
+
+
+class ResourceMonitor:
+    """Samples the browser between tests, writes a per-worker time series and decides on recycling"""
+
+    def __init__(self, worker: str, directory: str):
+        self.worker = worker
+        self.path = os.path.join(directory, f"{worker}.jsonl")
+        os.makedirs(directory, exist_ok=True)
+        self._before: Optional[dict] = None
+
+    def sample(self, driver) -> dict:
+        """RSS/CPU of the driver and browser process tree, open windows and JS heap"""
+        target = getattr(driver, "wrapped_driver", driver)
+        sample = {"ts": round(time.time(), 3)}
+        pid = driver_root_pid(target)
+        tree = sample_tree(pid) if pid else None
+        if tree:
+            sample.update(tree)
+        try:
+            sample["windows"] = len(target.window_handles)
+            heap = target.execute_script(JS_HEAP_SCRIPT)
+            sample["js_heap_mb"] = round(heap / 1024 / 1024, 1) if heap else None
+        except Exception as e:
+            logger.debug(f"Could not sample browser state: {str(e)}")
+        return sample
+
+    def before_test(self, driver, nodeid: str) -> None:
+        self._before = self.sample(driver)
+        self._write(dict(self._before, test=nodeid, phase="start"))
+
+    def after_test(self, driver, nodeid: str) -> Optional[str]:
+        """Record the sample and growth during the test; return why the driver should be recycled, if it should"""
+        after = self.sample(driver)
+        delta = {}
+        if self._before:
+            for key in ("rss_mb", "windows", "js_heap_mb"):
+                if after.get(key) is not None and self._before.get(key) is not None:
+                    delta[key] = round(after[key] - self._before[key], 1)
+        self._write(dict(after, test=nodeid, phase="end", delta=delta))
+        if after.get("windows", 0) > 1:
+            # Tabs a test leaves open (e.g. social links) are closed; only windows that will not close recycle
+            try:
+                after["windows"] -= close_extra_windows(getattr(driver, "wrapped_driver", driver))
+            except Exception as e:
+                logger.warning(f"Could not close extra windows: {str(e)}")
+        return self.recycle_reason(after)
+
+    @staticmethod
+    def recycle_reason(sample: dict) -> Optional[str]:
+        if sample.get("rss_mb", 0) > Config.RECYCLE_RSS_MB:
+            return f"browser RSS {sample['rss_mb']}MB > {Config.RECYCLE_RSS_MB}MB"
+        if sample.get("windows", 0) > Config.RECYCLE_WINDOW_HANDLES:
+            return f"{sample['windows']} open windows > {Config.RECYCLE_WINDOW_HANDLES}"
+        if (sample.get("js_heap_mb") or 0) > Config.RECYCLE_JS_HEAP_MB:
+            return f"JS heap {sample['js_heap_mb']}MB > {Config.RECYCLE_JS_HEAP_MB}MB"
+        return None
+
+    def record_recycle(self, nodeid: str, reason: str) -> None:
+        self._write({"ts": round(time.time(), 3), "test": nodeid, "phase": "recycle", "reason": reason})
+
+    def _write(self, record: dict) -> None:
+        record["worker"] = self.worker
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+def top_leakers(directory: str, top: int = 5) -> Dict[str, List[tuple]]:
+    """Tests with the largest total growth per metric across all worker time series"""
+    totals: Dict[str, Dict[str, float]] = {"rss_mb": {}, "windows": {}, "js_heap_mb": {}}
+    recycles = []
+    for path in glob.glob(os.path.join(directory, "*.jsonl")):
+        with open(path) as f:
+            for line in f:
+                record = json.loads(line)
+                if record.get("phase") == "recycle":
+                    recycles.append((record["test"], record["reason"]))
+                for key, value in record.get("delta", {}).items():
+                    totals[key][record["test"]] = totals[key].get(record["test"], 0.0) + value
+    leakers = {key: sorted(((t, v) for t, v in values.items() if v > 0), key=lambda tv: -tv[1])[:top]
+               for key, values in totals.items()}
+    leakers["recycles"] = recycles
+    return leakers
@@ -0,0 +1,456 @@
+import json
+import logging
+import os
+import re
+import time
+from collections import defaultdict, deque
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import pytest
+from utils.config import Config
+from utils.stats import percentile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TEST_SECONDS = 10.0
+DEFAULT_STARTUP_SECONDS = 5.0
+PARAM_IDS = re.compile(r"\[(.*)\]$")
+
+
+def appended(base: List[float], samples: List[float]) -> List[float]:
+    """Samples added to a copy of `base` (capped lists, so the front of the copy may have scrolled off)"""
+    for added in range(len(samples) + 1):
+        kept = samples[:len(samples) - added]
+        if not kept or base[-len(kept):] == kept:
+            return samples[len(samples) - added:]
+    return list(samples)
+
+
+def browser_of(nodeid: str, browsers: Sequence[str]) -> str:
+    """Browser a parametrized test id runs on, e.g. 'test_x[firefox]' -> 'firefox'"""
+    match = PARAM_IDS.search(nodeid)
+    if match:
+        for part in match.group(1).split("-"):
+            if part in browsers:
+                return part
+    return browsers[0] if browsers else "default"
+
+
+class DurationHistory:
+    """Recorded per-test and per-browser startup durations used to predict run times
+
+    Test ids include the browser parameter, so every test has its own history per browser.
+    """
+
+    def __init__(self, path: str, max_samples: int = 20):
+        self.path = path
+        self.max_samples = max_samples
+        data = self._read()
+        self.tests: Dict[str, List[float]] = data.get("tests", {})
+        self.startup: Dict[str, List[float]] = data.get("startup", {})
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable duration history {self.path}: {str(e)}")
+            return {}
+
+    def record(self, nodeid: str, seconds: float) -> None:
+        samples = self.tests.setdefault(nodeid, [])
+        samples.append(round(seconds, 3))
+        del samples[:-self.max_samples]
+
+    def record_startup(self, browser: str, seconds: float) -> None:
+        samples = self.startup.setdefault(browser, [])
+        samples.append(round(seconds, 3))
+        del samples[:-self.max_samples]
+
+    def absorb(self, base: 'DurationHistory', other: 'DurationHistory') -> None:
+        """Add the samples another job recorded on top of its copy of `base` (a CI shard's history)"""
+        for mine, theirs, before in ((self.tests, other.tests, base.tests),
+                                     (self.startup, other.startup, base.startup)):
+            for key, samples in theirs.items():
+                target = mine.setdefault(key, [])
+                target.extend(appended(before.get(key, []), samples))
+                del target[:-self.max_samples]
+
+    def known(self, nodeid: str) -> bool:
+        return bool(self.tests.get(nodeid))
+
+    def estimate(self, nodeid: str, browser: str, browsers: Sequence[str] = ()) -> float:
+        """Median of the test's history; unknown tests get the median of their browser, then of all tests"""
+        if self.tests.get(nodeid):
+            return percentile(self.tests[nodeid], 50)
+        same_browser = [percentile(v, 50) for k, v in self.tests.items()
+                        if v and browser_of(k, browsers or [browser]) == browser]
+        if same_browser:
+            return percentile(same_browser, 50)
+        everything = [percentile(v, 50) for v in self.tests.values() if v]
+        return percentile(everything, 50) if everything else DEFAULT_TEST_SECONDS
+
+    def startup_estimate(self, browser: str) -> float:
+        samples = self.startup.get(browser)
+        return percentile(samples, 50) if samples else DEFAULT_STARTUP_SECONDS
+
+    def save(self) -> None:
+        """Write the history atomically (only the controller process writes it)"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"tests": self.tests, "startup": self.startup}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        logger.debug(f"Saved test durations to {self.path}")
+
+
+class Plan:
+    """Result of a longest-processing-time-first partition"""
+
+    def __init__(self, bins: List[List[int]], loads: List[float], ideal: float):
+        self.bins = bins
+        self.loads = loads
+        self.ideal = ideal
+
+    @property
+    def makespan(self) -> float:
+        return max(self.loads) if self.loads else 0.0
+
+
+def lpt_partition(entries: Iterable[Tuple[int, str, float]], bins: int,
+                  startup: Dict[str, float]) -> Plan:
+    """Assign (index, browser, seconds) entries to bins, longest first, onto the least loaded bin
+
+    A bin pays a browser's startup cost the first time it receives that browser, which keeps
+    each browser on as few bins as balance allows. Ties resolve by bin and index order, so the
+    plan is deterministic for a given input. Each bin is ordered by browser, then index.
+    """
+    entries = sorted(entries, key=lambda entry: (-entry[2], entry[0]))
+    contents: List[List[Tuple[int, str]]] = [[] for _ in range(bins)]
+    loads = [0.0] * bins
+    browsers: List[set] = [set() for _ in range(bins)]
+    for index, browser, seconds in entries:
+        def cost(b):
+            return loads[b] + seconds + (0.0 if browser in browsers[b] else startup.get(browser, 0.0))
+        target = min(range(bins), key=lambda b: (cost(b), b))
+        loads[target] = cost(target)
+        browsers[target].add(browser)
+        contents[target].append((index, browser))
+    total = sum(entry[2] for entry in entries) + sum(startup.get(b, 0.0) for b in {e[1] for e in entries})
+    longest = max((entry[2] for entry in entries), default=0.0)
+    ordered = [[index for index, _ in sorted(content, key=lambda c: (c[1], c[0]))] for content in contents]
+    return Plan(ordered, loads, max(total / bins if bins else 0.0, longest))
+
+
+class DurationScheduling:
+    """xdist scheduler that plans the run with LPT over recorded durations
+
+    Each worker gets a queue from the plan and is fed two tests at a time. A worker that
+    runs dry steals from the end of the queue with the most predicted time left, preferring
+    tests for the browser it currently has open (switching the parametrized session driver
+    tears the open browser down).
+    """
+
+    def __init__(self, config, log, history: DurationHistory, browsers: Sequence[str]):
+        # xdist internals are only needed once a distributed run builds its scheduler
+        from xdist.remote import Producer
+        from xdist.workermanage import parse_spec_config
+
+        self.numnodes = len(parse_spec_config(config))
+        self.config = config
+        self.log = log.durationsched if log is not None else Producer("durationsched")
+        self.history = history
+        self.browsers = list(browsers)
+        self.node2collection = {}
+        self.node2pending = {}
+        self.node2queue: Dict[object, deque] = {}
+        self.node2browser: Dict[object, str] = {}
+        self.orphans: deque = deque()
+        self.collection: Optional[List[str]] = None
+        self.estimates: List[float] = []
+        self.plan: Optional[Plan] = None
+        self.covered = 0
+        self.started: Optional[float] = None
+
+    @property
+    def nodes(self):
+        return list(self.node2pending.keys())
+
+    @property
+    def collection_is_completed(self):
+        return len(self.node2collection) >= self.numnodes
+
+    @property
+    def tests_finished(self):
+        if not self.collection_is_completed or self.orphans:
+            return False
+        if any(self.node2queue.values()):
+            return False
+        return all(len(pending) < 2 for pending in self.node2pending.values())
+
+    @property
+    def has_pending(self):
+        return bool(self.orphans) or any(self.node2queue.values()) or any(self.node2pending.values())
+
+    def add_node(self, node):
+        assert node not in self.node2pending
+        self.node2pending[node] = []
+        self.node2queue[node] = deque()
+
+    def add_node_collection(self, node, collection):
+        assert node in self.node2pending
+        if self.collection_is_completed and self.collection is not None and collection != self.collection:
+            from xdist.report import report_collection_diff
+
+            other = next(iter(self.node2collection))
+            self.log(report_collection_diff(self.collection, collection, other.gateway.id, node.gateway.id))
+            return
+        self.node2collection[node] = list(collection)
+
+    def mark_test_complete(self, node, item_index, duration=0):
+        self.node2pending[node].remove(item_index)
+        self._top_up(node)
+
+    def mark_test_pending(self, item):
+        self.orphans.appendleft(self.collection.index(item))
+        for node in self.nodes:
+            self._top_up(node)
+
+    def remove_node(self, node):
+        pending = self.node2pending.pop(node)
+        queue = self.node2queue.pop(node, deque())
+        self.node2browser.pop(node, None)
+        crashitem = self.collection[pending.pop(0)] if pending else None
+        self.orphans.extend(pending)
+        self.orphans.extend(queue)
+        for other in self.nodes:
+            self._top_up(other)
+        return crashitem
+
+    def schedule(self):
+        assert self.collection_is_completed
+        if self.collection is not None:
+            for node in self.nodes:
+                self._top_up(node)
+            return
+        collections = list(self.node2collection.values())
+        if any(collection != collections[0] for collection in collections[1:]):
+            self.log("**Different tests collected, aborting run**")
+            return
+        self.collection = collections[0]
+        if not self.collection:
+            return
+        self.started = time.monotonic()
+        self.covered = sum(1 for nodeid in self.collection if self.history.known(nodeid))
+        self.estimates = [self.history.estimate(nodeid, self._browser(i), self.browsers)
+                          for i, nodeid in enumerate(self.collection)]
+        startup = {browser: self.history.startup_estimate(browser) for browser in self.browsers}
+        entries = [(i, self._browser(i), seconds) for i, seconds in enumerate(self.estimates)]
+        self.plan = self._plan(entries, startup)
+        for node, indices in zip(self.nodes, self.plan.bins):
+            self.node2queue[node].extend(indices)
+        for node in self.nodes:
+            self._top_up(node)
+
+    def _plan(self, entries: List[Tuple[int, str, float]], startup: Dict[str, float]) -> Plan:
+        return lpt_partition(entries, len(self.nodes), startup)
+
+    def _browser(self, index: int) -> str:
+        return browser_of(self.collection[index], self.browsers)
+
+    def _top_up(self, node):
+        """Keep two tests in flight on the node; shut it down when there is nothing left for it"""
+        if node.shutting_down or self.collection is None:
+            return
+        pending = self.node2pending[node]
+        if len(pending) >= 2:
+            return
+        batch = []
+        exhausted = False
+        while len(pending) + len(batch) < 2:
+            index = self._next_for(node)
+            if index is None:
+                exhausted = True
+                break
+            batch.append(index)
+            self.node2browser[node] = self._browser(index)
+        if batch:
+            pending.extend(batch)
+            node.send_runtest_some(batch)
+        elif exhausted and not self.node2queue[node]:
+            # Nothing left for this node; tests already in flight still finish before it exits
+            node.shutdown()
+
+    def _next_for(self, node) -> Optional[int]:
+        if self.orphans:
+            return self.orphans.popleft()
+        if self.node2queue[node]:
+            return self.node2queue[node].popleft()
+        victims = [other for other in self.node2queue if other is not node and self.node2queue[other]]
+        if not victims:
+            return None
+        victim = max(victims, key=lambda other: sum(self.estimates[i] for i in self.node2queue[other]))
+        queue = self.node2queue[victim]
+        current = self.node2browser.get(node)
+        for position in range(len(queue) - 1, -1, -1):
+            if self._browser(queue[position]) == current:
+                index = queue[position]
+                del queue[position]
+                return index
+        # Taking a new browser only pays off if the victim has more queued work than a browser startup
+        index = queue[-1]
+        remaining = sum(self.estimates[i] for i in queue)
+        if remaining <= self.history.startup_estimate(self._browser(index)):
+            return None
+        return queue.pop()
+
+
+def allocate_workers(totals: Dict[str, float], workers: int) -> List[List[str]]:
+    """Browsers each worker runs, in proportion to each browser's expected total time
+
+    With at least as many workers as browsers every worker gets exactly one browser: each
+    browser starts with one worker and every further worker goes to the browser with the
+    highest expected time per worker. With fewer workers, whole browsers are packed LPT.
+    """
+    browsers = sorted(totals, key=lambda b: (-totals[b], b))
+    if workers >= len(browsers):
+        counts = {browser: 1 for browser in browsers}
+        for _ in range(workers - len(browsers)):
+            busiest = max(browsers, key=lambda b: (totals[b] / counts[b], -browsers.index(b)))
+            counts[busiest] += 1
+        return [[browser] for browser in browsers for _ in range(counts[browser])]
+    plan = lpt_partition([(i, b, totals[b]) for i, b in enumerate(browsers)], workers, {})
+    return [[browsers[i] for i in indices] for indices in plan.bins]
+
+
+class BrowserAffinityScheduling(DurationScheduling):
+    """xdist scheduler that dedicates workers to browsers so each keeps one warm session driver
+
+    Workers are split between browsers in proportion to expected time; each browser's tests
+    are then balanced LPT across its own workers, and work is only stolen within a browser.
+    """
+
+    def __init__(self, config, log, history: DurationHistory, browsers: Sequence[str]):
+        super().__init__(config, log, history, browsers)
+        self.node2browsers: Dict[object, List[str]] = {}
+
+    def _plan(self, entries: List[Tuple[int, str, float]], startup: Dict[str, float]) -> Plan:
+        totals = defaultdict(float)
+        for _, browser, seconds in entries:
+            totals[browser] += seconds
+        allocation = allocate_workers(totals, len(self.nodes))
+        bins: List[List[int]] = [[] for _ in allocation]
+        loads = [sum(startup.get(browser, 0.0) for browser in browsers) for browsers in allocation]
+        for browser in sorted(totals):
+            owners = [w for w, browsers in enumerate(allocation) if browser in browsers]
+            share = lpt_partition([e for e in entries if e[1] == browser], len(owners), {})
+            for owner, indices, load in zip(owners, share.bins, share.loads):
+                bins[owner].extend(indices)
+                loads[owner] += load
+        for node, browsers in zip(self.nodes, allocation):
+            self.node2browsers[node] = browsers
+        # Run each worker's browsers one after another
+        bins = [sorted(indices, key=lambda i: (self._browser(i), i)) for indices in bins]
+        total = sum(e[2] for e in entries) + sum(startup.get(b, 0.0) for b in totals)
+        longest = max((e[2] for e in entries), default=0.0)
+        return Plan(bins, loads, max(total / len(bins), longest))
+
+    def _next_for(self, node) -> Optional[int]:
+        own = self.node2browsers.get(node, [])
+        for position, index in enumerate(self.orphans):
+            if self._browser(index) in own:
+                del self.orphans[position]
+                return index
+        if self.node2queue[node]:
+            return self.node2queue[node].popleft()
+        victims = [other for other in self.node2queue
+                   if other is not node and any(self._browser(i) in own for i in self.node2queue[other])]
+        if victims:
+            victim = max(victims, key=lambda other: sum(self.estimates[i] for i in self.node2queue[other]))
+            queue = self.node2queue[victim]
+            for position in range(len(queue) - 1, -1, -1):
+                if self._browser(queue[position]) in own:
+                    index = queue[position]
+                    del queue[position]
+                    return index
+        # Tests of a browser whose workers have all gone are picked up by anyone
+        alive = {b for other in self.node2queue if other is not node and not other.shutting_down
+                 for b in self.node2browsers.get(other, [])}
+        for position, index in enumerate(self.orphans):
+            if self._browser(index) not in alive:
+                del self.orphans[position]
+                return index
+        return None
+
+
+class DurationSchedulingPlugin:
+    """Records test durations on the controller and, with --duration-scheduling or
+    --browser-affinity, plans xdist runs"""
+
+    def __init__(self, config):
+        self.config = config
+        self.enabled = config.getoption("--duration-scheduling")
+        self.browser_affinity = config.getoption("--browser-affinity")
+        self.browsers = [b.strip() for b in config.getoption("--browsers").split(",")]
+        self.history = DurationHistory(Config.DURATION_HISTORY_PATH)
+        self.scheduler: Optional[DurationScheduling] = None
+        self.busy: Dict[str, float] = defaultdict(float)
+        self.started_browsers = set()
+        self.partial: Dict[Tuple[str, str], float] = {}
+        self.session_start = time.monotonic()
+
+    @pytest.hookimpl(tryfirst=True, optionalhook=True)
+    def pytest_xdist_make_scheduler(self, config, log):
+        if self.browser_affinity:
+            self.scheduler = BrowserAffinityScheduling(config, log, self.history, self.browsers)
+        elif self.enabled:
+            self.scheduler = DurationScheduling(config, log, self.history, self.browsers)
+        return self.scheduler
+
+    def pytest_runtest_logreport(self, report):
+        node = getattr(report, "node", None)
+        worker = node.gateway.id if node is not None else "main"
+        self.busy[worker] += report.duration
+        browser = browser_of(report.nodeid, self.browsers)
+        seconds = report.duration
+        if report.when == "setup" and (worker, browser) not in self.started_browsers:
+            # The first setup of a browser on a worker is dominated by launching the session driver
+            self.started_browsers.add((worker, browser))
+            if report.passed:
+                self.history.record_startup(browser, seconds)
+            seconds = 0.0
+        key = (report.nodeid, worker)
+        self.partial[key] = self.partial.get(key, 0.0) + seconds
+        if report.when == "teardown":
+            total = self.partial.pop(key, 0.0)
+            if not report.skipped:
+                self.history.record(report.nodeid, total)
+
+    def pytest_sessionfinish(self, session):
+        try:
+            self.history.save()
+        except OSError as e:
+            logger.error(f"Failed to save test durations: {str(e)}")
+
+    def pytest_terminal_summary(self, terminalreporter):
+        scheduler = self.scheduler
+        if scheduler is None or scheduler.plan is None:
+            return
+        plan = scheduler.plan
+        actual = max(self.busy.values(), default=0.0)
+        wall = time.monotonic() - (scheduler.started or self.session_start)
+        terminalreporter.section("duration scheduling")
+        terminalreporter.write_line(
+            f"predicted makespan {plan.makespan:.1f}s (ideal {plan.ideal:.1f}s), "
+            f"actual {actual:.1f}s busy / {wall:.1f}s wall on {len(plan.loads)} workers"
+        )
+        terminalreporter.write_line(
+            f"predicted per worker: {', '.join(f'{load:.1f}s' for load in plan.loads)}; "
+            f"actual: {', '.join(f'{w} {s:.1f}s' for w, s in sorted(self.busy.items()))}"
+        )
+        terminalreporter.write_line(f"history covered {scheduler.covered}/{len(scheduler.collection)} tests")
+        if isinstance(scheduler, BrowserAffinityScheduling):
+            terminalreporter.write_line("browsers per worker: " + ", ".join(
+                f"{node.gateway.id} {'+'.join(browsers)}" for node, browsers in scheduler.node2browsers.items()
+            ))
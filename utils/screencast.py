@@ -0,0 +1,146 @@
+"""Background screencast of a Chromium tab.
+
+A thread of its own connects to the browser's DevTools endpoint, starts Page.startScreencast
+on the test's tab and collects the JPEG frames the browser pushes, acknowledging each one.
+The test thread never waits for frames. Consecutive identical frames are dropped and only
+the newest SCREENCAST_MAX_FRAMES / SCREENCAST_MAX_MB are kept. Encoding to an animated GIF
+happens after the test, and only when the result is needed (a failure).
+"""
+import base64
+import collections
+import io
+import json
+import logging
+import threading
+import urllib.request
+from typing import Deque, List, Optional, Tuple
+from utils.config import Config
+from utils.context_pool import DEBUGGER_CAPABILITY
+
+logger = logging.getLogger(__name__)
+
+Frame = Tuple[float, bytes]  # browser timestamp in seconds, JPEG bytes
+
+
+def _devtools_endpoint(driver) -> Tuple[str, str]:
+    """Browser WebSocket URL and major version from the session's debugger address"""
+    capabilities = driver.capabilities
+    address = next((capabilities[key]['debuggerAddress'] for key in DEBUGGER_CAPABILITY.values()
+                    if isinstance(capabilities.get(key), dict) and capabilities[key].get('debuggerAddress')), None)
+    if address is None:
+        raise RuntimeError("Session has no DevTools debugger address")
+    with urllib.request.urlopen(f"http://{address}/json/version", timeout=5) as response:
+        details = json.loads(response.read())
+    return details['webSocketDebuggerUrl'], details['Browser'].split('/')[1].split('.')[0]
+
+
+class ScreencastRecorder:
+    """Collects screencast frames of the driver's current tab on a background thread"""
+
+    def __init__(self, driver, max_frames: int = None, max_bytes: int = None):
+        self.driver = getattr(driver, "wrapped_driver", driver)
+        self.max_frames = max_frames or Config.SCREENCAST_MAX_FRAMES
+        self.max_bytes = max_bytes or int(Config.SCREENCAST_MAX_MB * 1024 * 1024)
+        self.frames: Deque[Frame] = collections.deque()
+        self.received = 0
+        self.duplicates = 0
+        self.evicted = 0
+        self.error: Optional[str] = None
+        self._bytes = 0
+        self._last: Optional[bytes] = None
+        self._lock = threading.Lock()
+        self._started = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, timeout: float = 5.0) -> 'ScreencastRecorder':
+        """Start recording; waits (in test setup) until the browser has accepted the screencast"""
+        target_id = self.driver.current_window_handle
+        self._thread = threading.Thread(target=self._run, args=(target_id,), name="screencast", daemon=True)
+        self._thread.start()
+        if not self._started.wait(timeout):
+            logger.warning(f"Screencast did not start within {timeout}s{': ' + self.error if self.error else ''}")
+        return self
+
+    def _run(self, target_id: str) -> None:
+        try:
+            import trio
+            trio.run(self._record, target_id)
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {str(e)}"
+            logger.warning(f"Screencast stopped: {self.error}")
+        finally:
+            self._started.set()
+
+    async def _record(self, target_id: str) -> None:
+        import trio
+        from selenium.webdriver.common.bidi import cdp
+
+        ws_url, version = _devtools_endpoint(self.driver)
+        devtools = cdp.import_devtools(version)
+        async with cdp.open_cdp(ws_url) as connection:
+            async with connection.open_session(target_id) as session:
+                await session.execute(devtools.page.start_screencast(
+                    format_='jpeg', quality=Config.SCREENCAST_QUALITY,
+                    max_width=Config.SCREENCAST_MAX_WIDTH, max_height=Config.SCREENCAST_MAX_HEIGHT))
+                self._started.set()
+                async with trio.open_nursery() as nursery:
+                    nursery.start_soon(self._watch_stop, nursery.cancel_scope)
+                    async for event in session.listen(devtools.page.ScreencastFrame, buffer_size=32):
+                        await session.execute(devtools.page.screencast_frame_ack(event.session_id))
+                        self._add(event.metadata.timestamp or 0.0, base64.b64decode(event.data))
+                with trio.move_on_after(2):
+                    await session.execute(devtools.page.stop_screencast())
+
+    async def _watch_stop(self, cancel_scope) -> None:
+        import trio
+
+        while not self._stop.is_set():
+            await trio.sleep(0.1)
+        cancel_scope.cancel()
+
+    def _add(self, timestamp: float, jpeg: bytes) -> None:
+        with self._lock:
+            self.received += 1
+            if jpeg == self._last:
+                self.duplicates += 1
+                return
+            self._last = jpeg
+            self.frames.append((timestamp, jpeg))
+            self._bytes += len(jpeg)
+            while len(self.frames) > self.max_frames or (self._bytes > self.max_bytes and len(self.frames) > 1):
+                _, dropped = self.frames.popleft()
+                self._bytes -= len(dropped)
+                self.evicted += 1
+
+    def stop(self, timeout: float = 5.0) -> List[Frame]:
+        """Stop recording and return the kept frames, oldest first"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        with self._lock:
+            logger.debug(f"Screencast: {self.received} frames received, {self.duplicates} duplicates dropped, "
+                         f"{self.evicted} evicted, {len(self.frames)} kept ({self._bytes // 1024} KB)")
+            return list(self.frames)
+
+
+def encode_gif(frames: List[Frame], max_fps: float = None) -> bytes:
+    """Animated GIF of the frames with their real timing; frames closer than 1/max_fps are merged"""
+    from PIL import Image
+
+    min_gap = 1.0 / (max_fps or Config.SCREENCAST_MAX_FPS)
+    kept: List[Frame] = []
+    for frame in frames:
+        if kept and frame[0] - kept[-1][0] < min_gap:
+            kept[-1] = (kept[-1][0], frame[1])
+        else:
+            kept.append(frame)
+    images = [Image.open(io.BytesIO(jpeg)).convert("RGB") for _, jpeg in kept]
+    size = images[0].size
+    images = [image if image.size == size else image.resize(size) for image in images]
+    durations = [max(20, int((b[0] - a[0]) * 1000)) for a, b in zip(kept, kept[1:])] + [1500]
+    palette = [image.quantize(colors=128, method=Image.Quantize.FASTOCTREE) for image in images]
+    buffer = io.BytesIO()
+    palette[0].save(buffer, format="GIF", save_all=True, append_images=palette[1:], duration=durations,
+                    loop=0, optimize=True, disposal=1)
+    return buffer.getvalue()
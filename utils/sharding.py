@@ -0,0 +1,229 @@
+"""Deterministic, duration-balanced sharding of the collected tests across CI jobs.
+
+Each job runs `pytest --shard=i/N`; the shards are planned longest-first from the recorded
+duration history, so the same test set and history always give the same split. Every shard
+writes a manifest, and the verify command checks that the shards together run each
+collected test exactly once. Shards must plan from the same history, so CI restores one
+history per browser and merge-history folds what every shard recorded back into it.
+
+Usage:
+    pytest tests/ --shard=2/4
+    python -m utils.sharding verify reports/shards/
+    python -m utils.sharding merge-history reports/history shard-histories/*/
+"""
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pytest
+
+from utils.config import Config
+from utils.scheduling import DurationHistory, Plan, appended, browser_of, lpt_partition
+from utils.timing_store import TimingStore
+
+logger = logging.getLogger(__name__)
+
+SHARD_SPEC = re.compile(r"^(\d+)/(\d+)$")
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """Parse '2/4' into (2, 4); shards are numbered from 1"""
+    match = SHARD_SPEC.match(value.strip())
+    if not match or not 1 <= int(match.group(1)) <= int(match.group(2)):
+        raise pytest.UsageError(f"--shard expects i/N with 1 <= i <= N, got '{value}'")
+    return int(match.group(1)), int(match.group(2))
+
+
+def digest(values: Sequence[str]) -> str:
+    return hashlib.sha256("\n".join(values).encode()).hexdigest()[:16]
+
+
+def plan_shards(nodeids: Sequence[str], total: int, history: DurationHistory,
+                browsers: Sequence[str]) -> Tuple[List[str], Plan]:
+    """Split test ids into `total` shards balanced by predicted duration
+
+    Ids are sorted first so the plan depends only on the test set and the history, not on
+    collection order. Returns the sorted ids and the plan (bins hold indices into them).
+    """
+    ordered = sorted(nodeids)
+    entries = [(i, browser_of(nodeid, browsers), history.estimate(nodeid, browser_of(nodeid, browsers), browsers))
+               for i, nodeid in enumerate(ordered)]
+    startup = {browser: history.startup_estimate(browser) for browser in browsers}
+    return ordered, lpt_partition(entries, total, startup)
+
+
+class ShardingPlugin:
+    """Keeps only this job's shard of the collection and writes its manifest"""
+
+    def __init__(self, config, shard: str):
+        self.config = config
+        self.index, self.total = parse_shard(shard)
+        self.browsers = [b.strip() for b in config.getoption("--browsers").split(",")]
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_collection_modifyitems(self, session, config, items):
+        """Runs after -k/-m deselection, so shards partition the final selection"""
+        history = DurationHistory(Config.DURATION_HISTORY_PATH)
+        ordered, plan = plan_shards([item.nodeid for item in items], self.total, history, self.browsers)
+        selected_ids = {ordered[i] for i in plan.bins[self.index - 1]}
+        selected = [item for item in items if item.nodeid in selected_ids]
+        deselected = [item for item in items if item.nodeid not in selected_ids]
+        if deselected:
+            config.hook.pytest_deselected(items=deselected)
+        items[:] = selected
+        logger.info(f"Shard {self.index}/{self.total}: {len(selected)} of {len(ordered)} tests, "
+                    f"predicted {plan.loads[self.index - 1]:.1f}s (slowest shard {plan.makespan:.1f}s)")
+        # Under xdist every worker collects; one manifest per shard is enough
+        worker = getattr(config, "workerinput", {}).get("workerid")
+        if worker in (None, "gw0"):
+            self.write_manifest(ordered, plan, history)
+
+    def write_manifest(self, ordered: List[str], plan: Plan, history: DurationHistory) -> None:
+        manifest = {
+            "shard": self.index,
+            "total": self.total,
+            "collection_digest": digest(ordered),
+            "history_digest": digest([json.dumps(history.tests, sort_keys=True)]),
+            "collection": ordered,
+            "selected": [ordered[i] for i in plan.bins[self.index - 1]],
+            "predicted_seconds": [round(load, 2) for load in plan.loads]
+        }
+        os.makedirs(Config.SHARD_MANIFEST_PATH, exist_ok=True)
+        path = os.path.join(Config.SHARD_MANIFEST_PATH, f"shard-{self.index}-of-{self.total}.json")
+        with open(path, "w") as f:
+            json.dump(manifest, f, indent=1)
+        logger.info(f"Shard manifest written to {path}")
+
+
+def verify(manifests: List[dict]) -> List[str]:
+    """Problems with a set of shard manifests; empty when they exactly cover the collection"""
+    if not manifests:
+        return ["no shard manifests found"]
+    problems = []
+    totals = {m["total"] for m in manifests}
+    if len(totals) > 1:
+        problems.append(f"manifests disagree on the shard count: {sorted(totals)}")
+    total = max(totals)
+    seen = sorted(m["shard"] for m in manifests)
+    missing = sorted(set(range(1, total + 1)) - set(seen))
+    if missing:
+        problems.append(f"missing shards: {missing}")
+    duplicated = sorted({s for s in seen if seen.count(s) > 1})
+    if duplicated:
+        problems.append(f"duplicate manifests for shards: {duplicated}")
+    if len({m["collection_digest"] for m in manifests}) > 1:
+        problems.append("shards collected different test sets")
+    if len({m["history_digest"] for m in manifests}) > 1:
+        problems.append("shards planned from different duration histories")
+    owners: Dict[str, List[int]] = {}
+    for m in manifests:
+        for nodeid in m["selected"]:
+            owners.setdefault(nodeid, []).append(m["shard"])
+    collection = set().union(*(m["collection"] for m in manifests))
+    for nodeid in sorted(collection - set(owners)):
+        problems.append(f"not run by any shard: {nodeid}")
+    for nodeid, shards in sorted(owners.items()):
+        if len(shards) > 1:
+            problems.append(f"run by shards {shards}: {nodeid}")
+    return problems
+
+
+def load_manifests(paths: List[str]) -> List[dict]:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "**", "shard-*-of-*.json"), recursive=True)))
+        else:
+            files.append(path)
+    manifests = []
+    for file in files:
+        with open(file) as f:
+            manifests.append(json.load(f))
+    return manifests
+
+
+def merge_history(history: str, shards: List[str]) -> None:
+    """Fold the durations, flake records, wait timings and dependency map each shard added into `history`
+
+    Every shard started from a copy of `history`, so only what a shard appended to its copy
+    is taken from it.
+    """
+    from utils.change_impact import load_map
+    from utils.flakiness import FlakeStore
+
+    def path(directory: str, configured: str) -> str:
+        return os.path.join(directory, os.path.basename(configured))
+
+    os.makedirs(history, exist_ok=True)
+    base = DurationHistory(path(history, Config.DURATION_HISTORY_PATH))
+    durations = DurationHistory(base.path)
+    timings_base = TimingStore(path(history, Config.TIMING_STORE_PATH))
+    timings = TimingStore(timings_base.path)
+    dependencies_base = load_map(path(history, Config.DEPENDENCY_MAP_PATH))
+    dependencies = dict(dependencies_base)
+    flakes = FlakeStore(path(history, Config.FLAKE_DB_PATH))
+    after_id = flakes.last_id()
+    for shard in shards:
+        durations.absorb(base, DurationHistory(path(shard, Config.DURATION_HISTORY_PATH)))
+        try:
+            with open(path(shard, Config.TIMING_STORE_PATH)) as f:
+                shard_timings = json.load(f)
+        except (OSError, ValueError):
+            shard_timings = {}
+        for browser, keys in shard_timings.items():
+            for key, samples in keys.items():
+                added = appended(timings_base.samples(browser, key), samples)
+                if added and len(added) == len(samples) and timings_base.samples(browser, key):
+                    # Nothing of the base is left: the shard discarded the key's history after a timeout
+                    timings.miss(browser, key, added[0])
+                    added = added[1:]
+                for seconds in added:
+                    timings.record(browser, key, seconds)
+        for test, entry in load_map(path(shard, Config.DEPENDENCY_MAP_PATH)).items():
+            if entry != dependencies_base.get(test):
+                dependencies[test] = entry
+        if os.path.isfile(path(shard, Config.FLAKE_DB_PATH)):
+            copied = flakes.absorb(path(shard, Config.FLAKE_DB_PATH), after_id)
+            logger.info(f"Merged {copied} flake records from {shard}")
+    flakes.close()
+    durations.save()
+    timings.save()
+    with open(path(history, Config.DEPENDENCY_MAP_PATH), "w") as f:
+        json.dump({"tests": dependencies}, f, indent=1, sort_keys=True)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Check CI shard manifests and merge shard histories")
+    commands = parser.add_subparsers(dest="command", required=True)
+    check = commands.add_parser("verify", help="Verify the shards together run every collected test once")
+    check.add_argument("paths", nargs="+", help="Manifest files or directories containing them")
+    merge = commands.add_parser("merge-history", help="Fold the history each shard recorded into one")
+    merge.add_argument("history", help="History directory the shards started from (updated in place)")
+    merge.add_argument("shards", nargs="+", help="History directories uploaded by the shards")
+    args = parser.parse_args(argv)
+
+    if args.command == "merge-history":
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        merge_history(args.history, args.shards)
+        return 0
+    manifests = load_manifests(args.paths)
+    problems = verify(manifests)
+    for m in sorted(manifests, key=lambda m: m["shard"]):
+        print(f"shard {m['shard']}/{m['total']}: {len(m['selected'])} tests, "
+              f"predicted {m['predicted_seconds'][m['shard'] - 1]:.1f}s")
+    if problems:
+        for problem in problems:
+            print(f"ERROR: {problem}")
+        return 1
+    print(f"OK: {len(manifests)} shards cover all {len(manifests[0]['collection'])} tests exactly once")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
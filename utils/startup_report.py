@@ -0,0 +1,121 @@
+"""Time to first test, broken down into startup phases.
+
+Each phase is recorded the first time it happens in a process: interpreter and pytest
+startup (from process creation to conftest import), conftest imports, config validation,
+collection, driver resolution (webdriver-manager), browser launch and first navigation.
+The total runs from process creation until the first navigation has finished (or the first
+test call, if it navigates nowhere); whatever the phases do not cover (fixture setup,
+plugin hooks) is reported as "other".
+With --startup-report every process writes <STARTUP_REPORT_PATH>/<worker>.json and the
+controller prints them at the end of the run.
+"""
+import glob
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+from utils.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def _process_start() -> Optional[float]:
+    """Epoch time the current process was created (Linux /proc only)"""
+    try:
+        with open("/proc/self/stat") as f:
+            # The command name may contain spaces; fields after it are space separated
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - (uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupTimer:
+    """First-occurrence durations of the startup phases of this process"""
+
+    def __init__(self):
+        self.process_start = _process_start()
+        self.phases: Dict[str, float] = OrderedDict()
+        self.first_test: Optional[float] = None
+        self.first_page: Optional[float] = None
+
+    def record(self, name: str, seconds: float) -> None:
+        if name in self.phases or self.first_page is not None:
+            return
+        self.phases[name] = seconds
+        if name == "first navigation":
+            self.first_page = time.time()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def since_process_start(self, name: str, until: float = None) -> None:
+        """Record the time from process creation until `until` (epoch seconds, default now) as a phase"""
+        if self.process_start is not None:
+            self.record(name, (until or time.time()) - self.process_start)
+
+    def first_test_started(self) -> None:
+        if self.first_test is None:
+            self.first_test = time.time()
+
+    def report(self) -> dict:
+        phases = {name: round(seconds, 3) for name, seconds in self.phases.items()}
+        total = None
+        end = self.first_page or self.first_test
+        if end is not None and self.process_start is not None:
+            total = round(end - self.process_start, 3)
+            phases["other"] = round(max(0.0, total - sum(self.phases.values())), 3)
+        return {"worker": os.environ.get("PYTEST_XDIST_WORKER", "main"), "time_to_first_test": total,
+                "phases": phases}
+
+    def save(self, directory: str = None) -> str:
+        directory = directory or Config.STARTUP_REPORT_PATH
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{os.environ.get('PYTEST_XDIST_WORKER', 'main')}.json")
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+        return path
+
+
+def load_reports(directory: str = None) -> List[dict]:
+    reports = []
+    for path in sorted(glob.glob(os.path.join(directory or Config.STARTUP_REPORT_PATH, "*.json"))):
+        try:
+            with open(path) as f:
+                reports.append(json.load(f))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unreadable startup report {path}: {str(e)}")
+    return reports
+
+
+def format_report(report: dict) -> List[str]:
+    """Terminal lines for one process: the total, then each phase with its share"""
+    total = report["time_to_first_test"]
+    heading = f"{report['worker']}: {total:.2f}s to first test" if total is not None else \
+        f"{report['worker']}: no test started"
+    lines = [heading]
+    for name, seconds in report["phases"].items():
+        share = f" ({seconds / total:.0%})" if total else ""
+        lines.append(f"  {name:<24} {seconds:7.3f}s{share}")
+    return lines
+
+
+_timer: Optional[StartupTimer] = None
+
+
+def startup_timer() -> StartupTimer:
+    """Process-wide startup timer"""
+    global _timer
+    if _timer is None:
+        _timer = StartupTimer()
+    return _timer
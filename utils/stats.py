@@ -0,0 +1,29 @@
+import math
+from typing import Dict, Iterable, List
+
+
+def percentile(values: Iterable[float], q: float) -> float:
+    """Return the q-th percentile (0-100) using linear interpolation between closest ranks"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * q / 100.0
+    lower, upper = math.floor(rank), math.ceil(rank)
+    if lower == upper:
+        return float(ordered[int(rank)])
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def summarize(values: List[float], digits: int = 3) -> Dict[str, float]:
+    """Summarize samples as count, min, median, p95, p99, max and mean"""
+    if not values:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        'min': round(min(values), digits),
+        'median': round(percentile(values, 50), digits),
+        'p95': round(percentile(values, 95), digits),
+        'p99': round(percentile(values, 99), digits),
+        'max': round(max(values), digits),
+        'mean': round(sum(values) / len(values), digits)
+    }
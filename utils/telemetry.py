@@ -0,0 +1,274 @@
+"""Suite execution telemetry in the OpenMetrics text format.
+
+Every pytest process (controller or xdist worker) keeps counters and histograms for test
+durations by browser, driver startup, WebDriver commands, screenshots, reruns and page-load
+timings, and writes them to <METRICS_PATH>/<worker>.prom. At session end the controller sums
+the worker files into suite.prom. With --metrics-port a local endpoint serves the merged
+view while the run is in progress; workers flush their file every METRICS_FLUSH_SECONDS.
+"""
+import glob
+import http.server
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+from utils.config import Config
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+COMMAND_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 10)
+
+SAMPLE_LINE = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*(?:\{.*\})?) (\S+)$")
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(round(value, 6))
+
+
+class MetricsRegistry:
+    """Thread-safe counters and histograms rendered as OpenMetrics text"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta: Dict[str, Tuple[str, str, tuple]] = OrderedDict()  # name -> (type, help, buckets)
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, list]] = {}  # labels -> [bucket counts..., sum, count]
+
+    def counter(self, name: str, help_text: str) -> None:
+        self._meta.setdefault(name, ("counter", help_text, ()))
+        self._counters.setdefault(name, {})
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float] = SECONDS_BUCKETS) -> None:
+        self._meta.setdefault(name, ("histogram", help_text, tuple(buckets)))
+        self._histograms.setdefault(name, {})
+
+    def inc(self, name: str, amount: float = 1.0, **labels) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters[name]
+            series[key] = series.get(key, 0.0) + amount
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        buckets = self._meta[name][2]
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms[name].setdefault(key, [0] * len(buckets) + [0.0, 0])
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            for name, (kind, help_text, buckets) in self._meta.items():
+                lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"# HELP {name} {help_text}")
+                if kind == "counter":
+                    for labels, value in sorted(self._counters[name].items()):
+                        lines.append(f"{name}_total{_format_labels(labels)} {_format_value(value)}")
+                    continue
+                for labels, series in sorted(self._histograms[name].items()):
+                    for bound, count in zip(buckets, series):
+                        lines.append(f"{name}_bucket{_format_labels(labels, [('le', _format_value(bound))])} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {series[-1]}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(series[-2])}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {series[-1]}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+def merge(texts: List[str]) -> str:
+    """Sum the samples of several expositions of the same counters and histograms"""
+    metadata: "OrderedDict[str, List[str]]" = OrderedDict()
+    samples: "OrderedDict[str, OrderedDict[str, float]]" = OrderedDict()
+    for text in texts:
+        family = None
+        for line in text.splitlines():
+            if line.startswith("# TYPE ") or line.startswith("# HELP "):
+                family = line.split()[2]
+                if line not in metadata.setdefault(family, []):
+                    metadata[family].append(line)
+                samples.setdefault(family, OrderedDict())
+                continue
+            match = SAMPLE_LINE.match(line)
+            if match and family is not None:
+                key, value = match.groups()
+                samples[family][key] = samples[family].get(key, 0.0) + float(value)
+    lines = []
+    for family, meta in metadata.items():
+        lines.extend(meta)
+        lines.extend(f"{key} {_format_value(value)}" for key, value in samples[family].items())
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+def _new_registry() -> MetricsRegistry:
+    registry = MetricsRegistry()
+    registry.histogram("suite_test_duration_seconds", "Test call duration by browser and outcome")
+    registry.counter("suite_tests", "Finished tests by browser and outcome")
+    registry.counter("suite_test_reruns", "Failed attempts that were rerun, by browser")
+    registry.histogram("suite_driver_startup_seconds", "Time to create a WebDriver session, by browser")
+    registry.histogram("suite_webdriver_command_seconds", "WebDriver command latency by browser and command",
+                       COMMAND_BUCKETS)
+    registry.counter("suite_screenshots", "Screenshots taken, by browser and kind")
+    registry.counter("suite_screenshot_bytes", "PNG bytes of screenshots taken, by browser and kind")
+    registry.histogram("suite_page_load_seconds", "Navigation timing phases by browser and cache mode")
+    return registry
+
+
+_registry: Optional[MetricsRegistry] = None
+
+
+def suite_metrics() -> MetricsRegistry:
+    """Process-wide metrics registry"""
+    global _registry
+    if _registry is None:
+        _registry = _new_registry()
+    return _registry
+
+
+def instrument_driver(driver, browser: str) -> None:
+    """Time every WebDriver command the driver sends (command counts come from the histogram)"""
+    executor = driver.command_executor
+    send = executor.execute
+    registry = suite_metrics()
+
+    def execute(command, params):
+        start = time.perf_counter()
+        try:
+            return send(command, params)
+        finally:
+            registry.observe("suite_webdriver_command_seconds", time.perf_counter() - start,
+                             browser=browser, command=command)
+
+    executor.execute = execute
+
+
+def record_screenshot(browser: str, png: bytes, kind: str = "step") -> None:
+    suite_metrics().inc("suite_screenshots", browser=browser, kind=kind)
+    suite_metrics().inc("suite_screenshot_bytes", len(png), browser=browser, kind=kind)
+
+
+def record_page_load(browser: str, metrics: dict, cache_mode: str = "unknown") -> None:
+    for phase in ("ttfb", "dom_content_loaded", "load"):
+        value = metrics.get(f"{phase}_ms")
+        if value:
+            suite_metrics().observe("suite_page_load_seconds", value / 1000.0,
+                                    browser=browser, cache_mode=cache_mode, phase=phase)
+
+
+class MetricsPlugin:
+    """Feeds test outcomes into the registry, writes the per-worker file and merges them at the end"""
+
+    def __init__(self, config, port: int = 0):
+        from utils.scheduling import browser_of
+
+        self.config = config
+        self._browser_of = browser_of
+        self.worker = os.environ.get("PYTEST_XDIST_WORKER", "main")
+        self.is_controller = not hasattr(config, "workerinput")
+        # An xdist controller also receives every worker's reports; the workers' files already count them
+        self.counts_reports = not self.is_controller or getattr(config.option, "dist", "no") == "no"
+        self.browsers = [b.strip() for b in config.getoption("--browsers").split(",")]
+        self.registry = suite_metrics()
+        self._last_flush = time.time()
+        self._server: Optional[http.server.ThreadingHTTPServer] = None
+        if self.is_controller:
+            # Worker files of earlier runs must not leak into this run's totals
+            shutil.rmtree(Config.METRICS_PATH, ignore_errors=True)
+        if self.is_controller and port:
+            self._serve(port)
+
+    def pytest_runtest_logreport(self, report):
+        if not self.counts_reports:
+            return
+        browser = self._browser_of(report.nodeid, self.browsers)
+        if report.outcome == "rerun":
+            self.registry.inc("suite_test_reruns", browser=browser)
+        elif report.when == "call" or (report.when == "setup" and not report.passed):
+            outcome = "error" if report.when == "setup" and report.failed else report.outcome
+            self.registry.inc("suite_tests", browser=browser, outcome=outcome)
+            if report.when == "call":
+                self.registry.observe("suite_test_duration_seconds", report.duration, browser=browser, outcome=outcome)
+        if time.time() - self._last_flush >= Config.METRICS_FLUSH_SECONDS:
+            self.flush()
+
+    def flush(self) -> str:
+        os.makedirs(Config.METRICS_PATH, exist_ok=True)
+        path = os.path.join(Config.METRICS_PATH, f"{self.worker}.prom")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.registry.render())
+        os.replace(tmp_path, path)
+        self._last_flush = time.time()
+        return path
+
+    def merged(self) -> str:
+        texts = []
+        for path in sorted(glob.glob(os.path.join(Config.METRICS_PATH, "*.prom"))):
+            if os.path.basename(path) == "suite.prom":
+                continue
+            with open(path) as f:
+                texts.append(f.read())
+        return merge(texts)
+
+    def pytest_sessionfinish(self, session):
+        if not session.testscollected or session.config.option.collectonly:
+            return
+        self.flush()
+        if not self.is_controller:
+            return
+        with open(os.path.join(Config.METRICS_PATH, "suite.prom"), "w") as f:
+            f.write(self.merged())
+        logger.info(f"Suite metrics written to {os.path.join(Config.METRICS_PATH, 'suite.prom')}")
+
+    def pytest_unconfigure(self, config):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def _serve(self, port: int) -> None:
+        plugin = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                plugin.flush()
+                body = plugin.merged().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = http.server.ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-endpoint", daemon=True).start()
+        logger.info(f"Metrics endpoint: http://127.0.0.1:{self._server.server_address[1]}/metrics")
@@ -0,0 +1,104 @@
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Set
+from utils.config import Config
+from utils.file_lock import FileLock
+from utils.stats import percentile
+
+logger = logging.getLogger(__name__)
+
+
+class TimingStore:
+    """Per-browser history of how long each wait condition took to be satisfied
+
+    Waits without an explicit timeout use the learned p99 times a safety factor, capped
+    by the global constant, so a missing element stops costing the full EXPLICIT_WAIT once
+    enough history exists. A timed-out wait discards the key's history, so the next waits
+    use the ceiling until the key has been re-learned from the environment as it is now.
+    """
+
+    def __init__(self, path: str, max_samples: int = 200):
+        self.path = path
+        self.max_samples = max_samples
+        self._history: Dict[str, Dict[str, List[float]]] = self._read()
+        self._new: Dict[str, Dict[str, List[float]]] = {}
+        self._reset: Dict[str, Set[str]] = {}
+
+    def _read(self) -> Dict[str, Dict[str, List[float]]]:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable timing store {self.path}: {str(e)}")
+            return {}
+
+    def record(self, browser: str, key: str, seconds: float) -> None:
+        """Record how long a condition took to be satisfied (or how long a timed-out wait waited)"""
+        self._history.setdefault(browser, {}).setdefault(key, []).append(round(seconds, 4))
+        self._new.setdefault(browser, {}).setdefault(key, []).append(round(seconds, 4))
+
+    def miss(self, browser: str, key: str, seconds: float) -> None:
+        """Record a timed-out wait: the learned history no longer holds, start it over from this wait"""
+        self._history.setdefault(browser, {})[key] = [round(seconds, 4)]
+        self._new.setdefault(browser, {})[key] = [round(seconds, 4)]
+        self._reset.setdefault(browser, set()).add(key)
+
+    def samples(self, browser: str, key: str) -> List[float]:
+        return self._history.get(browser, {}).get(key, [])[-self.max_samples:]
+
+    def effective_timeout(self, browser: str, key: str, ceiling: float) -> float:
+        """Learned p99 x safety factor, bounded by the floor and the given ceiling"""
+        samples = self.samples(browser, key)
+        if not Config.ADAPTIVE_TIMEOUTS or len(samples) < Config.ADAPTIVE_MIN_SAMPLES:
+            return ceiling
+        learned = percentile(samples, 99) * Config.TIMEOUT_SAFETY_FACTOR
+        return round(min(ceiling, max(Config.ADAPTIVE_TIMEOUT_FLOOR, learned)), 2)
+
+    def describe(self, browser: str, key: str) -> str:
+        """Summarize the historical distribution for failure messages"""
+        samples = self.samples(browser, key)
+        if not samples:
+            return "no history"
+        return (f"{len(samples)} samples: p50 {percentile(samples, 50):.3f}s, "
+                f"p90 {percentile(samples, 90):.3f}s, p99 {percentile(samples, 99):.3f}s, "
+                f"max {max(samples):.3f}s")
+
+    def save(self) -> None:
+        """Merge samples recorded by this process into the store file
+
+        Several xdist workers save at session end, so the file is re-read under a
+        lock and only this process's new samples are appended.
+        """
+        if not self._new:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        lock_path = self.path + ".lock"
+        with FileLock(lock_path):
+            merged = self._read()
+            for browser, keys in self._new.items():
+                for key, values in keys.items():
+                    if key in self._reset.get(browser, ()):
+                        merged.setdefault(browser, {})[key] = []
+                    combined = merged.setdefault(browser, {}).setdefault(key, []) + values
+                    merged[browser][key] = combined[-self.max_samples:]
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(merged, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        self._history, self._new, self._reset = merged, {}, {}
+        logger.debug(f"Saved wait timings to {self.path}")
+
+
+_store: Optional[TimingStore] = None
+
+
+def timing_store() -> TimingStore:
+    """Process-wide TimingStore loaded from Config.TIMING_STORE_PATH"""
+    global _store
+    if _store is None:
+        _store = TimingStore(Config.TIMING_STORE_PATH)
+    return _store
@@ -0,0 +1,405 @@
+"""Execution trace recorder.
+
+Records, per test, every page-object step (Allure step) and WebDriver command with
+timestamps, incremental DOM snapshots, console messages and network requests, and stores
+them as one gzip-compressed JSON trace. Screenshots are only added on failure or when a
+test takes one explicitly. The DOM is diffed inside the page against the previous snapshot,
+so only changed lines cross the wire, and only after steps that ran a mutating command.
+
+Usage:
+    pytest tests/ --record-trace=retain-on-failure
+    python -m utils.trace view reports/traces/<test>.trace.gz [--output trace.html] [--open]
+"""
+import argparse
+import base64
+import gzip
+import html
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import webbrowser
+from typing import Any, List, Optional
+import allure_commons
+from utils.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Buffers console messages, uncaught errors and network timings in the page
+TRACE_INIT_SCRIPT = """
+(function () {
+    if (window.__trace) return;
+    var trace = window.__trace = {events: [], resources: 0, lines: null};
+    var origin = performance.timeOrigin || (Date.now() - performance.now());
+    trace.origin = origin;
+    function push(event) {
+        trace.events.push(event);
+        if (trace.events.length > 1000) trace.events.shift();
+    }
+    ['log', 'info', 'warn', 'error', 'debug'].forEach(function (level) {
+        var original = console[level];
+        console[level] = function () {
+            try {
+                var text = Array.prototype.map.call(arguments, function (a) {
+                    try { return typeof a === 'string' ? a : JSON.stringify(a); } catch (e) { return String(a); }
+                }).join(' ');
+                push({t: Date.now(), kind: 'console', level: level, text: text.slice(0, 2000)});
+            } catch (e) {}
+            return original.apply(this, arguments);
+        };
+    });
+    window.addEventListener('error', function (e) {
+        push({t: Date.now(), kind: 'console', level: 'exception',
+              text: String(e.message) + (e.filename ? ' at ' + e.filename + ':' + e.lineno : '')});
+    });
+    window.addEventListener('unhandledrejection', function (e) {
+        push({t: Date.now(), kind: 'console', level: 'exception', text: 'Unhandled rejection: ' + String(e.reason)});
+    });
+    if (performance.setResourceTimingBufferSize) performance.setResourceTimingBufferSize(2000);
+})();
+"""
+
+# Arguments: include DOM. Returns buffered events and the DOM change since the last drain
+# as {start, remove, insert} over lines of markup ({full} for a new document).
+TRACE_DRAIN_SCRIPT = TRACE_INIT_SCRIPT + """
+var trace = window.__trace, result = {url: location.href, events: trace.events, dom: null};
+trace.events = [];
+var entries = performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'));
+entries.slice(trace.resources).forEach(function (e) {
+    result.events.push({t: Math.round(trace.origin + e.startTime), kind: 'network', url: e.name,
+                        initiator: e.initiatorType || 'navigation', status: e.responseStatus || null,
+                        duration: Math.round(e.duration), size: e.transferSize || 0});
+});
+trace.resources = entries.length;
+if (arguments[0] && document.documentElement) {
+    var markup = document.documentElement.outerHTML
+        .replace(/<script\\b([^>]*)>[\\s\\S]*?<\\/script>/gi, '<script$1></script>')
+        .replace(/>\\s*</g, '>\\n<');
+    var lines = markup.split('\\n'), prev = trace.lines;
+    if (!prev) {
+        result.dom = {full: lines};
+    } else {
+        var start = 0, max = Math.min(prev.length, lines.length);
+        while (start < max && prev[start] === lines[start]) start++;
+        var endPrev = prev.length, end = lines.length;
+        while (endPrev > start && end > start && prev[endPrev - 1] === lines[end - 1]) { endPrev--; end--; }
+        if (endPrev > start || end > start) result.dom = {start: start, remove: endPrev - start, insert: lines.slice(start, end)};
+    }
+    trace.lines = lines;
+}
+return result;
+"""
+
+# Commands after which the page may have changed, so the next step boundary snapshots the DOM
+MUTATING_COMMANDS = {
+    "get", "clickElement", "sendKeysToElement", "clearElement", "goBack", "goForward", "refresh",
+    "w3cExecuteScript", "w3cExecuteScriptAsync", "actions", "switchToWindow", "switchToFrame",
+    "newWindow", "close"
+}
+
+_active: Optional['TraceRecorder'] = None
+
+
+def active_recorder() -> Optional['TraceRecorder']:
+    """The recorder of the running test, if tracing is on"""
+    return _active
+
+
+def _param_summary(params: Optional[dict]) -> dict:
+    """Command parameters worth showing, without element handles or large payloads"""
+    summary = {}
+    for key, value in (params or {}).items():
+        if key == "sessionId":
+            continue
+        if key == "script":
+            summary[key] = " ".join(str(value).split())[:160]
+        elif key == "args":
+            summary[key] = f"{len(value)} argument(s)"
+        elif isinstance(value, (str, int, float, bool)) or value is None:
+            summary[key] = value if not isinstance(value, str) else value[:200]
+        elif key == "actions":
+            summary[key] = f"{len(value)} input source(s)"
+    return summary
+
+
+def _value_summary(command: str, value: Any) -> Any:
+    if command in ("findElements", "findChildElements") and isinstance(value, list):
+        return f"{len(value)} element(s)"
+    if command in ("screenshot", "elementScreenshot"):
+        return None
+    if isinstance(value, str):
+        return value[:200]
+    if isinstance(value, (int, float, bool)):
+        return value
+    return None
+
+
+class TraceRecorder:
+    """Collects one test's timeline from driver commands, Allure steps and the page"""
+
+    def __init__(self, driver, nodeid: str, browser: str = "unknown"):
+        self.driver = getattr(driver, "wrapped_driver", driver)
+        self.nodeid = nodeid
+        self.browser = browser
+        self.events: List[dict] = []
+        self.started = time.time()
+        self._dirty = True
+        self._internal = threading.local()
+        self._init_identifier = None
+
+    @staticmethod
+    def _now() -> int:
+        return int(time.time() * 1000)
+
+    def _add(self, event: dict) -> None:
+        if len(self.events) < Config.TRACE_MAX_EVENTS:
+            self.events.append(event)
+
+    def start(self) -> 'TraceRecorder':
+        global _active
+        driver, original = self.driver, self.driver.execute
+
+        def execute(command, params=None):
+            if getattr(self._internal, "active", False):
+                return original(command, params)
+            start = self._now()
+            event = {"t": start, "kind": "command", "name": command, "params": _param_summary(params)}
+            try:
+                response = original(command, params)
+            except Exception as e:
+                message = str(e).splitlines()[0] if str(e) else ''
+                event.update(duration=self._now() - start, error=f"{type(e).__name__}: {message}")
+                self._add(event)
+                raise
+            event["duration"] = self._now() - start
+            value = _value_summary(command, (response or {}).get("value"))
+            if value is not None:
+                event["value"] = value
+            self._add(event)
+            if command in MUTATING_COMMANDS:
+                self._dirty = True
+            return response
+
+        driver.execute = execute
+        if hasattr(driver, "execute_cdp_cmd"):
+            try:
+                self._init_identifier = self._quiet(
+                    driver.execute_cdp_cmd, "Page.addScriptToEvaluateOnNewDocument", {"source": TRACE_INIT_SCRIPT}
+                )["identifier"]
+            except Exception as e:
+                logger.debug(f"Trace init script not installed: {str(e)}")
+        allure_commons.plugin_manager.register(self)
+        _active = self
+        self.drain()
+        return self
+
+    def _quiet(self, function, *args):
+        """Run a driver call without recording it"""
+        self._internal.active = True
+        try:
+            return function(*args)
+        finally:
+            self._internal.active = False
+
+    @allure_commons.hookimpl
+    def start_step(self, uuid, title, params):
+        self._add({"t": self._now(), "kind": "step", "phase": "start", "id": uuid, "title": title,
+                   "params": {k: str(v)[:200] for k, v in (params or {}).items()}})
+
+    @allure_commons.hookimpl
+    def stop_step(self, uuid, exc_type, exc_val, exc_tb):
+        event = {"t": self._now(), "kind": "step", "phase": "end", "id": uuid}
+        if exc_type is not None:
+            event["error"] = f"{exc_type.__name__}: {str(exc_val).splitlines()[0] if str(exc_val) else ''}"
+        self._add(event)
+        if self._dirty:
+            self.drain()
+
+    def drain(self, dom: bool = True) -> None:
+        """Pull buffered page events and, if anything may have changed, the DOM diff"""
+        try:
+            result = self._quiet(self.driver.execute_script, TRACE_DRAIN_SCRIPT, dom)
+        except Exception as e:
+            logger.debug(f"Trace drain failed: {str(e)}")
+            return
+        self._dirty = False
+        for event in result.get("events") or []:
+            self._add(event)
+        if result.get("dom"):
+            self._add(dict(result["dom"], t=self._now(), kind="dom", url=result.get("url")))
+
+    def screenshot(self, name: str, png: Optional[bytes] = None) -> None:
+        """Add a screenshot to the trace, taking one unless given"""
+        try:
+            png = png if png is not None else self._quiet(self.driver.get_screenshot_as_png)
+        except Exception as e:
+            logger.debug(f"Trace screenshot failed: {str(e)}")
+            return
+        self._add({"t": self._now(), "kind": "screenshot", "name": name,
+                   "png": base64.b64encode(png).decode("ascii")})
+
+    def stop(self, passed: bool, error: Optional[str] = None) -> Optional[str]:
+        """Finish recording; write the trace (per TRACE_MODE) and return its path"""
+        global _active
+        if not passed:
+            self.drain()
+            self.screenshot("failure")
+        allure_commons.plugin_manager.unregister(self)
+        _active = None
+        try:
+            del self.driver.execute
+        except AttributeError:
+            pass
+        if self._init_identifier is not None:
+            try:
+                self.driver.execute_cdp_cmd("Page.removeScriptToEvaluateOnNewDocument",
+                                            {"identifier": self._init_identifier})
+            except Exception as e:
+                logger.debug(f"Trace init script not removed: {str(e)}")
+        if Config.TRACE_MODE == "retain-on-failure" and passed:
+            return None
+        return self.save(passed, error)
+
+    def save(self, passed: bool, error: Optional[str] = None) -> str:
+        os.makedirs(Config.TRACE_PATH, exist_ok=True)
+        path = os.path.join(Config.TRACE_PATH, re.sub(r"[^A-Za-z0-9_.-]+", "_", self.nodeid).strip("_") + ".trace.gz")
+        trace = {
+            "version": 1, "test": self.nodeid, "browser": self.browser, "started": int(self.started * 1000),
+            "finished": self._now(), "passed": passed, "error": error,
+            "events": sorted(self.events, key=lambda e: e["t"])
+        }
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(trace, f, separators=(",", ":"))
+        logger.info(f"Trace saved: {path} ({len(self.events)} events)")
+        return path
+
+
+def load(path: str) -> dict:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+VIEWER_TEMPLATE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Trace: __TITLE__</title>
+<style>
+body { margin: 0; font: 13px system-ui, sans-serif; display: flex; height: 100vh; }
+#timeline { width: 42%; overflow: auto; border-right: 1px solid #ccc; }
+#detail { flex: 1; display: flex; flex-direction: column; min-width: 0; }
+header { padding: 8px; background: #f4f4f4; border-bottom: 1px solid #ccc; }
+.event { padding: 3px 8px; cursor: pointer; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }
+.event.selected { background: #cde4ff; }
+.event.error { color: #b00020; }
+.kind { display: inline-block; width: 78px; font-weight: 600; }
+.time { display: inline-block; width: 70px; color: #777; text-align: right; margin-right: 8px; }
+#info { padding: 8px; max-height: 35%; overflow: auto; white-space: pre-wrap; font-family: monospace; margin: 0; }
+#view { flex: 1; border: 0; border-top: 1px solid #ccc; width: 100%; }
+#shot { flex: 1; overflow: auto; border-top: 1px solid #ccc; display: none; }
+#shot img { max-width: 100%; }
+</style></head>
+<body>
+<div id="timeline"><header id="summary"></header><div id="events"></div></div>
+<div id="detail"><pre id="info">Select an event (arrow keys step through the timeline)</pre>
+<iframe id="view" sandbox=""></iframe><div id="shot"><img id="shot-img"></div></div>
+<script>
+var trace = __TRACE__;
+var events = trace.events, selected = -1, snapshots = {}, domAt = [], lines = null, last = -1;
+events.forEach(function (e, i) {
+    if (e.kind === 'dom') {
+        if (e.full) lines = e.full.slice();
+        else if (lines) lines.splice.apply(lines, [e.start, e.remove].concat(e.insert));
+        if (lines) { snapshots[i] = lines.join('\\n'); last = i; }
+    }
+    domAt.push(last);
+});
+function label(e) {
+    if (e.kind === 'command') return e.name + ' ' + JSON.stringify(e.params || {}) + (e.duration != null ? ' (' + e.duration + ' ms)' : '');
+    if (e.kind === 'step') return (e.phase === 'start' ? '\\u25b6 ' + e.title : '\\u25a0 end');
+    if (e.kind === 'console') return '[' + e.level + '] ' + e.text;
+    if (e.kind === 'network') return (e.status || '') + ' ' + e.url + ' (' + e.duration + ' ms)';
+    if (e.kind === 'dom') return (e.full ? 'snapshot ' : 'diff ') + (e.url || '');
+    if (e.kind === 'screenshot') return e.name;
+    return '';
+}
+document.getElementById('summary').textContent = trace.test + ' [' + trace.browser + '] ' +
+    (trace.passed ? 'passed' : 'FAILED' + (trace.error ? ': ' + trace.error : '')) + ' - ' + events.length + ' events';
+var list = document.getElementById('events');
+events.forEach(function (e, i) {
+    var row = document.createElement('div');
+    row.className = 'event' + (e.error || e.level === 'error' || e.level === 'exception' ? ' error' : '');
+    row.innerHTML = '<span class="time"></span><span class="kind"></span><span class="text"></span>';
+    row.children[0].textContent = '+' + ((e.t - trace.started) / 1000).toFixed(3) + 's';
+    row.children[1].textContent = e.kind;
+    row.children[2].textContent = label(e);
+    row.onclick = function () { select(i); };
+    list.appendChild(row);
+});
+function select(i) {
+    if (i < 0 || i >= events.length) return;
+    if (selected >= 0) list.children[selected].classList.remove('selected');
+    selected = i;
+    var row = list.children[i], e = events[i];
+    row.classList.add('selected');
+    row.scrollIntoView({block: 'nearest'});
+    var shown = Object.assign({}, e);
+    delete shown.png; delete shown.full; delete shown.insert;
+    if (e.insert) shown.changed_lines = e.insert.length;
+    document.getElementById('info').textContent = JSON.stringify(shown, null, 2);
+    var shot = document.getElementById('shot'), view = document.getElementById('view');
+    if (e.kind === 'screenshot') {
+        document.getElementById('shot-img').src = 'data:image/png;base64,' + e.png;
+        shot.style.display = 'block'; view.style.display = 'none';
+    } else {
+        shot.style.display = 'none'; view.style.display = 'block';
+        if (view.getAttribute('data-index') !== String(domAt[i])) {
+            view.srcdoc = domAt[i] >= 0 ? snapshots[domAt[i]] : '<p>No DOM captured yet</p>';
+            view.setAttribute('data-index', String(domAt[i]));
+        }
+    }
+}
+document.addEventListener('keydown', function (ev) {
+    if (ev.key === 'ArrowDown' || ev.key === 'j') { select(selected + 1); ev.preventDefault(); }
+    if (ev.key === 'ArrowUp' || ev.key === 'k') { select(selected - 1); ev.preventDefault(); }
+});
+select(0);
+</script></body></html>
+"""
+
+
+def render_viewer(trace: dict) -> str:
+    """Self-contained HTML page that steps through a trace's timeline"""
+    payload = json.dumps(trace, separators=(",", ":")).replace("</", "<\\/")
+    return VIEWER_TEMPLATE.replace("__TITLE__", html.escape(trace.get("test", ""))).replace("__TRACE__", payload)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Inspect recorded test traces")
+    commands = parser.add_subparsers(dest="command", required=True)
+    view = commands.add_parser("view", help="Write an HTML timeline viewer for a trace")
+    view.add_argument("trace", help="Path to a .trace.gz file")
+    view.add_argument("--output", default=None, help="HTML file to write (default: next to the trace)")
+    view.add_argument("--open", action="store_true", help="Open the viewer in the default browser")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    try:
+        trace = load(args.trace)
+    except (OSError, ValueError) as e:
+        logger.error(f"Cannot read trace {args.trace}: {str(e)}")
+        return 1
+    output = args.output or re.sub(r"\.trace\.gz$", "", args.trace) + ".html"
+    with open(output, "w", encoding="utf-8") as f:
+        f.write(render_viewer(trace))
+    logger.info(f"Trace viewer written to {output}")
+    if args.open:
+        webbrowser.open(f"file://{os.path.abspath(output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""The end-to-end user journey through HomePage, shared by the E2E test and the load runner.
+
+TestE2EUserJourney.test_complete_user_journey runs the steps as checkpoints and takes its
+screenshots through the `screenshot` hook; utils.load_runner times each step under load.
+"""
+from typing import Callable, List, Optional, Tuple
+
+from utils.config import Config
+
+
+class JourneyCheckFailed(AssertionError):
+    """A journey step ran but the page was not in the expected state"""
+
+
+def _check(condition: bool, message: str) -> None:
+    if not condition:
+        raise JourneyCheckFailed(message)
+
+
+def journey_steps(page, user: str, contact_stub=None,
+                  screenshot: Optional[Callable[[str], None]] = None) -> List[Tuple[str, Callable[[], None]]]:
+    """The user journey as (title, step) pairs; `screenshot(name)` is called at the journey's checkpoints"""
+    data = page.elements.TestData
+
+    def capture(name: str) -> None:
+        if screenshot is not None:
+            screenshot(name)
+
+    def lands_on_homepage():
+        page.navigate_to_homepage()
+        page.wait_for_preloader_to_disappear()
+        capture("user_lands_on_page")
+
+    def reads_main_content():
+        _check(len(page.get_tagline_text()) > 0 and len(page.get_description_text()) > 0,
+               "Main content not visible")
+
+    def views_process_steps():
+        page.scroll_to_ucollect_section()
+        _check(page.verify_all_process_steps()[0], "UCOllect process steps not properly displayed")
+        capture("user_views_process_steps")
+
+    def checks_app_download():
+        page.scroll_to_app_download_section()
+        _check(page.is_app_store_button_displayed(), "App Store button not visible")
+        _check(page.is_google_play_button_displayed(), "Google Play button not visible")
+        capture("user_views_app_download")
+
+    def decides_to_contact():
+        page.scroll_to_contact_section()
+        _check(page.is_contact_form_displayed(), "Contact form not accessible")
+
+    def submits_contact_form():
+        page.fill_contact_form(user, data.VALID_EMAIL, data.VALID_MESSAGE)
+        page.click_send_message_button()
+        if contact_stub is not None:
+            contact_stub.wait_for_field("userName", user, timeout=Config.EXPLICIT_WAIT)
+        capture("user_submits_contact_form")
+
+    def checks_footer():
+        page.scroll_to_footer_section()
+        _check(page.is_footer_logo_displayed(), "Footer information not available")
+        capture("user_views_company_info")
+
+    return [
+        ("User lands on homepage", lands_on_homepage),
+        ("User reads main content and tagline", reads_main_content),
+        ("User scrolls to learn about UCOllect process", views_process_steps),
+        ("User checks mobile app download options", checks_app_download),
+        ("User decides to contact company", decides_to_contact),
+        ("User fills and submits contact form", submits_contact_form),
+        ("User checks company information in footer", checks_footer),
+    ]
@@ -0,0 +1,209 @@
+"""Visual regression for page and section screenshots.
+
+Baselines are PNG files keyed by test, browser and viewport. Byte-identical PNGs are
+accepted without decoding. Otherwise comparisons are NumPy vectorized: a perceptual hash
+(DCT of a 32x32 thumbnail) fails clearly different images outright, and only the rest get
+the per-pixel mismatch ratio, mean difference and windowed SSIM over the unmasked pixels,
+plus a heatmap of the differences.
+NumPy and Pillow are imported on first use, so the suite runs without them while visual
+comparison is disabled.
+"""
+import io
+import logging
+import os
+import re
+from typing import List, Optional, Sequence, Tuple
+from utils.config import Config
+
+logger = logging.getLogger(__name__)
+
+Rect = Tuple[int, int, int, int]  # left, top, width, height in image pixels
+
+_dct_matrix = None
+
+
+def _numpy():
+    import numpy
+    return numpy
+
+
+def _image():
+    from PIL import Image
+    return Image
+
+
+def decode(png: bytes):
+    """PNG bytes -> HxWx3 uint8 array"""
+    return _numpy().asarray(_image().open(io.BytesIO(png)).convert("RGB"))
+
+
+def encode(array) -> bytes:
+    buffer = io.BytesIO()
+    _image().fromarray(array).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def phash(image) -> int:
+    """64-bit perceptual hash: signs of the low DCT frequencies of a 32x32 grey thumbnail"""
+    global _dct_matrix
+    np = _numpy()
+    if _dct_matrix is None:
+        n = np.arange(32)
+        _dct_matrix = np.cos(np.pi * (2 * n[None, :] + 1) * n[:, None] / 64)
+    grey = np.asarray(_image().fromarray(image).convert("L").resize((32, 32), _image().BILINEAR), dtype=np.float64)
+    low = (_dct_matrix @ grey @ _dct_matrix.T)[:8, :8].ravel()
+    bits = low > np.median(low[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def apply_masks(baseline, current, masks: Sequence[Rect]):
+    """Copy the baseline into masked regions of the current image so they never differ"""
+    if not masks:
+        return current
+    current = current.copy()
+    height, width = current.shape[:2]
+    for left, top, w, h in masks:
+        x0, y0 = max(0, left), max(0, top)
+        x1, y1 = min(width, left + w), min(height, top + h)
+        if x1 > x0 and y1 > y0:
+            current[y0:y1, x0:x1] = baseline[y0:y1, x0:x1]
+    return current
+
+
+def ssim(a, b, window: int = 8) -> float:
+    """Mean structural similarity of two grey images over sliding windows (integral images)"""
+    np = _numpy()
+    a = a.astype(np.float64)
+    b = b.astype(np.float64)
+    if min(a.shape) < window:
+        window = max(1, min(a.shape))
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+
+    def window_mean(x):
+        s = np.pad(x.cumsum(0).cumsum(1), ((1, 0), (1, 0)))
+        total = s[window:, window:] - s[:-window, window:] - s[window:, :-window] + s[:-window, :-window]
+        return total / (window * window)
+
+    mu_a, mu_b = window_mean(a), window_mean(b)
+    var_a = window_mean(a * a) - mu_a ** 2
+    var_b = window_mean(b * b) - mu_b ** 2
+    cov = window_mean(a * b) - mu_a * mu_b
+    score = ((2 * mu_a * mu_b + c1) * (2 * cov + c2)) / ((mu_a ** 2 + mu_b ** 2 + c1) * (var_a + var_b + c2))
+    return float(score.mean())
+
+
+def heatmap(baseline, magnitude):
+    """Greyed baseline with differences painted from yellow (small) to red (large)"""
+    np = _numpy()
+    grey = baseline.mean(axis=2, keepdims=True) * 0.35 + 150
+    out = np.repeat(grey, 3, axis=2)
+    changed = magnitude > 0
+    strength = magnitude[changed] / 255.0
+    out[changed] = np.stack([np.full_like(strength, 255), 230 * (1 - strength), np.zeros_like(strength)], axis=1)
+    return out.clip(0, 255).astype(np.uint8)
+
+
+class VisualMismatchError(AssertionError):
+    """A screenshot differs from its baseline beyond the configured thresholds"""
+
+
+class VisualResult:
+    """Outcome of comparing one screenshot with its baseline"""
+
+    def __init__(self, key: str, status: str, metrics: dict = None, heatmap_png: Optional[bytes] = None):
+        self.key = key
+        self.status = status  # new, identical, match, mismatch
+        self.metrics = metrics or {}
+        self.heatmap_png = heatmap_png
+
+    @property
+    def passed(self) -> bool:
+        return self.status != "mismatch"
+
+    def describe(self) -> str:
+        details = ", ".join(f"{k} {v}" for k, v in self.metrics.items())
+        return f"{self.key}: {self.status}{' (' + details + ')' if details else ''}"
+
+
+def compare(baseline_png: bytes, current_png: bytes, masks: Sequence[Rect] = (), key: str = "") -> VisualResult:
+    """Compare a screenshot with its baseline; masked rects are ignored"""
+    # Unchanged screenshots encode to the same bytes: nothing to decode
+    if baseline_png == current_png:
+        return VisualResult(key, "identical")
+    np = _numpy()
+    baseline, current = decode(baseline_png), decode(current_png)
+    if baseline.shape != current.shape:
+        return VisualResult(key, "mismatch", {"size": f"{current.shape[1]}x{current.shape[0]} vs baseline "
+                                                      f"{baseline.shape[1]}x{baseline.shape[0]}"})
+    current = apply_masks(baseline, current, masks)
+    if np.array_equal(baseline, current):
+        return VisualResult(key, "identical")
+    distance = hamming(phash(baseline), phash(current))
+    if distance >= Config.VISUAL_PHASH_MISMATCH:
+        # Perceptually different: failing it needs no per-pixel metrics or SSIM
+        return VisualResult(key, "mismatch", {"phash_distance": distance})
+
+    magnitude = np.abs(baseline.astype(np.int16) - current.astype(np.int16)).max(axis=2)
+    differing = magnitude > Config.VISUAL_PIXEL_TOLERANCE
+    grey_weights = np.array([0.299, 0.587, 0.114])
+    metrics = {
+        "phash_distance": distance,
+        "diff_ratio": round(float(differing.mean()), 5),
+        "mean_diff": round(float(magnitude.mean()), 3),
+        "ssim": round(ssim(baseline @ grey_weights, current @ grey_weights), 4)
+    }
+    ok = metrics["diff_ratio"] <= Config.VISUAL_MAX_DIFF_RATIO and metrics["ssim"] >= Config.VISUAL_MIN_SSIM
+    diff_png = None if not differing.any() else encode(heatmap(baseline, np.where(differing, magnitude, 0)))
+    return VisualResult(key, "match" if ok else "mismatch", metrics, diff_png)
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", text).strip("_")
+
+
+class BaselineStore:
+    """Baseline PNGs at <root>/<test>/<browser>/<viewport>/<name>.png"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, test: str, browser: str, viewport: str, name: str) -> str:
+        return os.path.join(self.root, _slug(test), _slug(browser), _slug(viewport), f"{_slug(name)}.png")
+
+    def load(self, path: str) -> Optional[bytes]:
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def save(self, path: str, png: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(png)
+
+
+def current_test() -> str:
+    """Test id of the running test without the browser parameter, from pytest's environment"""
+    current = os.environ.get("PYTEST_CURRENT_TEST", "adhoc").rsplit(" ", 1)[0]
+    return current.split("[", 1)[0]
+
+
+def check(png: bytes, name: str, browser: str, viewport: str, masks: List[Rect],
+          update: bool = False) -> VisualResult:
+    """Compare with the stored baseline, creating (or with `update` replacing) it when needed"""
+    store = BaselineStore(Config.VISUAL_BASELINE_PATH)
+    path = store.path(current_test(), browser, viewport, name)
+    baseline = None if update else store.load(path)
+    if baseline is None:
+        store.save(path, png)
+        logger.info(f"Visual baseline {'updated' if update else 'created'}: {path}")
+        return VisualResult(path, "new")
+    result = compare(baseline, png, masks, key=path)
+    log = logger.info if result.passed else logger.error
+    log(f"Visual check {result.describe()}")
+    return result